@@ -0,0 +1,83 @@
+"""Wallet balance refresh against a local mock JSON-RPC server.
+
+The mock answers eth_getBalance (single or batched) after a fixed delay
+per HTTP request, standing in for network round trips. Compares one call
+per request with batched requests, checks a rate limit is honoured and
+verifies the balances written back.
+
+Usage: python benchmarks/bench_balance_sync.py [wallets]
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.services.balance_sync import BalanceSync
+
+ROUND_TRIP = 0.005
+
+
+class MockRpc(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = 65536  # send headers and body together, avoiding Nagle/delayed-ACK stalls
+    requests_seen = 0
+    calls_seen = 0
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        MockRpc.requests_seen += 1
+        time.sleep(ROUND_TRIP)
+        calls = payload if isinstance(payload, list) else [payload]
+        MockRpc.calls_seen += len(calls)
+        # Balance in wei is the address' last 4 hex digits, in ether
+        replies = [{'jsonrpc': '2.0', 'id': c['id'], 'result': hex(int(c['params'][0][-4:], 16) * 10 ** 18)}
+                   for c in calls]
+        body = json.dumps(replies if isinstance(payload, list) else replies[0]).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def main(count=1000):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockRpc)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+        db.add_wallets_bulk({'name': f'w{i}', 'address': f'0x{i:040x}', 'network': ('Ethereum', 'Base')[i % 2]}
+                            for i in range(count))
+        endpoints = {'ethereum': url, 'base': url}
+        print(f"{count} wallets on 2 networks, {ROUND_TRIP * 1000:.0f} ms per round trip")
+        for batch_size in (1, 10, 100):
+            MockRpc.requests_seen = 0
+            start = time.perf_counter()
+            stats = BalanceSync(db, endpoints, batch_size=batch_size).sync()
+            elapsed = time.perf_counter() - start
+            print(f"  batch size {batch_size:>3}: {elapsed * 1000:8.0f} ms  {MockRpc.requests_seen:>5} HTTP requests  {stats}")
+
+        MockRpc.requests_seen = 0
+        start = time.perf_counter()
+        BalanceSync(db, endpoints, rate_limits={'ethereum': 5, 'base': 5}, batch_size=count // 40).sync()
+        elapsed = time.perf_counter() - start
+        print(f"  rate limit 5 req/s per network: {MockRpc.requests_seen} requests in {elapsed:.2f} s")
+
+        wallet = db.get_wallet(count // 2)
+        assert wallet['balance'] == float(int(wallet['address'][-4:], 16)), wallet
+        db.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
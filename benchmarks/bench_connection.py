@@ -0,0 +1,60 @@
+"""Per-query latency: connect-per-call execute() vs the persistent connection.
+
+Usage: python benchmarks/bench_connection.py [rows] [queries]
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+
+
+def legacy_execute(db_path, query, params=None, fetch=False):
+    # The pre-pooling implementation: connect, commit and close on every call
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    cur = conn.cursor()
+    cur.execute(query, params or [])
+    conn.commit()
+    rows = cur.fetchall() if fetch else None
+    conn.close()
+    return [dict(row) for row in rows] if rows else None
+
+
+def timed(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(rows=2000, queries=500):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        db = DatabaseManager(db_path)
+        with db.transaction():
+            for i in range(rows):
+                db.add_node({'name': f'node-{i}', 'address': f'10.0.{i // 256}.{i % 256}', 'network': 'eth'})
+
+        select = "SELECT * FROM nodes WHERE id=?"
+        insert = "INSERT INTO nodes (name, address) VALUES (?, ?)"
+        results = [
+            ('select by id', timed(lambda i: legacy_execute(db_path, select, (i % rows + 1,), fetch=True), queries),
+             timed(lambda i: db.execute(select, (i % rows + 1,), fetch=True), queries)),
+            ('insert', timed(lambda i: legacy_execute(db_path, insert, ('x', 'y')), queries),
+             timed(lambda i: db.execute(insert, ('x', 'y')), queries)),
+        ]
+        db.close()
+
+    print(f"{'query':<16}{'connect-per-call':>20}{'persistent':>14}{'speedup':>10}")
+    for name, before, after in results:
+        print(f"{name:<16}{before:>17.1f} us{after:>11.1f} us{before / after:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
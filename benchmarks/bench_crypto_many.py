@@ -0,0 +1,40 @@
+"""Batch encryption throughput by worker count.
+
+Usage: python benchmarks/bench_crypto_many.py [values]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.encryption import CryptoManager
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(count=50000):
+    crypto = CryptoManager('benchmark password')
+    values = [f'{i:064x}' for i in range(count)]
+
+    tokens, serial = timed(lambda: [crypto.encrypt(v) for v in values])
+    plain, _ = timed(lambda: [crypto.decrypt(t) for t in tokens])
+    assert plain == values
+    print(f"{count} values, {os.cpu_count()} CPUs")
+    print(f"  serial loop  : {count / serial:10.0f} values/s")
+
+    for workers in (1, 2, 4, 8):
+        enc, enc_time = timed(lambda: list(crypto.encrypt_many(values, workers=workers)))
+        dec, dec_time = timed(lambda: list(crypto.decrypt_many(enc, workers=workers)))
+        assert dec == values
+        print(f"  {workers} worker(s) : {count / enc_time:10.0f} enc/s {count / dec_time:10.0f} dec/s"
+              f"  ({serial / enc_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,95 @@
+"""Delta backups vs. full copies: size and time per backup, and restore time.
+
+Fills a vault, takes a full backup, then for each round changes a share of
+the rows (balance refresh, health updates, edits, deletes and inserts) and
+takes both a delta and a full backup of the result. Every backup is
+compressed and encrypted with the vault key. The last round's state is
+restored both ways and compared.
+
+Usage: python benchmarks/bench_delta_backup.py [nodes] [percent changed per round] [rounds]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.fernet import Fernet
+
+from src.database import backup
+from src.database.db_manager import DatabaseManager
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def change_rows(db, rng, nodes, wallets, percent):
+    n_nodes, n_wallets = nodes * percent // 100, wallets * percent // 100
+    db.update_node_health([(rng.randint(1, nodes), rng.choice(('Active', 'Offline')), None)
+                           for _ in range(n_nodes)])
+    db.update_wallet_balances([(rng.random() * 10, rng.randint(1, wallets)) for _ in range(n_wallets)])
+    with db.transaction():
+        for _ in range(max(1, n_wallets // 10)):
+            db.execute("DELETE FROM nodes WHERE id = ?", (rng.randint(1, nodes),))
+            db.add_node({'name': f'new-{rng.random()}', 'address': '10.9.9.9', 'network': 'eth'})
+
+
+def dump(path):
+    conn = sqlite3.connect(path)
+    try:
+        return [conn.execute(f"SELECT * FROM {t} ORDER BY id").fetchall() for t in ('nodes', 'wallets', 'airdrops')]
+    finally:
+        conn.close()
+
+
+def main(nodes=100000, percent=1, rounds=3):
+    wallets = nodes // 2
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'vault.db')
+        db = DatabaseManager(db_path, master_key=Fernet.generate_key())
+        db.add_nodes_bulk({'name': f'node-{i}', 'address': f'10.{i // 65536}.{i // 256 % 256}.{i % 256}',
+                           'port': 8545, 'network': 'eth', 'notes': 'seed node ' * 5} for i in range(nodes))
+        db.add_wallets_bulk({'name': f'wallet-{i}', 'address': f'0x{i:040x}', 'network': 'eth',
+                             'private_key': f'key-{i:064x}'} for i in range(wallets))
+        rng = random.Random(1)
+        base = os.path.join(tmp, 'base.nvbk')
+        _, seconds = timed(lambda: backup.backup_database(db, base, compress=True, crypto=db.crypto))
+        print(f"{nodes} nodes, {wallets} wallets; database {os.path.getsize(db_path) / 2**20:.1f} MB, "
+              f"{percent}% of rows changed per round")
+        print(f"base backup: {os.path.getsize(base) / 2**20:.2f} MB in {seconds:.2f}s\n")
+        print(f"{'round':<7}{'delta size':>12}{'delta time':>12}{'rows':>8}{'full size':>12}{'full time':>11}")
+
+        deltas = []
+        for n in range(1, rounds + 1):
+            change_rows(db, rng, nodes, wallets, percent)
+            delta = os.path.join(tmp, f'delta-{n}.nvdelta')
+            header, delta_seconds = timed(lambda: backup.backup_delta(db, delta, crypto=db.crypto))
+            deltas.append(delta)
+            # A full backup of the same state, for comparison; as_base=False
+            # keeps it from becoming the base of the next delta
+            full = os.path.join(tmp, f'full-{n}.nvbk')
+            _, full_seconds = timed(lambda: backup.backup_database(db, full, compress=True, crypto=db.crypto,
+                                                                   as_base=False))
+            print(f"{n:<7}{os.path.getsize(delta) / 1024:>9.0f} KB{delta_seconds:>11.2f}s"
+                  f"{header['rows'] + header['deleted']:>8}{os.path.getsize(full) / 2**20:>9.2f} MB"
+                  f"{full_seconds:>10.2f}s")
+
+        want = dump(db_path)
+        chained, chain_seconds = timed(lambda: backup.prepare_chain_restore(base, deltas, db_path, crypto=db.crypto))
+        restored, full_restore_seconds = timed(lambda: backup.prepare_restore(full, db_path, crypto=db.crypto))
+        assert dump(chained) == want, "base + deltas differ from the live database"
+        assert dump(restored) == want
+        print(f"\nrestore: base + {len(deltas)} deltas {chain_seconds:.2f}s, "
+              f"latest full backup {full_restore_seconds:.2f}s (both verified)")
+        db.close()
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:4]))
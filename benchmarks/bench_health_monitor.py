@@ -0,0 +1,82 @@
+"""Node health check pass against loopback stand-in servers.
+
+Starts listening sockets (half of them answering JSON-RPC eth_syncing, one
+reporting a sync in progress), points nodes at them and at closed ports,
+then times one HealthMonitor pass per concurrency setting and checks the
+statuses written back.
+
+Usage: python benchmarks/bench_health_monitor.py [nodes]
+"""
+
+import asyncio
+import json
+import os
+import socket
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.services.health_monitor import HealthMonitor
+
+
+async def handle_rpc(reader, writer, syncing):
+    try:
+        await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        writer.close()  # plain TCP probe
+        return
+    result = {'currentBlock': '0x10', 'highestBlock': '0x20'} if syncing else False
+    body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': result}).encode()
+    writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n' % len(body) + body)
+    await writer.drain()
+    writer.close()
+
+
+def start_servers(count):
+    """Run `count` loopback JSON-RPC servers on a background loop; returns their ports."""
+    loop = asyncio.new_event_loop()
+    ports = []
+
+    async def serve():
+        for i in range(count):
+            server = await asyncio.start_server(lambda r, w, s=(i == 0): handle_rpc(r, w, s), '127.0.0.1', 0)
+            ports.append(server.sockets[0].getsockname()[1])
+
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    asyncio.run_coroutine_threadsafe(serve(), loop).result()
+    return ports
+
+
+def closed_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main(count=2000):
+    ports = start_servers(20)
+    dead = closed_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+        db.add_nodes_bulk({'name': f'node-{i}', 'address': '127.0.0.1', 'port': ports[i // 2 % 20] if i % 2 else dead,
+                           'status': 'Unknown'} for i in range(count))
+        db.execute("UPDATE nodes SET last_sync=NULL")
+        print(f"{count} nodes, half reachable")
+        for concurrency in (10, 50, 200):
+            summary = HealthMonitor(db, concurrency=concurrency, timeout=2.0, rpc=True).check_once()
+            print(f"  concurrency {concurrency:>3}: {summary['seconds'] * 1000:8.0f} ms  "
+                  f"({summary['Active']} active, {summary['Syncing']} syncing, {summary['Offline']} offline)")
+        counts = {r['status']: r['n'] for r in db.execute(
+            "SELECT status, COUNT(*) AS n FROM nodes GROUP BY status", fetch=True)}
+        assert counts == {'Active': summary['Active'], 'Syncing': summary['Syncing'],
+                          'Offline': summary['Offline']}, counts
+        assert db.execute("SELECT COUNT(*) AS n FROM nodes WHERE last_sync IS NOT NULL",
+                          fetch=True)[0]['n'] == summary['Active']
+        db.close()
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,58 @@
+"""Node metrics: recording throughput and dashboard window queries.
+
+Records one probe per node per minute for a simulated period, then times
+uptime/percentile queries for all nodes over several windows and checks
+the histogram percentiles against exact values from the raw samples.
+
+Usage: python benchmarks/bench_node_metrics.py [nodes] [hours]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.database.metrics import NodeMetrics, MINUTE, HOUR
+
+
+def exact_percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(pct / 100 * len(values)))] if values else None
+
+
+def main(nodes=1000, hours=6):
+    random.seed(7)
+    now = int(time.time()) // HOUR * HOUR
+    start = now - hours * HOUR
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'))
+        metrics = NodeMetrics(db)
+        began = time.perf_counter()
+        for ts in range(start, now, MINUTE):
+            metrics.record(((n, random.random() > 0.02 * (n % 5), random.lognormvariate(3.5, 0.6), None)
+                            for n in range(1, nodes + 1)), ts=ts)
+        elapsed = time.perf_counter() - began
+        total = nodes * hours * 60
+        print(f"{nodes} nodes x {hours} h, one probe per minute: {total} samples")
+        print(f"  record: {total / elapsed:10.0f} samples/s")
+
+        for label, since in (('last hour', now - HOUR), (f'last {hours} h', start)):
+            began = time.perf_counter()
+            stats = metrics.window(since, now)
+            print(f"  {label:<10} all nodes: {(time.perf_counter() - began) * 1000:7.1f} ms "
+                  f"({metrics.tier_for(since, now, now)} tier, {len(stats)} nodes)")
+
+        samples = [s['latency_ms'] for s in metrics.samples(3, now - HOUR, now)]
+        stats = metrics.window(now - HOUR, now, node_ids=[3], tier='1m')[3]
+        for pct in (50, 95, 99):
+            print(f"  node 3 p{pct}: histogram {stats[f'p{pct}']:6.1f} ms   exact {exact_percentile(samples, pct):6.1f} ms")
+        print(f"  node 3 uptime: {stats['uptime']:.1f}%")
+        db.close()
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
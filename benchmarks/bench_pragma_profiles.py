@@ -0,0 +1,108 @@
+"""Mixed read/write workload under each connection PRAGMA profile.
+
+A writer thread commits small node-health batches (like the health
+monitor) while reader threads page through nodes and load the dashboard
+(like the UI), all on one DatabaseManager with a connection per thread.
+Reports commits and reads per second, read latency percentiles,
+locked-database errors and the peak WAL size per profile; WAL profiles
+run the maintenance thread so the checkpoint cost is included.
+
+Usage: python benchmarks/bench_pragma_profiles.py [rows] [seconds] [readers] [checkpoint seconds, 0: off]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager, PRAGMA_PROFILES
+
+STATUSES = ('Active', 'Syncing', 'Offline')
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run_profile(profile, rows, seconds, readers, maintenance):
+    with tempfile.TemporaryDirectory() as tmp:
+        wal_mode = ('journal_mode', 'WAL') in PRAGMA_PROFILES[profile]
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'), profile=profile)
+        db.add_nodes_bulk({'name': f'node-{i}', 'address': f'10.0.{i // 256}.{i % 256}', 'port': 8545,
+                           'network': 'eth', 'status': 'Active'} for i in range(rows))
+        stop = threading.Event()
+        stats = {'commits': 0, 'reads': 0, 'errors': 0, 'latencies': []}
+        lock = threading.Lock()
+
+        def writer():
+            rng = random.Random(1)
+            while not stop.is_set():
+                batch = [(rng.randint(1, rows), rng.choice(STATUSES), None) for _ in range(50)]
+                try:
+                    db.update_node_health(batch)
+                    stats['commits'] += 1
+                except sqlite3.OperationalError:
+                    stats['errors'] += 1
+
+        def reader(seed):
+            rng = random.Random(seed)
+            latencies, reads, errors = [], 0, 0
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    if rng.random() < 0.2:
+                        db.get_dashboard_stats()
+                    else:
+                        row_id = rng.randint(0, rows)
+                        db.get_nodes_page(after=(row_id, row_id), limit=200)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    reads += 1
+                except sqlite3.OperationalError:
+                    errors += 1
+            with lock:
+                stats['latencies'] += latencies
+                stats['reads'] += reads
+                stats['errors'] += errors
+
+        threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,))
+                                                       for i in range(readers)]
+        for t in threads:
+            t.start()
+        if wal_mode and maintenance:
+            db.start_maintenance(maintenance)
+        wal, wal_size = os.path.join(tmp, 'bench.db-wal'), 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            time.sleep(0.05)
+            if os.path.exists(wal):
+                wal_size = max(wal_size, os.path.getsize(wal))
+        stop.set()
+        for t in threads:
+            t.join()
+        db.close()
+    lat = stats['latencies']
+    return (stats['commits'] / seconds, stats['reads'] / seconds, percentile(lat, 50), percentile(lat, 99),
+            max(lat, default=0.0), stats['errors'], wal_size / 1024)
+
+
+def main(rows=20000, seconds=5, readers=3, maintenance=1):
+    print(f"{rows} nodes, 1 writer + {readers} readers, {seconds}s per profile, "
+          f"WAL checkpoint every {maintenance or '-'}s")
+    print(f"{'profile':<10}{'commits/s':>11}{'reads/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'errors':>8}{'WAL peak':>10}")
+    for profile in PRAGMA_PROFILES:
+        commits, reads, p50, p99, worst, errors, wal_kib = run_profile(profile, rows, seconds, readers, maintenance)
+        print(f"{profile:<10}{commits:>11.0f}{reads:>10.0f}{p50:>9.2f}{p99:>9.2f}{worst:>9.1f}"
+              f"{errors:>8}{wal_kib / 1024:>7.1f} MB")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:5]))
@@ -0,0 +1,66 @@
+"""RPC response cache: upstream calls saved by caching and request coalescing.
+
+Simulates several UI refreshes at once looking up balances for airdrop
+rows, many of which share a wallet address, against the mock JSON-RPC
+server from bench_balance_sync.py, then a cold start served from the
+on-disk tier.
+
+Usage: python benchmarks/bench_rpc_cache.py [rows] [distinct_addresses]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_balance_sync import MockRpc
+from src.services.rpc_cache import CachedRpcClient, RpcCache
+from src.services.rpc_client import JsonRpcClient
+
+
+def lookups(client, addresses):
+    return client.batch(('eth_getBalance', (address, 'latest')) for address in addresses)
+
+
+def run(label, client, rows, threads=8):
+    MockRpc.calls_seen = MockRpc.requests_seen = 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda _: lookups(client, rows), range(threads)))
+    elapsed = time.perf_counter() - start
+    assert all(r == results[0] for r in results)
+    print(f"  {label:<28} {elapsed * 1000:7.0f} ms  {MockRpc.requests_seen:>4} requests  "
+          f"{MockRpc.calls_seen:>6} upstream calls")
+    return results[0]
+
+
+def main(rows=2000, distinct=300):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockRpc)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_address[1]}/'
+    addresses = [f'0x{i % distinct:040x}' for i in range(rows)]
+    print(f"8 concurrent refreshes of {rows} rows sharing {distinct} addresses")
+
+    expected = run('no cache', JsonRpcClient(url), addresses)
+    with tempfile.TemporaryDirectory() as tmp:
+        disk = os.path.join(tmp, 'rpc_cache.db')
+        cache = RpcCache(disk_path=disk)
+        client = CachedRpcClient(JsonRpcClient(url), cache)
+        assert run('cold, coalesced', client, addresses) == expected
+        assert run('warm (memory)', client, addresses) == expected
+        print(f"    hits {cache.hits}, misses {cache.misses}, coalesced {cache.coalesced}")
+        cache.close()
+
+        restarted = RpcCache(disk_path=disk)
+        assert run('restart (disk tier)', CachedRpcClient(JsonRpcClient(url), restarted), addresses) == expected
+        restarted.close()
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
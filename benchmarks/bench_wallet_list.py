@@ -0,0 +1,53 @@
+"""Wallet list latency: decrypt-every-row listing vs lazy single-key decryption.
+
+Usage: python benchmarks/bench_wallet_list.py [wallets]
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+
+
+def eager_list(db):
+    # The previous get_all_wallets(): decrypt every private key while listing
+    wallets = db.execute("SELECT * FROM wallets", fetch=True) or []
+    for w in wallets:
+        if w.get('private_key'):
+            w['private_key'] = db.crypto.decrypt(w['private_key'])
+    return wallets
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main(count=10000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'bench.db'), encryption_key='benchmark password')
+        db.add_wallets_bulk({'name': f'wallet-{i}', 'address': f'0x{i:040x}', 'network': 'ethereum',
+                             'private_key': f'{i:064x}'} for i in range(count))
+        eager = best_of(lambda: eager_list(db))
+        lazy = best_of(db.get_all_wallets)
+        page = best_of(lambda: db.get_wallets_page(limit=200))
+        one = best_of(lambda: db.get_wallet(count // 2, decrypt=True))
+        db.close()
+
+    print(f"{count} wallets")
+    print(f"  list, decrypt every key  : {eager:9.1f} ms")
+    print(f"  list, keys left encrypted: {lazy:9.1f} ms  ({eager / lazy:.1f}x faster)")
+    print(f"  first page (200 rows)    : {page:9.2f} ms")
+    print(f"  open one wallet + decrypt: {one:9.2f} ms")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
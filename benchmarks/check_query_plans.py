@@ -0,0 +1,120 @@
+"""Verify with EXPLAIN QUERY PLAN that the hot lookups are served by indexes.
+
+The statements checked are those DatabaseManager itself runs: paging by
+every sort column, full-text search, deadline windows and duplicate-
+skipping bulk inserts are called on a sample vault and the SQL they send
+to SQLite is captured with a trace callback, so a change to the queries
+(or the indexes) that loses an index fails the check.
+
+Exits non-zero if a statement does not use the index it should, or sorts
+its rows in a temporary b-tree where the index should give the order.
+Usage: python benchmarks/check_query_plans.py
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.database.schema import INDEXES
+
+SORTED_BY_TEMP_TREE = 'USE TEMP B-TREE FOR ORDER BY'
+
+
+def captured(db, call):
+    """Run `call(db)` and return the SELECT/INSERT statements it executed, values inlined."""
+    statements = []
+    conn = db.conn
+    conn.set_trace_callback(lambda sql: statements.append(sql)
+                            if sql.lstrip().upper().startswith(('SELECT', 'INSERT')) else None)
+    try:
+        call(db)
+    finally:
+        conn.set_trace_callback(None)
+    # Trigger programs re-report the statement that fired them
+    return list(dict.fromkeys(statements))
+
+
+def index_on(table, column):
+    if column == 'id':
+        return 'INTEGER PRIMARY KEY'
+    return next(name for name, target in INDEXES.items() if target == f'{table}({column})')
+
+
+def cases():
+    """(label, call, indexes each statement must use, whether a temp b-tree sort is expected)
+
+    An index given as a tuple may be any one of its entries.
+    """
+    for table, columns in DatabaseManager.SORT_COLUMNS.items():
+        for order_by in columns:
+            index = index_on(table, order_by)
+            for descending in (False, True):
+                direction = 'desc' if descending else 'asc'
+                # The first page of the id order is a plain rowid scan
+                yield (f"get_page {table} by {order_by} {direction}, first page",
+                       lambda db, t=table, o=order_by, d=descending: db.get_page(t, None, 50, o, d),
+                       () if order_by == 'id' else (index,), False)
+                yield (f"get_page {table} by {order_by} {direction}, after a value",
+                       lambda db, t=table, o=order_by, d=descending: db.get_page(t, ('m', 1000), 50, o, d),
+                       (index,), False)
+                if order_by != 'id':
+                    # With the sort key fixed to NULL, the rowid range gives the order too
+                    yield (f"get_page {table} by {order_by} {direction}, after a NULL",
+                           lambda db, t=table, o=order_by, d=descending: db.get_page(t, (None, 1000), 50, o, d),
+                           ((index, 'INTEGER PRIMARY KEY'),), False)
+    for table in ('nodes', 'wallets', 'airdrops'):
+        # The best matches are ranked in the FTS index, then joined to their rows
+        yield (f"search {table}", lambda db, t=table: db.search('net1', tables=(t,)),
+               ('VIRTUAL TABLE INDEX', 'INTEGER PRIMARY KEY'), True)
+    # Both date ranges come out of their index in due order and are merged
+    deadline_indexes = tuple(index_on('airdrops', c) for c in DatabaseManager.DEADLINE_COLUMNS)
+    yield ("get_deadlines", lambda db: db.get_deadlines('2025-01-01', '2025-02-01'), deadline_indexes, False)
+    yield ("get_deadlines of one airdrop", lambda db: db.get_deadlines('2025-01-01', '2025-02-01', 5),
+           ('INTEGER PRIMARY KEY',), False)
+    yield ("add_nodes_bulk skipping duplicates",
+           lambda db: db.add_nodes_bulk([{'name': 'dup', 'address': '10.0.0.1'}], skip_duplicates=True),
+           ('idx_nodes_address',), False)
+    yield ("add_wallets_bulk skipping duplicates",
+           lambda db: db.add_wallets_bulk([{'name': 'dup', 'address': '0x1'}], skip_duplicates=True),
+           ('idx_wallets_address',), False)
+    yield ("add_airdrops_bulk skipping duplicates",
+           lambda db: db.add_airdrops_bulk([{'project_name': 'p1', 'network': 'net1', 'wallet_address': '0x1'}],
+                                           skip_duplicates=True),
+           ('idx_airdrops_project_wallet',), False)
+
+
+def main():
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(os.path.join(tmp, 'plans.db'))
+        # Give the planner statistics resembling a populated vault
+        db.add_nodes_bulk({'name': f'n{i}', 'address': f'10.0.{i // 256}.{i % 256}', 'network': f'net{i % 20}',
+                           'status': ('Active', 'Inactive', 'Syncing', 'Error')[i % 4]} for i in range(2000))
+        db.add_wallets_bulk({'name': f'w{i}', 'address': f'0x{i:040x}', 'network': f'net{i % 20}'}
+                            for i in range(2000))
+        db.add_airdrops_bulk({'project_name': f'p{i}', 'network': f'net{i % 20}', 'wallet_address': f'0x{i:040x}',
+                              'status': ('Active', 'Pending', 'Claimed')[i % 3],
+                              'end_date': f'2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}',
+                              'claim_date': f'2025-{(i + 3) % 12 + 1:02d}-{i % 28 + 1:02d}'} for i in range(2000))
+        db.execute("ANALYZE")
+        for label, call, indexes, sorts in cases():
+            statements = captured(db, call)
+            if not statements:
+                failures += 1
+                print(f"FAIL {label}\n     no statement captured")
+            for sql in statements:
+                plan = ' | '.join(db.explain(sql))
+                ok = (all(any(i in plan for i in (index if isinstance(index, tuple) else (index,)))
+                          for index in indexes)
+                      and (sorts or SORTED_BY_TEMP_TREE not in plan))
+                failures += not ok
+                print(f"{'ok  ' if ok else 'FAIL'} {label}\n     {' '.join(sql.split())}\n     {plan}")
+        db.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
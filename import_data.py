@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Node-Vault-Py - Bulk Import Command Line Tool
+Streams nodes, wallets or airdrops from CSV / JSON Lines files into the vault.
+
+Usage:
+    python import_data.py nodes fleet.csv
+    python import_data.py wallets wallets.jsonl --chunk-size 5000 --password
+"""
+import argparse
+import getpass
+import sqlite3
+import sys
+
+from src.database.db_manager import DatabaseManager
+from src.database.importer import FIELD_ALIASES, FORMATS, import_file
+from src.gui.authentication import PasswordChangePending, unlock_vault
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import records into Node-Vault-Py")
+    parser.add_argument('table', choices=sorted(FIELD_ALIASES), help="Table to import into")
+    parser.add_argument('file', help="CSV or JSON Lines file")
+    parser.add_argument('--format', choices=FORMATS, help="Input format (default: from file extension)")
+    parser.add_argument('--db', default='data/node_vault.db', help="Database path")
+    parser.add_argument('--chunk-size', type=int, default=1000, help="Rows per transaction")
+    parser.add_argument('--password', action='store_true',
+                        help="Prompt for the master password, to encrypt private keys with the vault key "
+                             "(required for wallets)")
+    args = parser.parse_args(argv)
+    if args.table == 'wallets' and not args.password:
+        # Without the vault key, private keys would be stored in plaintext
+        # and later fail to decrypt (and stop key rotation)
+        parser.error("importing wallets requires --password")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    key = None
+    if args.password:
+        try:
+            # Finishes an interrupted master password change first
+            key = unlock_vault(getpass.getpass("Master password: "), args.db)
+        except PasswordChangePending as e:
+            print(e, file=sys.stderr)
+            return 1
+        if key is None:
+            print("Wrong master password (or none enrolled yet)", file=sys.stderr)
+            return 1
+    db = DatabaseManager(args.db, master_key=key)
+
+    def report(stats, rate):
+        print(f"\r{stats['read']:>10} read  {stats['inserted']:>10} inserted  "
+              f"{stats['duplicates']:>8} duplicates  {rate:>9.0f} rows/s", end='', file=sys.stderr)
+
+    try:
+        stats = import_file(db, args.table, args.file, fmt=args.format,
+                            chunk_size=args.chunk_size, progress=report)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"\nImport failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+    print(file=sys.stderr)
+    print(f"Imported {stats['inserted']} {args.table} "
+          f"({stats['duplicates']} duplicates, {stats['skipped']} incomplete rows skipped)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,13 +14,16 @@ import os
 
 # Integrate authentication
 try:
-    from src.gui.authentication import require_auth
+    from src.gui.authentication import authenticate
 except Exception:
     # fallback if package-style import differs when running as script
     try:
-        from gui.authentication import require_auth  # type: ignore
+        from gui.authentication import authenticate  # type: ignore
     except Exception:
-        require_auth = None  # type: ignore
+        authenticate = None  # type: ignore
+
+from src.database.db_manager import DatabaseManager
+from src.services.db_executor import DbExecutor
 
 # Color scheme: Dark background with gold accents
 COLORS = {
@@ -35,6 +38,11 @@ COLORS = {
     'accent_red': '#FF4444'
 }
 
+# How often the dashboard checks the database for changes
+DASHBOARD_POLL_MS = 1000
+# Seconds between WAL checkpoints / PRAGMA optimize runs
+DB_MAINTENANCE_SECONDS = 600
+
 class NodeVaultPyApp:
     """
     Main application class for Node-Vault-Py
@@ -52,10 +60,12 @@ class NodeVaultPyApp:
         self.root.configure(bg=COLORS['bg_dark'])
 
         # Run authentication before showing main UI
+        # The key derived at login is kept for the session, so the KDF runs once
+        self.master_key = None
         self.root.withdraw()
-        if require_auth is not None:
-            ok = require_auth(self.root)
-            if not ok:
+        if authenticate is not None:
+            self.master_key = authenticate(self.root)
+            if self.master_key is None:
                 # User cancelled or failed authentication
                 self.root.destroy()
                 raise SystemExit(0)
@@ -66,6 +76,13 @@ class NodeVaultPyApp:
             )
         self.root.deiconify()
 
+        # Open the vault with the key unlocked at login
+        self.db_manager = DatabaseManager(master_key=self.master_key, maintenance_interval=DB_MAINTENANCE_SECONDS)
+        # Dashboard queries run on a reader thread, off the Tk main loop
+        self.db_executor = DbExecutor(widget=self.root, readers=1)
+        self._dashboard_token = None
+        self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+
         # Set up the UI
         self._setup_styles()
         self._create_header()
@@ -179,9 +196,55 @@ class NodeVaultPyApp:
         cards_frame.pack(fill='both', expand=True, padx=30, pady=10)
 
         # Create info cards
-        self._create_info_card(cards_frame, "Nodes", "0", "Active nodes tracked")
-        self._create_info_card(cards_frame, "Wallets", "0", "Wallets managed")
-        self._create_info_card(cards_frame, "Airdrops", "0", "Active campaigns")
+        self.dashboard_cards = {
+            'nodes': self._create_info_card(cards_frame, "Nodes", "0", "Active nodes tracked"),
+            'wallets': self._create_info_card(cards_frame, "Wallets", "0", "Wallets managed"),
+            'airdrops': self._create_info_card(cards_frame, "Airdrops", "0", "Active campaigns"),
+        }
+        self._refresh_dashboard()
+
+    def _refresh_dashboard(self):
+        """Update the dashboard cards when the database changed, then poll again
+
+        The figures come from counter rows kept up to date by triggers, and
+        are only re-read when the database change token moved. Both queries
+        run on the executor; the next poll is scheduled once they return.
+        """
+        self.db_executor.read(self._read_dashboard, self._dashboard_token, on_done=self._show_dashboard)
+
+    def _read_dashboard(self, seen_token):
+        """(change token, stats or None when unchanged); runs on an executor thread"""
+        token = self.db_manager.change_token()
+        return token, (self.db_manager.get_dashboard_stats() if token != seen_token else None)
+
+    def _show_dashboard(self, result, error):
+        if error is not None:
+            self._dashboard_token = None
+            self._set_card('nodes', '-', f"Dashboard refresh failed: {error}")
+        else:
+            token, stats = result
+            if stats is not None:
+                self._dashboard_token = token
+                self._set_card('nodes', stats['active_nodes'],
+                               f"Active of {stats['nodes']} nodes tracked")
+                self._set_card('wallets', stats['wallets'],
+                               f"{len(stats['wallets_by_network'])} networks | "
+                               f"Total balance {stats['total_balance']:,.4f}")
+                self._set_card('airdrops', stats['active_airdrops'],
+                               f"Active | {stats['pending_airdrops']} pending | "
+                               f"{stats['claimed_airdrops']} claimed | Est. ${stats['estimated_value']:,.2f}")
+        self.root.after(DASHBOARD_POLL_MS, self._refresh_dashboard)
+
+    def _on_closing(self):
+        """Let running queries finish, then close the database and its maintenance thread"""
+        self.db_executor.close()
+        self.db_manager.close()
+        self.root.destroy()
+
+    def _set_card(self, key, value, subtitle):
+        value_label, subtitle_label = self.dashboard_cards[key]
+        value_label.config(text=str(value))
+        subtitle_label.config(text=subtitle)
 
     def _create_info_card(self, parent, title, value, subtitle):
         """Create an info card widget"""
@@ -214,6 +277,7 @@ class NodeVaultPyApp:
             fg=COLORS['text_gray']
         )
         subtitle_label.pack(pady=(10, 20))
+        return value_label, subtitle_label
 
     def _create_nodes_tab(self):
         """Create the node management tab"""
@@ -6,6 +6,7 @@ Node-Vault-Py Source Package
 This package contains all the core modules for the Node-Vault-Py application:
 - gui: User interface components
 - database: Database operations and models
+- services: Background services (node health monitoring)
 - utils: Utility functions and helpers
 
 Author: Dali-Math
@@ -21,5 +22,6 @@ __license__ = "MIT"
 __all__ = [
     'gui',
     'database',
+    'services',
     'utils'
 ]
@@ -0,0 +1,470 @@
+"""Online backup, delta backups and checked restore of the vault database.
+
+Backups are taken with the SQLite backup API while the application keeps
+running: pages are copied in steps from a pinned read snapshot, so the copy
+is consistent and (in WAL mode) writers are never held up. The copy can be
+gzip-compressed and/or encrypted with the vault's data key. A restore is
+decoded next to the live database, must pass PRAGMA integrity_check, and
+only then replaces the database file.
+
+A delta backup holds only the nodes, wallets and airdrops rows changed or
+deleted since the previous backup (full or delta), read from the change
+log the schema keeps (see schema.TRACKED_TABLES). A restore takes the last
+full backup and replays the deltas taken after it; probe history and
+other derived tables are only in full backups.
+
+File formats, told apart by their first bytes:
+    SQLite database   - plain copy
+    gzip              - compressed copy, or a delta: JSON lines, a header
+                        {"format": "nvdelta", "vault", "from_seq", "to_seq",
+                        ...} then {"t": table, "row": {...}} or
+                        {"t": table, "delete": id} per changed row
+    NVBK1             - encrypted: a flags byte (1 = gzip inside), then
+                        records of a 4-byte length and a Fernet token (raw,
+                        not base64); each
+                        token holds (index, last) and up to CHUNK_SIZE bytes,
+                        so reordered or truncated files are rejected.
+
+A master password change replaces the data key. Restores accept the keys
+it retired (`retired`, see authentication.retired_data_keys()): files
+encrypted with one are decoded, and wallet keys stored under one are
+re-encrypted with the current key.
+"""
+
+import base64
+import json
+import os
+import sqlite3
+import struct
+import tempfile
+import zlib
+from itertools import islice
+
+from cryptography.fernet import InvalidToken, MultiFernet
+
+from .models import now_iso
+from .schema import SCHEMA_VERSION, TRACKED_TABLES, ensure_schema, stored_columns
+
+MAGIC = b'NVBK1\n'
+SQLITE_MAGIC = b'SQLite format 3\x00'
+GZIP_MAGIC = b'\x1f\x8b'
+FLAG_GZIP = 1
+
+CHUNK_SIZE = 1 << 20
+BACKUP_PAGES = 1024     # pages per backup step (4 MiB with 4 KiB pages)
+
+RECORD = struct.Struct('>I')
+CHUNK_HEADER = struct.Struct('>Q?')
+
+REQUIRED_TABLES = ('nodes', 'wallets', 'airdrops')
+DELTA_FORMAT = 'nvdelta'
+REPLAY_BATCH = 1000
+
+
+class BackupError(Exception):
+    """A backup file that cannot be read or fails its checks"""
+
+
+def _temp_path(directory, suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory or '.')
+    os.close(fd)
+    return path
+
+
+def _remove(path):
+    for name in (path, path + '-wal', path + '-shm', path + '-journal'):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+# Backup
+def snapshot(db_manager, dest, pages=BACKUP_PAGES, progress=None):
+    """Copy the live database into the SQLite file `dest`, `pages` pages per step.
+
+    `progress(done, total)` is called after each step with page counts.
+    Returns the change seq the copy includes at least. Call from a worker
+    thread: it uses that thread's connection.
+    """
+    target = sqlite3.connect(dest)
+    try:
+        with db_manager.transaction() as conn:
+            if db_manager.pragma('journal_mode') == 'wal':
+                # Pin one read snapshot for every step; without it, each commit
+                # from another connection would restart the copy from page 1
+                conn.execute("BEGIN")
+            seq = conn.execute("SELECT seq FROM change_counter").fetchone()[0]
+            conn.backup(target, pages=pages,
+                        progress=(lambda status, remaining, total: progress(total - remaining, total))
+                        if progress else None)
+        # The copy inherits the WAL flag; make it a self-contained single file
+        target.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        target.close()
+    return seq
+
+
+def _mark_backup(db_manager, seq, previous=None, full=False):
+    # Later deltas start from `seq`; after a full backup the older log
+    # entries are no longer needed by any delta
+    with db_manager.transaction() as conn:
+        if full:
+            conn.execute("UPDATE change_counter SET backup_seq = ?", (seq,))
+            conn.execute("DELETE FROM change_log WHERE seq <= ?", (seq,))
+        else:
+            conn.execute("UPDATE change_counter SET backup_seq = ? WHERE backup_seq = ?", (seq, previous))
+
+
+def backup_database(db_manager, dest, compress=False, crypto=None, pages=BACKUP_PAGES, progress=None,
+                    as_base=True):
+    """Write a consistent backup of the database to `dest` without stopping writers.
+
+    Args:
+        compress: gzip the copy
+        crypto: CryptoManager whose key encrypts the copy (normally db_manager.crypto)
+        progress: Callable(stage, done, total), stage 'copy' (pages) or 'write' (bytes)
+        as_base: Make this the backup the next delta starts from; False for
+            an extra copy that leaves the delta chain alone
+    """
+    directory = os.path.dirname(os.path.abspath(dest))
+    copy = _temp_path(directory, '.db')
+    try:
+        seq = snapshot(db_manager, copy, pages, progress and (lambda done, total: progress('copy', done, total)))
+        if not compress and crypto is None:
+            os.replace(copy, dest)
+            if as_base:
+                _mark_backup(db_manager, seq, full=True)
+            return
+        tmp = _temp_path(directory, '.tmp')
+        try:
+            with open(copy, 'rb') as src, open(tmp, 'wb') as out:
+                _encode(src, out, os.path.getsize(copy), compress, crypto, progress)
+            os.replace(tmp, dest)
+        except BaseException:
+            _remove(tmp)
+            raise
+        if as_base:
+            _mark_backup(db_manager, seq, full=True)
+    finally:
+        _remove(copy)
+
+
+def backup_delta(db_manager, dest, crypto=None, progress=None):
+    """Write the rows changed or deleted since the previous backup to `dest`.
+
+    The delta is gzip-compressed JSON lines, encrypted when `crypto` is
+    given. Raises BackupError if no full backup was taken yet. Returns the
+    header written plus the counts of rows and deletes in the delta.
+    Call from a worker thread: it uses that thread's connection.
+    """
+    directory = os.path.dirname(os.path.abspath(dest))
+    lines = _temp_path(directory, '.jsonl')
+    try:
+        with db_manager.transaction() as conn, open(lines, 'w', encoding='utf-8') as out:
+            # One read snapshot for the counter, the log and the rows
+            conn.execute("BEGIN")
+            to_seq, vault_id, from_seq = conn.execute(
+                "SELECT seq, vault_id, backup_seq FROM change_counter").fetchone()
+            if from_seq is None:
+                raise BackupError("No full backup to build a delta on; take a full backup first")
+            header = {'format': DELTA_FORMAT, 'version': 1, 'vault': vault_id, 'from_seq': from_seq,
+                      'to_seq': to_seq, 'schema': SCHEMA_VERSION, 'created': now_iso()}
+            out.write(json.dumps(header) + '\n')
+            counts = {'rows': 0, 'deleted': 0}
+            for table in TRACKED_TABLES:
+                columns = stored_columns(conn, table)
+                cursor = conn.execute(
+                    f"SELECT c.row_id, c.deleted, {', '.join('t.' + c for c in columns)} FROM change_log c "
+                    f"LEFT JOIN {table} t ON t.id = c.row_id WHERE c.tbl = ? AND c.seq > ?", (table, from_seq))
+                for row in cursor:
+                    if row[1] or row[2] is None:
+                        out.write(json.dumps({'t': table, 'delete': row[0]}) + '\n')
+                        counts['deleted'] += 1
+                    else:
+                        out.write(json.dumps({'t': table, 'row': dict(zip(columns, row[2:]))}) + '\n')
+                        counts['rows'] += 1
+        tmp = _temp_path(directory, '.tmp')
+        try:
+            with open(lines, 'rb') as src, open(tmp, 'wb') as out:
+                _encode(src, out, os.path.getsize(lines), True, crypto, progress)
+            os.replace(tmp, dest)
+        except BaseException:
+            _remove(tmp)
+            raise
+    finally:
+        _remove(lines)
+    _mark_backup(db_manager, to_seq, previous=from_seq)
+    return dict(header, **counts)
+
+
+def _encode(src, out, total, compress, crypto, progress):
+    packer = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None   # wbits 31: gzip framing
+    writer = _EncryptedWriter(out, crypto, compress) if crypto is not None else out
+    done = 0
+    while True:
+        data = src.read(CHUNK_SIZE)
+        if not data:
+            break
+        done += len(data)
+        writer.write(packer.compress(data) if packer else data)
+        if progress:
+            progress('write', done, total)
+    if packer:
+        writer.write(packer.flush())
+    if crypto is not None:
+        writer.close()
+
+
+class _EncryptedWriter:
+    """File-like writer emitting one Fernet record per CHUNK_SIZE bytes"""
+
+    def __init__(self, out, crypto, compressed):
+        self.out = out
+        self.cipher = crypto.cipher_suite
+        if self.cipher is None:
+            raise BackupError("No encryption key to encrypt the backup with")
+        self.index = 0
+        self.buffer = bytearray()
+        out.write(MAGIC + bytes([FLAG_GZIP if compressed else 0]))
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) > CHUNK_SIZE:
+            self._record(bytes(self.buffer[:CHUNK_SIZE]), False)
+            del self.buffer[:CHUNK_SIZE]
+
+    def close(self):
+        self._record(bytes(self.buffer), True)
+        self.buffer.clear()
+
+    def _record(self, data, last):
+        token = base64.urlsafe_b64decode(self.cipher.encrypt(CHUNK_HEADER.pack(self.index, last) + data))
+        self.out.write(RECORD.pack(len(token)) + token)
+        self.index += 1
+
+
+# Restore
+def prepare_restore(src, db_path, crypto=None, progress=None, retired=()):
+    """Decode the backup `src` next to `db_path` and check it.
+
+    Returns the path of the checked database, to be swapped in with
+    install_restore() once the live database is closed. Raises BackupError
+    if the file cannot be decoded or fails PRAGMA integrity_check.
+    `progress(stage, done, total)` reports bytes read ('read') and the
+    check ('check'). `retired` are CryptoManagers of data keys replaced
+    since `crypto`'s was made.
+    """
+    tmp = _temp_path(os.path.dirname(os.path.abspath(db_path)), '.restore')
+    try:
+        with open(src, 'rb') as f, open(tmp, 'wb') as out:
+            _decode(f, out, os.path.getsize(src), crypto, progress, retired)
+        if progress:
+            progress('check', 0, 1)
+        check_database(tmp)
+        if retired:
+            _rekey_wallets(tmp, crypto, retired)
+        if progress:
+            progress('check', 1, 1)
+        return tmp
+    except BaseException:
+        _remove(tmp)
+        raise
+
+
+def _decode(f, out, total, crypto, progress, retired=()):
+    head = f.read(len(MAGIC))
+    f.seek(0)
+    if head == MAGIC:
+        if crypto is None or crypto.cipher_suite is None:
+            raise BackupError("This backup is encrypted; a vault key is needed to restore it")
+        f.seek(len(MAGIC))
+        compressed = f.read(1)[0] & FLAG_GZIP
+        chunks = _decrypt_records(f, MultiFernet([crypto.cipher_suite] + [r.cipher_suite for r in retired]))
+    elif head.startswith(GZIP_MAGIC):
+        chunks, compressed = iter(lambda: f.read(CHUNK_SIZE), b''), True
+    elif head == SQLITE_MAGIC[:len(MAGIC)]:
+        chunks, compressed = iter(lambda: f.read(CHUNK_SIZE), b''), False
+    else:
+        raise BackupError("Not a Node-Vault-Py backup")
+    unpacker = zlib.decompressobj(31) if compressed else None
+    try:
+        for data in chunks:
+            out.write(unpacker.decompress(data) if unpacker else data)
+            if progress:
+                progress('read', f.tell(), total)
+        if unpacker:
+            out.write(unpacker.flush())
+            if not unpacker.eof:
+                raise BackupError("The backup is truncated")
+    except zlib.error as e:
+        raise BackupError(f"The backup is damaged: {e}")
+
+
+def _decrypt_records(f, cipher):
+    index = 0
+    while True:
+        size = f.read(RECORD.size)
+        if len(size) < RECORD.size:
+            raise BackupError("The backup is truncated")
+        token = f.read(RECORD.unpack(size)[0])
+        try:
+            plain = cipher.decrypt(base64.urlsafe_b64encode(token))
+        except (InvalidToken, ValueError):
+            raise BackupError("Cannot decrypt the backup (wrong vault key or damaged file)")
+        seq, last = CHUNK_HEADER.unpack_from(plain)
+        if seq != index:
+            raise BackupError("The backup is damaged (records out of order)")
+        yield plain[CHUNK_HEADER.size:]
+        if last:
+            return
+        index += 1
+
+
+def _rekey_wallets(path, crypto, retired):
+    """Re-encrypt with `crypto` the wallet keys of `path` stored under a retired key"""
+    conn = sqlite3.connect(path)
+    try:
+        updates = []
+        for wallet_id, token in conn.execute("SELECT id, private_key FROM wallets WHERE private_key != ''"):
+            try:
+                crypto.decrypt(token)
+                continue
+            except InvalidToken:
+                pass
+            for old in retired:
+                try:
+                    updates.append((crypto.encrypt(old.decrypt(token)), wallet_id))
+                    break
+                except InvalidToken:
+                    pass
+        if updates:
+            with conn:
+                conn.executemany("UPDATE wallets SET private_key = ? WHERE id = ?", updates)
+    finally:
+        conn.close()
+
+
+def _decode_delta(src, directory, crypto, retired=()):
+    """Decode a delta file to a temporary JSON lines file; returns (header, path)"""
+    tmp = _temp_path(directory, '.jsonl')
+    try:
+        with open(src, 'rb') as f, open(tmp, 'wb') as out:
+            _decode(f, out, os.path.getsize(src), crypto, None, retired)
+        with open(tmp, encoding='utf-8') as f:
+            try:
+                header = json.loads(f.readline())
+            except ValueError:
+                header = None
+        if not isinstance(header, dict) or header.get('format') != DELTA_FORMAT:
+            raise BackupError(f"{os.path.basename(src)} is not a delta backup")
+        return header, tmp
+    except BaseException:
+        _remove(tmp)
+        raise
+
+
+def prepare_chain_restore(base, deltas, db_path, crypto=None, progress=None, retired=()):
+    """Restore the full backup `base`, replay `deltas` on it and check the result.
+
+    The deltas may be given in any order; those already contained in the
+    base are skipped, and a missing link or a delta of another vault raises
+    BackupError. Returns the path of the checked database, for
+    install_restore(). `progress(stage, done, total)` also reports the
+    deltas replayed ('replay'). `retired` is as for prepare_restore().
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    tmp = prepare_restore(base, db_path, crypto, progress, retired)
+    decoded = []
+    try:
+        for path in deltas:
+            decoded.append(_decode_delta(path, directory, crypto, retired))
+        decoded.sort(key=lambda item: (item[0]['from_seq'], item[0]['to_seq']))
+        conn = sqlite3.connect(tmp)
+        try:
+            # Bring an older base up to the schema the deltas were written with
+            ensure_schema(conn)
+            seq, vault_id = conn.execute("SELECT seq, vault_id FROM change_counter").fetchone()
+            for i, (header, lines) in enumerate(decoded):
+                if header['vault'] != vault_id:
+                    raise BackupError("A delta backup belongs to another vault than the base")
+                if header['to_seq'] <= seq:
+                    continue
+                if header['from_seq'] > seq:
+                    raise BackupError(f"A delta backup is missing: changes {seq + 1} to "
+                                      f"{header['from_seq']} are not in any file given")
+                with conn:
+                    _replay(conn, lines)
+                seq = header['to_seq']
+                if progress:
+                    progress('replay', i + 1, len(decoded))
+            # The restored file starts a new chain: its next delta needs a full backup first
+            with conn:
+                conn.execute("UPDATE change_counter SET seq = max(seq, ?), backup_seq = NULL", (seq,))
+                conn.execute("DELETE FROM change_log")
+        finally:
+            conn.close()
+        if retired and decoded:
+            _rekey_wallets(tmp, crypto, retired)
+        check_database(tmp)
+        return tmp
+    except BaseException:
+        _remove(tmp)
+        raise
+    finally:
+        for _, lines in decoded:
+            _remove(lines)
+
+
+def _replay(conn, lines):
+    # A row appears at most once per delta, so a batch can be grouped by
+    # table and operation without changing the outcome
+    columns = {table: set(stored_columns(conn, table)) for table in TRACKED_TABLES}
+    with open(lines, encoding='utf-8') as f:
+        f.readline()
+        while True:
+            batch = [json.loads(line) for line in islice(f, REPLAY_BATCH)]
+            if not batch:
+                break
+            groups = {}
+            for item in batch:
+                if item['t'] not in columns:
+                    raise BackupError(f"Unknown table {item['t']!r} in a delta backup")
+                if 'delete' in item:
+                    groups.setdefault((item['t'], None), []).append((item['delete'],))
+                else:
+                    row = {k: v for k, v in item['row'].items() if k in columns[item['t']]}
+                    groups.setdefault((item['t'], tuple(row)), []).append(tuple(row.values()))
+            for (table, names), rows in groups.items():
+                if names is None:
+                    conn.executemany(f"DELETE FROM {table} WHERE id = ?", rows)
+                else:
+                    updates = ', '.join(f"{n} = excluded.{n}" for n in names if n != 'id')
+                    conn.executemany(f"INSERT INTO {table} ({', '.join(names)}) VALUES "
+                                     f"({', '.join('?' * len(names))}) ON CONFLICT(id) DO UPDATE SET {updates}",
+                                     rows)
+
+
+def check_database(path):
+    """Raise BackupError unless `path` is an intact Node-Vault-Py database."""
+    try:
+        conn = sqlite3.connect(path)
+        try:
+            problems = [row[0] for row in conn.execute("PRAGMA integrity_check")]
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        finally:
+            conn.close()
+    except sqlite3.DatabaseError as e:
+        raise BackupError(f"The backup is not a valid database: {e}")
+    if problems != ['ok']:
+        raise BackupError("The backup failed its integrity check: " + '; '.join(problems[:5]))
+    missing = [t for t in REQUIRED_TABLES if t not in tables]
+    if missing:
+        raise BackupError(f"The backup has no {', '.join(missing)} table")
+
+
+def install_restore(checked_path, db_path):
+    """Replace `db_path` by a file from prepare_restore(); all its connections must be closed."""
+    for suffix in ('-wal', '-shm'):
+        # A log left by the old database must never be replayed into the new one
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+    os.replace(checked_path, db_path)
@@ -1,79 +1,573 @@
-import sqlite3, os, base64
-from datetime import datetime
-from .models import NodeModel, WalletModel, AirdropModel
+import sqlite3, os, re, base64, threading, time, unicodedata, weakref
+from contextlib import contextmanager
+from itertools import islice
+from .models import NodeModel, WalletModel, AirdropModel, now_iso
+from .schema import ensure_schema, FOLD_COLUMNS, FTS_COLUMNS
+from cryptography.fernet import InvalidToken
 from src.utils.encryption import CryptoManager
 
+# Connection profiles: PRAGMAs applied to every new connection, in order.
+#   wal     - the default. Readers never wait for the writer and commits only
+#             fsync at checkpoints (synchronous=NORMAL: a power cut may lose the
+#             last transactions but never corrupts the file). 16 MiB page cache
+#             and 128 MiB of memory-mapped reads per connection.
+#   durable - wal, but every commit is fsynced (synchronous=FULL).
+#   legacy  - SQLite's defaults (rollback journal, 2 MiB cache, no mmap), kept
+#             for comparison in benchmarks/bench_pragma_profiles.py.
+# busy_timeout makes a connection retry for up to 5 s on a locked database
+# instead of failing at once; WAL still needs it for concurrent writers.
+PRAGMA_PROFILES = {
+    'wal': (('journal_mode', 'WAL'), ('synchronous', 'NORMAL'), ('cache_size', -16384),
+            ('mmap_size', 128 * 1024 * 1024), ('busy_timeout', 5000), ('temp_store', 'MEMORY')),
+    'durable': (('journal_mode', 'WAL'), ('synchronous', 'FULL'), ('cache_size', -16384),
+                ('mmap_size', 128 * 1024 * 1024), ('busy_timeout', 5000), ('temp_store', 'MEMORY')),
+    'legacy': (('journal_mode', 'DELETE'), ('synchronous', 'FULL'), ('cache_size', -2000),
+               ('mmap_size', 0), ('busy_timeout', 5000)),
+}
+
+def _close_connection(conn):
+    try:
+        if conn.in_transaction:
+            conn.commit()
+        conn.close()
+    except sqlite3.ProgrammingError:
+        pass
+
+
+class _ThreadConnection:
+    # Held only by its thread's threading.local, so it is collected when the
+    # thread exits and its finalizer (`close`) closes the connection
+    __slots__ = ('conn', 'close', '__weakref__')
+
+
 class DatabaseManager:
-    def __init__(self, db_path='data/node_vault.db', encryption_key=None):
+    def __init__(self, db_path='data/node_vault.db', encryption_key=None, master_key=None,
+                 profile='wal', maintenance_interval=None):
+        # profile names an entry of PRAGMA_PROFILES; maintenance_interval (seconds)
+        # starts a background thread checkpointing the WAL and running PRAGMA optimize
+        # master_key is the data key returned by the login dialog; encryption_key
+        # (a password, salted per instance) is kept for throwaway databases
         self.db_path = db_path
-        self.crypto = CryptoManager(encryption_key)
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.crypto = CryptoManager(key=master_key) if master_key else CryptoManager(encryption_key)
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # One long-lived connection per thread; sqlite3 connections must not be
+        # shared between threads that may use them concurrently. Connections of
+        # threads that have exited are closed; close() closes the rest.
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self.pragmas = PRAGMA_PROFILES[profile]
         self.init_database()
+        self._maintenance = None
+        if maintenance_interval:
+            self.start_maintenance(maintenance_interval)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def pragma(self, name):
+        """Current value of a PRAGMA on this thread's connection"""
+        return self.conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    # Maintenance: SQLite checkpoints the WAL by itself after ~1000 pages, but
+    # not while readers hold old snapshots, and it never truncates the file;
+    # PRAGMA optimize refreshes the planner statistics of tables that changed.
+    def maintain(self, checkpoint='PASSIVE'):
+        """Checkpoint the WAL and run PRAGMA optimize; returns (busy, wal pages, checkpointed pages)"""
+        conn = self.conn
+        result = tuple(conn.execute(f"PRAGMA wal_checkpoint({checkpoint})").fetchone())
+        conn.execute("PRAGMA optimize")
+        return result
+
+    def start_maintenance(self, interval=600):
+        if self._maintenance is not None:
+            return
+        stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.maintain('TRUNCATE')
+                except sqlite3.Error:
+                    pass    # busy or closing; try again next round
+
+        thread = threading.Thread(target=run, name='db-maintenance', daemon=True)
+        self._maintenance = (thread, stop)
+        thread.start()
+
+    def stop_maintenance(self):
+        if self._maintenance is None:
+            return
+        thread, stop = self._maintenance
+        self._maintenance = None
+        stop.set()
+        thread.join()
+
+    @property
+    def conn(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = _ThreadConnection()
+            holder.conn = self._connect()
+            holder.close = weakref.finalize(holder, _close_connection, holder.conn)
+            self._local.holder = holder
+            self._local.depth = 0
+            with self._lock:
+                self._connections.add(holder)
+        return holder.conn
+
+    def close(self):
+        self.stop_maintenance()
+        with self._lock:
+            holders, self._connections = list(self._connections), weakref.WeakSet()
+        if holders:
+            try:
+                holders[0].conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+        for holder in holders:
+            holder.close()
+        self._local = threading.local()
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one commit; nested blocks join the outer one."""
+        conn = self.conn
+        self._local.depth += 1
+        try:
+            yield conn
+        except BaseException:
+            self._local.depth -= 1
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+            raise
+        self._local.depth -= 1
+        if self._local.depth == 0 and conn.in_transaction:
+            conn.commit()
 
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""CREATE TABLE IF NOT EXISTS nodes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, 
-            address TEXT NOT NULL, network TEXT, port TEXT, status TEXT, 
-            last_sync TEXT, notes TEXT, created_date TEXT, updated_date TEXT)""")
-        cursor.execute("""CREATE TABLE IF NOT EXISTS wallets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, 
-            address TEXT NOT NULL, network TEXT, type TEXT, balance TEXT, 
-            private_key TEXT, notes TEXT, created_date TEXT, updated_date TEXT)""")
-        cursor.execute("""CREATE TABLE IF NOT EXISTS airdrops (
-            id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL, 
-            network TEXT NOT NULL, airdrop_type TEXT, eligibility_requirements TEXT, 
-            start_date TEXT, end_date TEXT, claim_date TEXT, status TEXT, 
-            estimated_value TEXT, wallet_address TEXT, tasks_completed TEXT, 
-            notes TEXT, created_date TEXT, updated_date TEXT)""")
-        conn.commit()
-        conn.close()
+        ensure_schema(self.conn)
+
+    def explain(self, query, params=None):
+        """Return the EXPLAIN QUERY PLAN detail lines for `query`."""
+        return [row['detail'] for row in self.conn.execute("EXPLAIN QUERY PLAN " + query, params or [])]
 
     def execute(self, query, params=None, fetch=False):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute(query, params or [])
-        conn.commit()
-        rows = cur.fetchall() if fetch else None
-        conn.close()
+        conn = self.conn
+        try:
+            cur = conn.execute(query, params or [])
+            rows = cur.fetchall() if fetch else None
+        except Exception:
+            if self._local.depth == 0 and conn.in_transaction:
+                conn.rollback()
+            raise
+        # Plain SELECTs never open a transaction, so only writes pay for a commit.
+        if self._local.depth == 0 and conn.in_transaction:
+            conn.commit()
         return [dict(row) for row in rows] if rows else None
 
+    def _bulk_insert(self, sql, rows, chunk_size=1000, progress=None):
+        """executemany() `rows` in chunks inside a single transaction.
+
+        `progress(inserted, rows_per_sec)` is called after every chunk; the
+        number of inserted rows is returned.
+        """
+        rows = iter(rows)
+        inserted, start = 0, time.perf_counter()
+        with self.transaction() as conn:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                # rowcount, unlike total_changes, leaves out rows written by
+                # the full-text search triggers
+                inserted += conn.executemany(sql, chunk).rowcount
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    progress(inserted, inserted / elapsed if elapsed else 0.0)
+        return inserted
+
+    @staticmethod
+    def _insert_unique(sql, table, key_columns):
+        """Rewrite a plain INSERT ... VALUES so rows whose key already exists are skipped."""
+        head, values = sql.split('VALUES')
+        count = values.count('?')
+        columns = [c.strip() for c in head[head.index('(') + 1:head.rindex(')')].split(',')]
+        placeholders = ', '.join(f'?{i}' for i in range(1, count + 1))
+        match = ' AND '.join(f'{c} = ?{columns.index(c) + 1}' for c in key_columns)
+        return f"{head} SELECT {placeholders} WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {match})"
+
+    # Keyset pagination
+    SORT_COLUMNS = {
+        'nodes': ('id', 'name_fold', 'address', 'network', 'status'),
+        'wallets': ('id', 'name_fold', 'address', 'network'),
+        'airdrops': ('id', 'project_fold', 'network', 'status', 'end_date', 'wallet_address'),
+    }
+
+    def _search_clause(self, table, search):
+        if not search:
+            return [], []
+        pattern = '%' + search.lower().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        folds = FOLD_COLUMNS[table]
+        return ['(' + ' OR '.join(f"{c} LIKE ? ESCAPE '\\'" for c in folds) + ')'], [pattern] * len(folds)
+
+    def get_page(self, table, after=None, limit=200, order_by='id', descending=False, search=None, offset=0):
+        """Return up to `limit` rows of `table` following the cursor `after`.
+
+        Rows are ordered by (`order_by`, id) so the order is total even when
+        the sort column has duplicates or NULLs. Pass page_cursor() of the last
+        row returned to fetch the next page; `search` restricts the page to
+        rows whose case-folded text columns contain it. `offset` is only for
+        jumping to a position with no known cursor and requires `after=None`.
+        """
+        if order_by not in self.SORT_COLUMNS.get(table, ()):
+            raise ValueError(f"Cannot page {table!r} by {order_by!r}")
+        if offset and after is not None:
+            raise ValueError("Use either a cursor or an offset, not both")
+        where, params = self._search_clause(table, search)
+        cmp = '<' if descending else '>'
+        # Each segment is one index range scan; NULL sort keys (first when
+        # ascending, last when descending) are read by a separate segment
+        # so no query needs an OR that would defeat the index.
+        if after is None:
+            segments = [(None, [])]
+        elif order_by == 'id':
+            segments = [(f"id {cmp} ?", [after[1]])]
+        elif after[0] is None:
+            segments = [(f"{order_by} IS NULL AND id {cmp} ?", [after[1]])]
+            if not descending:
+                segments.append((f"{order_by} IS NOT NULL", []))
+        else:
+            segments = [(f"({order_by}, id) {cmp} (?, ?)", list(after))]
+            if descending:
+                segments.append((f"{order_by} IS NULL", []))
+        direction = 'DESC' if descending else 'ASC'
+        order = f"id {direction}" if order_by == 'id' else f"{order_by} {direction}, id {direction}"
+        rows = []
+        for condition, extra in segments:
+            clauses = where + ([condition] if condition else [])
+            query = (f"SELECT * FROM {table}" + (" WHERE " + " AND ".join(clauses) if clauses else "")
+                     + f" ORDER BY {order} LIMIT ? OFFSET ?")
+            rows += self.execute(query, params + extra + [limit - len(rows), offset], fetch=True) or []
+            if len(rows) >= limit:
+                break
+        return rows
+
+    def count_rows(self, table, search=None):
+        where, params = self._search_clause(table, search)
+        query = f"SELECT COUNT(*) AS n FROM {table}" + (" WHERE " + " AND ".join(where) if where else "")
+        return self.execute(query, params, fetch=True)[0]['n']
+
+    @staticmethod
+    def page_cursor(row, order_by='id'):
+        return (row.get(order_by), row['id'])
+
+    def iter_rows(self, table, batch_size=1000, order_by='id'):
+        """Yield every row of `table` one keyset page at a time."""
+        after = None
+        while True:
+            rows = self.get_page(table, after, batch_size, order_by)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            after = self.page_cursor(rows[-1], order_by)
+
+    # Dashboard
+    def get_dashboard_stats(self):
+        """Dashboard aggregates, read from the trigger-maintained stats_counters table.
+
+        The table holds one row per status/network, so this never scans the
+        record tables however large they grow.
+        """
+        groups = {}
+        for row in self.conn.execute("SELECT metric, grp, count, total FROM stats_counters"):
+            groups.setdefault(row['metric'], {})[row['grp']] = (row['count'], row['total'])
+        nodes = groups.get('nodes_by_status', {})
+        wallets = groups.get('wallets_by_network', {})
+        airdrops = groups.get('airdrops_by_status', {})
+        return {
+            'nodes': sum(c for c, _ in nodes.values()),
+            'nodes_by_status': {k: c for k, (c, _) in nodes.items()},
+            'active_nodes': nodes.get('Active', (0, 0))[0],
+            'wallets': sum(c for c, _ in wallets.values()),
+            'wallets_by_network': {k: c for k, (c, _) in wallets.items()},
+            'total_balance': sum(t for _, t in wallets.values()),
+            'airdrops': sum(c for c, _ in airdrops.values()),
+            'airdrops_by_status': {k: c for k, (c, _) in airdrops.items()},
+            'active_airdrops': airdrops.get('Active', (0, 0))[0],
+            'pending_airdrops': airdrops.get('Pending', (0, 0))[0],
+            'claimed_airdrops': airdrops.get('Claimed', (0, 0))[0],
+            'estimated_value': sum(t for _, t in airdrops.values()),
+        }
+
+    def change_token(self):
+        """A value that changes whenever the database does, cheap enough to poll.
+
+        PRAGMA data_version moves on commits from other connections (the
+        background services); total_changes counts this thread's own writes.
+        """
+        conn = self.conn
+        return conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes
+
+    # Full-text search
+    # Only this many best-ranked candidates per table are joined back to
+    # their rows, so very broad queries such as a single letter only fetch
+    # that many (every match is still scored to find them)
+    SEARCH_CANDIDATES = 1000
+    # The unicode61 tokenizer's token characters: letters and digits (so not
+    # '_', which \w would include) plus its '.:' token characters
+    SEARCH_TOKEN = re.compile(r'(?:[^\W_]|[.:])+')
+
+    @classmethod
+    def search_tokens(cls, text):
+        """Split text into tokens as the FTS tokenizer does: case-folded, diacritics removed."""
+        decomposed = unicodedata.normalize('NFD', text.lower())
+        return cls.SEARCH_TOKEN.findall(''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+    @classmethod
+    def fts_query(cls, text):
+        """Turn free text into an FTS5 query: every term must match, the last token as a prefix."""
+        phrases = []
+        for term in text.split():
+            tokens = cls.search_tokens(term)
+            if tokens:
+                phrases.append('"' + ' '.join(tokens) + '"*')
+        return ' '.join(phrases)
+
+    def search(self, query, tables=('nodes', 'wallets', 'airdrops'), limit=100):
+        """Return up to `limit` rows matching `query`, best bm25 rank first.
+
+        Each row carries the name of its `table` and its `rank` (lower is
+        better), so results from several tables can be merged.
+        """
+        match = self.fts_query(query)
+        if not match:
+            return []
+        results = []
+        for table in tables:
+            if table not in FTS_COLUMNS:
+                raise ValueError(f"Unknown table: {table!r}")
+            rows = self.execute(f"""SELECT t.*, '{table}' AS "table", m.rank FROM (
+                                        SELECT rowid, bm25({table}_fts) AS rank FROM {table}_fts
+                                        WHERE {table}_fts MATCH ? ORDER BY rank LIMIT ?) m
+                                    JOIN {table} t ON t.id = m.rowid ORDER BY m.rank LIMIT ?""",
+                                (match, max(limit, self.SEARCH_CANDIDATES), limit), fetch=True) or []
+            results.extend(rows)
+        results.sort(key=lambda r: r['rank'])
+        return results[:limit]
+
     # Node CRUD
+    NODE_INSERT = """INSERT INTO nodes (name,address,network,port,status,last_sync,notes,created_date,updated_date) 
+                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    def _node_row(self, node):
+        node = NodeModel(**node)
+        now = now_iso()
+        return (node.name, node.address, node.network, node.port, node.status, 
+                node.last_sync or now, node.notes, now, now)
     def add_node(self, node: dict):
+        return self.execute(self.NODE_INSERT, self._node_row(node))
+    def add_nodes_bulk(self, nodes, chunk_size=1000, progress=None, skip_duplicates=False):
+        sql = self._insert_unique(self.NODE_INSERT, 'nodes', ('address',)) if skip_duplicates else self.NODE_INSERT
+        return self._bulk_insert(sql, (self._node_row(n) for n in nodes), chunk_size, progress)
+    def update_node(self, node_id, node: dict):
         node = NodeModel(**node)
-        return self.execute("""INSERT INTO nodes (name,address,network,port,status,last_sync,notes,created_date,updated_date) 
-                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (node.name, node.address, node.network, node.port, node.status, 
-             datetime.now(), node.notes, datetime.now(), datetime.now()))
+        self.execute("""UPDATE nodes SET name=?, address=?, network=?, port=?, status=?, last_sync=?, notes=?, updated_date=?
+                        WHERE id=?""",
+            (node.name, node.address, node.network, node.port, node.status, node.last_sync, node.notes, now_iso(), node_id))
+    def get_node(self, node_id):
+        rows = self.execute("SELECT * FROM nodes WHERE id=?", (node_id,), fetch=True)
+        return rows[0] if rows else None
     def delete_node(self, node_id): self.execute("DELETE FROM nodes WHERE id=?", (node_id,))
     def get_all_nodes(self): return self.execute("SELECT * FROM nodes", fetch=True)
+    def get_nodes_page(self, after=None, limit=200, order_by='id', descending=False, search=None, offset=0):
+        return self.get_page('nodes', after, limit, order_by, descending, search, offset)
+    def update_node_health(self, results):
+        """Write (node_id, status, last_sync) probe results in one transaction.
+
+        status is only written when it changed, since it is indexed for
+        full-text search; a None last_sync keeps the previous value.
+        """
+        results = list(results)
+        with self.transaction() as conn:
+            conn.executemany("UPDATE nodes SET status=?1 WHERE id=?2 AND status IS NOT ?1",
+                             [(status, node_id) for node_id, status, _ in results])
+            conn.executemany("UPDATE nodes SET last_sync=? WHERE id=?",
+                             [(last_sync, node_id) for node_id, _, last_sync in results if last_sync])
 
     # Wallet CRUD
+    WALLET_INSERT = """INSERT INTO wallets (name,address,network,type,balance,private_key,notes,created_date,updated_date) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    def _wallet_row(self, wallet, priv=None):
+        if isinstance(wallet, dict):
+            wallet = WalletModel(**wallet)
+        if priv is None:
+            priv = self.crypto.encrypt(wallet.private_key) if wallet.private_key else ''
+        now = now_iso()
+        return (wallet.name, wallet.address, wallet.network, wallet.type, wallet.balance, 
+                priv, wallet.notes, now, now)
+    def _wallet_rows(self, wallets, chunk_size):
+        # Validate a chunk, then encrypt its private keys in parallel
+        wallets = iter(wallets)
+        while True:
+            models = [WalletModel(**w) for w in islice(wallets, chunk_size)]
+            if not models:
+                return
+            keys = self.crypto.encrypt_many(m.private_key for m in models)
+            for model, priv in zip(models, keys):
+                yield self._wallet_row(model, priv or '')
     def add_wallet(self, wallet: dict):
+        return self.execute(self.WALLET_INSERT, self._wallet_row(wallet))
+    def add_wallets_bulk(self, wallets, chunk_size=1000, progress=None, skip_duplicates=False):
+        sql = self._insert_unique(self.WALLET_INSERT, 'wallets', ('address',)) if skip_duplicates else self.WALLET_INSERT
+        return self._bulk_insert(sql, self._wallet_rows(wallets, chunk_size), chunk_size, progress)
+    def delete_wallet(self, wallet_id): self.execute("DELETE FROM wallets WHERE id=?", (wallet_id,))
+    def update_wallet(self, wallet_id, wallet: dict):
         wallet = WalletModel(**wallet)
         priv = self.crypto.encrypt(wallet.private_key) if wallet.private_key else ''
-        return self.execute("""INSERT INTO wallets (name,address,network,type,balance,private_key,notes,created_date,updated_date) 
-                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-            (wallet.name, wallet.address, wallet.network, wallet.type, wallet.balance, 
-             priv, wallet.notes, datetime.now(), datetime.now()))
-    def delete_wallet(self, wallet_id): self.execute("DELETE FROM wallets WHERE id=?", (wallet_id,))
-    def get_all_wallets(self):
-        wallets = self.execute("SELECT * FROM wallets", fetch=True) or []
-        for w in wallets:
-            if w.get('private_key'):
-                w['private_key'] = self.crypto.decrypt(w['private_key'])
-        return wallets
+        self.execute("""UPDATE wallets SET name=?, address=?, network=?, type=?, balance=?, private_key=?, notes=?, updated_date=?
+                        WHERE id=?""",
+            (wallet.name, wallet.address, wallet.network, wallet.type, wallet.balance, priv, wallet.notes, now_iso(), wallet_id))
+    # List queries return private keys still encrypted: decrypting every row
+    # costs a Fernet HMAC+AES pass each and would keep plaintext keys in memory
+    # for the session. Use get_wallet(..., decrypt=True) for the one key needed.
+    def get_all_wallets(self): return self.execute("SELECT * FROM wallets", fetch=True) or []
+    def get_wallets_page(self, after=None, limit=200, order_by='id', descending=False, search=None, offset=0):
+        return self.get_page('wallets', after, limit, order_by, descending, search, offset)
+    def update_wallet_balances(self, balances):
+        """Write (balance, wallet_id) pairs in one transaction."""
+        now = now_iso()
+        with self.transaction() as conn:
+            conn.executemany("UPDATE wallets SET balance=?, updated_date=? WHERE id=?",
+                             [(balance, now, wallet_id) for balance, wallet_id in balances])
+    def get_wallet(self, wallet_id, decrypt=False):
+        rows = self.execute("SELECT * FROM wallets WHERE id=?", (wallet_id,), fetch=True)
+        if not rows:
+            return None
+        wallet = rows[0]
+        if decrypt:
+            wallet['private_key'] = self.decrypt_private_key(wallet.get('private_key'))
+        return wallet
+    def decrypt_private_key(self, ciphertext):
+        return self.crypto.decrypt(ciphertext) if ciphertext else ''
+
+    # Key rotation
+    ROTATION_CHECK = 'node-vault key rotation'
+    def pending_key_rotation(self):
+        """Return the state of an interrupted rotation ({last_id, started}) or None."""
+        rows = self.execute("SELECT last_id, started FROM key_rotation WHERE id=1", fetch=True)
+        return rows[0] if rows else None
+    def rotate_encryption_key(self, new_crypto, batch_size=500, workers=None, progress=None):
+        """Re-encrypt every wallet private key from self.crypto to `new_crypto`.
+
+        Wallets are read in id-ordered batches, decrypted and re-encrypted on
+        a thread pool, and each batch is written in its own transaction along
+        with the last id done. If the process dies part-way, call this again
+        with the same old and new keys and it carries on from that id.
+        `progress(done, total)` is called after every batch; the number of
+        wallets re-encrypted is returned and self.crypto is switched to
+        `new_crypto` once all are done.
+
+        A new rotation first checks that self.crypto opens a stored key, so a
+        wrong key raises InvalidToken before any rotation state is recorded.
+        If only `new_crypto` opens it, an earlier rotation already finished
+        (its caller stopped before switching keys) and nothing is rewritten.
+        """
+        state = self.execute("SELECT last_id, check_token FROM key_rotation WHERE id=1", fetch=True)
+        if state:
+            try:
+                new_crypto.decrypt(state[0]['check_token'])
+            except InvalidToken:
+                raise ValueError("An interrupted key rotation must be resumed with the same new key")
+            last_id = state[0]['last_id']
+        else:
+            sample = self.execute("SELECT private_key FROM wallets WHERE private_key != '' ORDER BY id LIMIT 1",
+                                  fetch=True)
+            if sample:
+                try:
+                    self.crypto.decrypt(sample[0]['private_key'])
+                except InvalidToken:
+                    # Raises InvalidToken too when neither key fits
+                    new_crypto.decrypt(sample[0]['private_key'])
+                    self.crypto = new_crypto
+                    return 0
+            last_id = 0
+            self.execute("INSERT INTO key_rotation (id, last_id, check_token, started) VALUES (1, 0, ?, ?)",
+                         (new_crypto.encrypt(self.ROTATION_CHECK), now_iso()))
+        total = self.execute("SELECT COUNT(*) AS n FROM wallets", fetch=True)[0]['n']
+        done = self.execute("SELECT COUNT(*) AS n FROM wallets WHERE id <= ?", (last_id,), fetch=True)[0]['n']
+        rotated = 0
+        while True:
+            with self.transaction() as conn:
+                rows = conn.execute("SELECT id, private_key FROM wallets WHERE id > ? ORDER BY id LIMIT ?",
+                                    (last_id, batch_size)).fetchall()
+                if not rows:
+                    conn.execute("DELETE FROM key_rotation WHERE id=1")
+                    break
+                plain = self.crypto.decrypt_many((row['private_key'] for row in rows), workers)
+                keys = new_crypto.encrypt_many(plain, workers)
+                conn.executemany("UPDATE wallets SET private_key=? WHERE id=?",
+                                 [(key or '', row['id']) for key, row in zip(keys, rows)])
+                last_id = rows[-1]['id']
+                conn.execute("UPDATE key_rotation SET last_id=? WHERE id=1", (last_id,))
+            rotated += len(rows)
+            done += len(rows)
+            if progress:
+                progress(done, max(total, done))
+        self.crypto = new_crypto
+        return rotated
 
     # Airdrop CRUD
-    def add_airdrop(self, airdrop: dict):
+    AIRDROP_INSERT = """INSERT INTO airdrops (project_name,network,airdrop_type,eligibility_requirements,start_date,end_date,
+                        claim_date,status,estimated_value,wallet_address,tasks_completed,notes,created_date,updated_date)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
+    def _airdrop_row(self, airdrop):
         airdrop = AirdropModel(**airdrop)
-        return self.execute("""INSERT INTO airdrops (project_name,network,airdrop_type,eligibility_requirements,start_date,end_date,
-                           claim_date,status,estimated_value,wallet_address,tasks_completed,notes,created_date,updated_date)
-                           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-           (airdrop.project_name, airdrop.network, airdrop.airdrop_type, airdrop.eligibility_requirements,
-            airdrop.start_date, airdrop.end_date, airdrop.claim_date, airdrop.status,
-            airdrop.estimated_value, airdrop.wallet_address, airdrop.tasks_completed, airdrop.notes, datetime.now(), datetime.now()))
+        now = now_iso()
+        return (airdrop.project_name, airdrop.network, airdrop.airdrop_type, airdrop.eligibility_requirements,
+                airdrop.start_date, airdrop.end_date, airdrop.claim_date, airdrop.status,
+                airdrop.estimated_value, airdrop.wallet_address, airdrop.tasks_completed, airdrop.notes, now, now)
+    def add_airdrop(self, airdrop: dict):
+        """Insert an airdrop and return its id."""
+        with self.transaction() as conn:
+            return conn.execute(self.AIRDROP_INSERT, self._airdrop_row(airdrop)).lastrowid
+    def add_airdrops_bulk(self, airdrops, chunk_size=1000, progress=None, skip_duplicates=False):
+        sql = self._insert_unique(self.AIRDROP_INSERT, 'airdrops', ('project_name', 'wallet_address')) if skip_duplicates else self.AIRDROP_INSERT
+        return self._bulk_insert(sql, (self._airdrop_row(a) for a in airdrops), chunk_size, progress)
     def delete_airdrop(self, airdrop_id): self.execute("DELETE FROM airdrops WHERE id=?", (airdrop_id,))
+    def update_airdrop(self, airdrop_id, airdrop: dict):
+        airdrop = AirdropModel(**airdrop)
+        self.execute("""UPDATE airdrops SET project_name=?, network=?, airdrop_type=?, eligibility_requirements=?,
+                        start_date=?, end_date=?, claim_date=?, status=?, estimated_value=?, wallet_address=?,
+                        tasks_completed=?, notes=?, updated_date=? WHERE id=?""",
+            (airdrop.project_name, airdrop.network, airdrop.airdrop_type, airdrop.eligibility_requirements,
+             airdrop.start_date, airdrop.end_date, airdrop.claim_date, airdrop.status, airdrop.estimated_value,
+             airdrop.wallet_address, airdrop.tasks_completed, airdrop.notes, now_iso(), airdrop_id))
+    def get_airdrop(self, airdrop_id):
+        rows = self.execute("SELECT * FROM airdrops WHERE id=?", (airdrop_id,), fetch=True)
+        return rows[0] if rows else None
+    # Deadlines: airdrops still open (not claimed or missed) whose end or claim
+    # date falls in a window, one range scan per date index
+    DEADLINE_COLUMNS = ('end_date', 'claim_date')
+    def get_deadlines(self, since, until, airdrop_id=None):
+        """Return {id, project_name, wallet_address, kind, due} rows with since <= due < until, soonest first.
+
+        `since`/`until` are ISO-8601 strings; kind is the date column name.
+        """
+        parts, params = [], []
+        for column in self.DEADLINE_COLUMNS:
+            sql = (f"SELECT id, project_name, wallet_address, '{column}' AS kind, {column} AS due FROM airdrops "
+                   f"WHERE {column} >= ? AND {column} < ? AND coalesce(status, '') NOT IN ('Claimed', 'Missed')")
+            params += [since, until]
+            if airdrop_id is not None:
+                sql += " AND id = ?"
+                params.append(airdrop_id)
+            parts.append(sql)
+        return self.execute(' UNION ALL '.join(parts) + ' ORDER BY due', params, fetch=True) or []
     def get_all_airdrops(self): return self.execute("SELECT * FROM airdrops", fetch=True)
+    def get_airdrops_page(self, after=None, limit=200, order_by='id', descending=False, search=None, offset=0):
+        return self.get_page('airdrops', after, limit, order_by, descending, search, offset)
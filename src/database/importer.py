@@ -0,0 +1,165 @@
+"""Streaming CSV / JSON Lines importer for nodes, wallets and airdrops.
+
+Records are read lazily, mapped onto the model fields and written through
+DatabaseManager's bulk API one chunk at a time, so memory use does not grow
+with the size of the input file. Rows whose address is already in the
+database (or earlier in the same file) are skipped.
+"""
+
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+# Model field -> accepted column headers (compared after normalize_header)
+FIELD_ALIASES = {
+    'nodes': {
+        'name': ('name', 'node name'),
+        'address': ('address', 'node address', 'ip', 'host'),
+        'network': ('network', 'network type', 'blockchain'),
+        'port': ('port',),
+        'status': ('status',),
+        'last_sync': ('last sync', 'last sync date'),
+        'notes': ('notes',),
+    },
+    'wallets': {
+        'name': ('name', 'label', 'wallet name'),
+        'address': ('address', 'public address', 'wallet address'),
+        'network': ('network', 'blockchain'),
+        'type': ('type', 'wallet type'),
+        'balance': ('balance',),
+        'private_key': ('private key',),
+        'notes': ('notes',),
+    },
+    'airdrops': {
+        'project_name': ('project name', 'project'),
+        'network': ('network', 'blockchain', 'blockchain network'),
+        'airdrop_type': ('airdrop type', 'type'),
+        'eligibility_requirements': ('eligibility requirements', 'eligibility'),
+        'start_date': ('start date',),
+        'end_date': ('end date',),
+        'claim_date': ('claim date',),
+        'status': ('status',),
+        'estimated_value': ('estimated value',),
+        'wallet_address': ('wallet address', 'wallet', 'wallet address used'),
+        'tasks_completed': ('tasks completed',),
+        'notes': ('notes',),
+    },
+}
+
+REQUIRED_FIELDS = {
+    'nodes': ('name', 'address'),
+    'wallets': ('name', 'address'),
+    'airdrops': ('project_name', 'network'),
+}
+
+FORMATS = ('csv', 'jsonl')
+
+
+def normalize_header(header):
+    return ' '.join(str(header).strip().lower().replace('_', ' ').replace('-', ' ').split())
+
+
+def detect_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv':
+        return 'csv'
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    raise ValueError(f"Cannot detect import format of {path!r}; pass fmt='csv' or fmt='jsonl'")
+
+
+def iter_records(path, fmt=None):
+    """Yield one raw dict per CSV row / JSON line without reading the whole file.
+
+    Malformed input raises ValueError naming the file and where it stopped.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt == 'csv':
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.DictReader(f)
+            try:
+                yield from reader
+            except csv.Error as e:
+                raise ValueError(f"{path}: after line {reader.line_num}: {e}")
+    elif fmt == 'jsonl':
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{line_no}: {e}")
+                if not isinstance(record, dict):
+                    raise ValueError(f"{path}:{line_no}: expected a JSON object per line")
+                yield record
+    else:
+        raise ValueError(f"Unsupported import format: {fmt!r}")
+
+
+def column_mapping(headers, table):
+    """Map raw column names onto model fields; unknown columns are dropped."""
+    lookup = {alias: field for field, aliases in FIELD_ALIASES[table].items() for alias in aliases}
+    mapping = {}
+    for header in headers:
+        field = lookup.get(normalize_header(header))
+        if field and field not in mapping.values():
+            mapping[header] = field
+    return mapping
+
+
+def map_records(records, table, stats=None):
+    """Translate raw records into model kwargs, skipping rows without required fields."""
+    required = REQUIRED_FIELDS[table]
+    mapping, headers = None, None
+    for record in records:
+        if stats is not None:
+            stats['read'] += 1
+        # CSV headers are fixed; JSON lines may vary so re-map when keys change
+        keys = tuple(record)
+        if keys != headers:
+            headers, mapping = keys, column_mapping(keys, table)
+        row = {}
+        for header, field in mapping.items():
+            value = record.get(header)
+            if value is None:
+                continue
+            if isinstance(value, str):
+                value = value.strip()
+            elif isinstance(value, (dict, list)):
+                # Nested JSON has no column type; keep it as JSON text
+                value = json.dumps(value, ensure_ascii=False)
+            if value != '':
+                row[field] = value
+        if all(row.get(f) for f in required):
+            yield row
+        elif stats is not None:
+            stats['skipped'] += 1
+
+
+def import_file(db_manager, table, path, fmt=None, chunk_size=1000, progress=None):
+    """Stream `path` into `table` and return counts of read/inserted/duplicate/skipped rows.
+
+    `progress(stats, rows_per_sec)` is called after each committed chunk.
+    """
+    if table not in FIELD_ALIASES:
+        raise ValueError(f"Unknown table: {table!r}")
+    bulk = getattr(db_manager, f'add_{table}_bulk')
+    stats = {'read': 0, 'inserted': 0, 'duplicates': 0, 'skipped': 0}
+    rows = map_records(iter_records(path, fmt), table, stats)
+    start = time.perf_counter()
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        # One transaction per chunk keeps progress durable on very large files
+        stats['inserted'] += bulk(chunk, chunk_size=chunk_size, skip_duplicates=True)
+        stats['duplicates'] = stats['read'] - stats['skipped'] - stats['inserted']
+        if progress:
+            elapsed = time.perf_counter() - start
+            progress(dict(stats), stats['inserted'] / elapsed if elapsed else 0.0)
+    stats['duplicates'] = stats['read'] - stats['skipped'] - stats['inserted']
+    return stats
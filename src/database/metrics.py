@@ -0,0 +1,177 @@
+"""Node probe history: raw samples, minute and hour rollups, and window queries.
+
+Every recorded probe is appended to node_metrics_raw and folded into the
+rollup buckets it falls in (node_metrics_1m, node_metrics_1h) in the same
+transaction, so the rollups are always current and a query never has to
+aggregate raw rows. Each tier has its own retention; window queries read
+the finest tier that still covers the window and is small enough to scan.
+"""
+
+import time
+from bisect import bisect_left
+
+from .schema import LATENCY_BUCKETS, HISTOGRAM_COLUMNS
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# tier -> (table, bucket width in seconds)
+TIERS = {'1m': ('node_metrics_1m', MINUTE), '1h': ('node_metrics_1h', HOUR)}
+
+# How long each tier is kept, in seconds
+RETENTION = {'raw': 2 * DAY, '1m': 14 * DAY, '1h': 400 * DAY}
+
+# Windows at least this long are answered from the hour rollup
+HOUR_TIER_FROM = 6 * HOUR
+
+
+def latency_bucket(latency_ms):
+    """Index of the histogram column counting `latency_ms`."""
+    return bisect_left(LATENCY_BUCKETS, latency_ms)
+
+
+def histogram_percentile(counts, pct, latency_max=None):
+    """Estimate a percentile from histogram counts, interpolating inside the bucket."""
+    total = sum(counts)
+    if not total:
+        return None
+    target = pct / 100 * total
+    seen = 0
+    for i, count in enumerate(counts):
+        if count and seen + count >= target:
+            low = LATENCY_BUCKETS[i - 1] if i else 0.0
+            high = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else (latency_max or low)
+            value = low + (high - low) * (target - seen) / count
+            return min(value, latency_max) if latency_max is not None else value
+        seen += count
+    return latency_max
+
+
+class NodeMetrics:
+    """Append-only probe history for nodes, with rollups and retention"""
+
+    def __init__(self, db_manager):
+        self.db_manager = db_manager
+        self._upserts = {tier: self._upsert_sql(table) for tier, (table, _) in TIERS.items()}
+
+    @staticmethod
+    def _upsert_sql(table):
+        columns = ('bucket', 'node_id', 'samples', 'up', 'latency_n', 'latency_sum', 'latency_max',
+                   'block') + HISTOGRAM_COLUMNS
+        sums = ', '.join(f'{c}={c}+excluded.{c}' for c in ('samples', 'up', 'latency_n', 'latency_sum')
+                         + HISTOGRAM_COLUMNS)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(bucket, node_id) DO UPDATE SET {sums}, "
+                f"latency_max=max(coalesce(latency_max, excluded.latency_max), coalesce(excluded.latency_max, latency_max)), "
+                f"block=max(coalesce(block, excluded.block), coalesce(excluded.block, block))")
+
+    # Writing
+    def record(self, samples, ts=None):
+        """Append probe results and fold them into the rollups.
+
+        `samples` yields (node_id, up, latency_ms, block) tuples, or objects
+        with node_id, status, latency_ms and block attributes such as the
+        health monitor's ProbeResult (any status but 'Offline' counts as up).
+        Raw samples are kept one per node and second: a later sample for the
+        same second is dropped, from the rollups too. Returns the number stored.
+        """
+        ts = int(ts if ts is not None else time.time())
+        raw = []
+        for sample in samples:
+            if hasattr(sample, 'status'):
+                sample = (sample.node_id, sample.status != 'Offline', sample.latency_ms, sample.block)
+            node_id, up, latency, block = sample
+            raw.append((ts, node_id, 1 if up else 0, latency, block))
+        if not raw:
+            return 0
+        with self.db_manager.transaction() as conn:
+            # Only samples the raw table took are rolled up, so the tiers agree
+            raw = [row for row in raw if conn.execute(
+                "INSERT OR IGNORE INTO node_metrics_raw (ts, node_id, up, latency_ms, block) "
+                "VALUES (?, ?, ?, ?, ?)", row).rowcount]
+            for tier, (_, width) in TIERS.items():
+                conn.executemany(self._upserts[tier], [self._rollup_row(row, width) for row in raw])
+        return len(raw)
+
+    @staticmethod
+    def _rollup_row(raw, width):
+        ts, node_id, up, latency, block = raw
+        histogram = [0] * len(HISTOGRAM_COLUMNS)
+        if latency is not None:
+            histogram[latency_bucket(latency)] = 1
+        return (ts - ts % width, node_id, 1, up, 0 if latency is None else 1, latency or 0.0,
+                latency, block, *histogram)
+
+    def prune(self, now=None):
+        """Drop samples older than each tier's retention; returns rows deleted."""
+        now = int(now if now is not None else time.time())
+        deleted = 0
+        with self.db_manager.transaction() as conn:
+            deleted += conn.execute("DELETE FROM node_metrics_raw WHERE ts < ?",
+                                    (now - RETENTION['raw'],)).rowcount
+            for tier, (table, _) in TIERS.items():
+                deleted += conn.execute(f"DELETE FROM {table} WHERE bucket < ?",
+                                        (now - RETENTION[tier],)).rowcount
+        return deleted
+
+    # Queries
+    def tier_for(self, since, until, now=None):
+        """Pick the rollup answering [since, until): minutes for short recent windows, else hours."""
+        now = now if now is not None else time.time()
+        if until - since >= HOUR_TIER_FROM or since < now - RETENTION['1m']:
+            return '1h'
+        return '1m'
+
+    def window(self, since, until=None, node_ids=None, percentiles=(50, 95, 99), tier=None):
+        """Per-node statistics for the window [since, until) (unix seconds).
+
+        Returns {node_id: {'samples', 'uptime' (percent), 'latency_avg',
+        'latency_max', 'p50', 'p95', ..., 'block'}}. Buckets are whole
+        minutes or hours, so the window is widened to bucket boundaries.
+        """
+        until = int(until if until is not None else time.time())
+        since = int(since)
+        tier = tier or self.tier_for(since, until)
+        table, width = TIERS[tier]
+        sums = ', '.join(f'SUM({h})' for h in HISTOGRAM_COLUMNS)
+        sql = (f"SELECT node_id, SUM(samples), SUM(up), SUM(latency_n), SUM(latency_sum), "
+               f"MAX(latency_max), MAX(block), {sums} FROM {table} WHERE bucket >= ? AND bucket < ?")
+        params = [since - since % width, until]
+        if node_ids is not None:
+            node_ids = list(node_ids)
+            sql += f" AND node_id IN ({', '.join('?' * len(node_ids))})"
+            params += node_ids
+        sql += " GROUP BY node_id"
+        stats = {}
+        for row in self.db_manager.conn.execute(sql, params):
+            node_id, samples, up, latency_n, latency_sum, latency_max, block = row[:7]
+            counts = list(row[7:])
+            entry = {
+                'samples': samples,
+                'uptime': 100.0 * up / samples if samples else None,
+                'latency_avg': latency_sum / latency_n if latency_n else None,
+                'latency_max': latency_max,
+                'block': block,
+            }
+            for pct in percentiles:
+                entry[f'p{pct}'] = histogram_percentile(counts, pct, latency_max)
+            stats[node_id] = entry
+        return stats
+
+    def uptime(self, since, until=None, node_ids=None):
+        """{node_id: uptime percent} for the window."""
+        return {node_id: s['uptime'] for node_id, s in self.window(since, until, node_ids, ()).items()}
+
+    def latency_percentiles(self, since, until=None, node_ids=None, percentiles=(50, 95, 99)):
+        """{node_id: {pct: latency ms}} for the window, estimated from the rollup histograms."""
+        return {node_id: {pct: s[f'p{pct}'] for pct in percentiles}
+                for node_id, s in self.window(since, until, node_ids, percentiles).items()}
+
+    def samples(self, node_id, since, until=None):
+        """Raw probe samples of one node (only kept for RETENTION['raw'])."""
+        until = int(until if until is not None else time.time())
+        rows = self.db_manager.conn.execute(
+            "SELECT ts, up, latency_ms, block FROM node_metrics_raw "
+            "WHERE ts >= ? AND ts < ? AND node_id = ? ORDER BY ts", (int(since), until, node_id))
+        return [dict(row) for row in rows]
@@ -1,11 +1,81 @@
+from datetime import datetime, date
+
+DATE_FORMATS = ('%d/%m/%Y', '%d.%m.%Y', '%Y/%m/%d', '%d/%m/%Y %H:%M', '%d/%m/%Y %H:%M:%S')
+
+
+def now_iso():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def to_int(value):
+    """Coerce to int; blanks become None and unparseable text is kept as-is."""
+    if value is None or isinstance(value, int):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return int(float(text))
+    except (ValueError, OverflowError):  # 'inf', '1e400'
+        return text
+
+
+def to_float(value):
+    """Coerce to float, accepting thousands separators; unparseable text is kept as-is."""
+    if value is None or isinstance(value, float):
+        return value
+    if isinstance(value, int):
+        try:
+            return float(value)
+        except OverflowError:
+            return value
+    text = str(value).strip()
+    if not text:
+        return None
+    try:
+        return float(text.replace(',', '').replace(' ', ''))
+    except ValueError:
+        return text
+
+
+def to_iso(value):
+    """Normalize a date or timestamp to ISO-8601 (date-only values stay date-only)."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat(timespec='seconds')
+    if isinstance(value, date):
+        return value.isoformat()
+    text = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(text)
+    except ValueError:
+        for fmt in DATE_FORMATS:
+            try:
+                parsed = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                continue
+        else:
+            return text
+    if len(text) <= 10:
+        return parsed.date().isoformat()
+    return parsed.isoformat(timespec='seconds')
+
+
 class NodeModel:
-    def __init__(self, name, address, network="", port="", status="Active", notes=""):
+    def __init__(self, name, address, network="", port="", status="Active", notes="", last_sync=""):
         self.name = str(name)
         self.address = str(address)
         self.network = str(network)
-        self.port = str(port)
+        self.port = to_int(port)
         self.status = str(status)
         self.notes = notes
+        self.last_sync = to_iso(last_sync)
 
 class WalletModel:
     def __init__(self, name, address, network="", type="Hot", balance="0", private_key="", notes=""):
@@ -13,7 +83,7 @@ class WalletModel:
         self.address = str(address)
         self.network = str(network)
         self.type = str(type)
-        self.balance = str(balance)
+        self.balance = to_float(balance)
         self.private_key = private_key
         self.notes = notes
 
@@ -25,11 +95,11 @@ class AirdropModel:
         self.network = str(network)
         self.airdrop_type = str(airdrop_type)
         self.eligibility_requirements = eligibility_requirements
-        self.start_date = start_date
-        self.end_date = end_date
-        self.claim_date = claim_date
+        self.start_date = to_iso(start_date)
+        self.end_date = to_iso(end_date)
+        self.claim_date = to_iso(claim_date)
         self.status = str(status)
-        self.estimated_value = str(estimated_value)
+        self.estimated_value = to_float(estimated_value)
         self.wallet_address = str(wallet_address)
         self.tasks_completed = tasks_completed
         self.notes = notes
@@ -0,0 +1,315 @@
+"""Versioned schema for the vault database.
+
+The schema version is kept in PRAGMA user_version. ensure_schema(), run by
+DatabaseManager.init_database() on every start-up, applies each pending
+migration in its own transaction, so an interrupted upgrade rolls back to
+the previous version and is simply retried on the next start.
+"""
+
+from .models import to_int, to_float, to_iso
+
+# Column definitions at the current schema version
+COLUMNS = {
+    'nodes': """id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+        address TEXT NOT NULL, network TEXT, port INTEGER, status TEXT,
+        last_sync TEXT, notes TEXT, created_date TEXT, updated_date TEXT""",
+    'wallets': """id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL,
+        address TEXT NOT NULL, network TEXT, type TEXT, balance REAL,
+        private_key TEXT, notes TEXT, created_date TEXT, updated_date TEXT""",
+    'airdrops': """id INTEGER PRIMARY KEY AUTOINCREMENT, project_name TEXT NOT NULL,
+        network TEXT NOT NULL, airdrop_type TEXT, eligibility_requirements TEXT,
+        start_date TEXT, end_date TEXT, claim_date TEXT, status TEXT,
+        estimated_value REAL, wallet_address TEXT, tasks_completed TEXT,
+        notes TEXT, created_date TEXT, updated_date TEXT""",
+}
+
+# Original all-TEXT layout, as created by schema version 1
+LEGACY_COLUMNS = {
+    'nodes': COLUMNS['nodes'].replace('port INTEGER', 'port TEXT'),
+    'wallets': COLUMNS['wallets'].replace('balance REAL', 'balance TEXT'),
+    'airdrops': COLUMNS['airdrops'].replace('estimated_value REAL', 'estimated_value TEXT'),
+}
+
+# Case-folded copies of the searchable text columns. They are VIRTUAL
+# generated columns, so they cost no storage and can never drift from the
+# source column, but can still be indexed for case-insensitive lookups.
+FOLD_COLUMNS = {
+    'nodes': {'name_fold': 'name', 'address_fold': 'address', 'network_fold': 'network'},
+    'wallets': {'name_fold': 'name', 'address_fold': 'address', 'network_fold': 'network'},
+    'airdrops': {'project_fold': 'project_name', 'network_fold': 'network', 'wallet_fold': 'wallet_address'},
+}
+
+INDEXES = {
+    'idx_nodes_address': 'nodes(address)',
+    'idx_nodes_network': 'nodes(network)',
+    'idx_nodes_status': 'nodes(status)',
+    'idx_nodes_name_fold': 'nodes(name_fold)',
+    'idx_nodes_address_fold': 'nodes(address_fold)',
+    'idx_wallets_address': 'wallets(address)',
+    'idx_wallets_network': 'wallets(network)',
+    'idx_wallets_name_fold': 'wallets(name_fold)',
+    'idx_wallets_address_fold': 'wallets(address_fold)',
+    'idx_airdrops_project_wallet': 'airdrops(project_name, wallet_address)',
+    'idx_airdrops_wallet_address': 'airdrops(wallet_address)',
+    'idx_airdrops_end_date': 'airdrops(end_date)',
+    'idx_airdrops_claim_date': 'airdrops(claim_date)',
+    'idx_airdrops_network': 'airdrops(network)',
+    'idx_airdrops_status': 'airdrops(status)',
+    'idx_airdrops_project_fold': 'airdrops(project_fold)',
+}
+
+# Columns indexed by the FTS5 full-text tables (<table>_fts), which are
+# external-content tables kept in sync with their source by triggers
+FTS_COLUMNS = {
+    'nodes': ('name', 'address', 'network', 'status'),
+    'wallets': ('name', 'address', 'network', 'type'),
+    'airdrops': ('project_name', 'network', 'wallet_address', 'airdrop_type', 'status'),
+}
+
+# Upper bounds (ms) of the latency histogram kept in the metrics rollups;
+# one more bucket counts everything slower. Changing them needs a migration.
+LATENCY_BUCKETS = (1, 2, 5, 10, 15, 20, 30, 40, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 2000, 5000)
+HISTOGRAM_COLUMNS = tuple(f'h{i}' for i in range(len(LATENCY_BUCKETS) + 1))
+
+# Per-column conversions applied when retyping existing rows
+CONVERSIONS = {
+    'nodes': {'port': to_int, 'last_sync': to_iso, 'created_date': to_iso, 'updated_date': to_iso},
+    'wallets': {'balance': to_float, 'created_date': to_iso, 'updated_date': to_iso},
+    'airdrops': {'start_date': to_iso, 'end_date': to_iso, 'claim_date': to_iso,
+                 'estimated_value': to_float, 'created_date': to_iso, 'updated_date': to_iso},
+}
+
+
+def fold_column_sql(name, source):
+    return f"{name} TEXT GENERATED ALWAYS AS (lower({source})) VIRTUAL"
+
+
+def table_sql(table, columns, name=None):
+    folds = ', '.join(fold_column_sql(n, s) for n, s in FOLD_COLUMNS[table].items())
+    return f"CREATE TABLE IF NOT EXISTS {name or table} ({columns}, {folds})"
+
+
+def stored_columns(conn, table):
+    # table_xinfo hidden=2/3 marks generated columns, which cannot be inserted into
+    return [row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})") if row[6] == 0]
+
+
+def create_indexes(conn):
+    for name, target in INDEXES.items():
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+
+
+def _initial_schema(conn, batch_size):
+    # Databases created before versioning may already hold the tables,
+    # with or without the search columns
+    for table, columns in LEGACY_COLUMNS.items():
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_xinfo({table})")}
+        for name, source in FOLD_COLUMNS[table].items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {fold_column_sql(name, source)}")
+    create_indexes(conn)
+
+
+def _typed_columns(conn, batch_size):
+    """Rebuild each table with INTEGER/REAL/ISO-8601 columns, copying rows in id-ordered batches."""
+    for table, conversions in CONVERSIONS.items():
+        new_table = f"{table}_v2"
+        conn.execute(f"DROP TABLE IF EXISTS {new_table}")
+        conn.execute(table_sql(table, COLUMNS[table], new_table))
+        columns = stored_columns(conn, table)
+        select = f"SELECT {', '.join(columns)} FROM {table} WHERE id > ? ORDER BY id LIMIT ?"
+        insert = f"INSERT INTO {new_table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        converters = [conversions.get(c) for c in columns]
+        last_id = 0
+        while True:
+            rows = conn.execute(select, (last_id, batch_size)).fetchall()
+            if not rows:
+                break
+            conn.executemany(insert, [
+                tuple(convert(value) if convert else value for convert, value in zip(converters, row))
+                for row in rows])
+            last_id = rows[-1][0]
+        seq = conn.execute("SELECT seq FROM sqlite_sequence WHERE name=?", (table,)).fetchone()
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+        if seq:
+            # Keep AUTOINCREMENT from reusing ids of rows deleted before the rebuild
+            conn.execute("UPDATE sqlite_sequence SET seq=MAX(seq, ?) WHERE name=?", (seq[0], table))
+    create_indexes(conn)
+
+
+def _full_text_search(conn, batch_size):
+    for table, columns in FTS_COLUMNS.items():
+        fts = f"{table}_fts"
+        cols = ', '.join(columns)
+        new_values = ', '.join(f"new.{c}" for c in columns)
+        old_values = ', '.join(f"old.{c}" for c in columns)
+        # Dots and colons are kept inside tokens so an IP or host:port is one
+        # term that a prefix query can match without phrase scans; prefix
+        # indexes keep the short queries typed into the search boxes fast
+        conn.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id', prefix='2 3 4',
+            tokenize="unicode61 tokenchars '.:'")""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+        END""")
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {cols} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_values});
+        END""")
+        conn.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+def _key_rotation_state(conn, batch_size):
+    # At most one row: the wallets with id <= last_id are already encrypted
+    # under the new key; check_token is a fixed value encrypted under it, so a
+    # resumed rotation can tell whether it was given the same key
+    conn.execute("""CREATE TABLE IF NOT EXISTS key_rotation (
+        id INTEGER PRIMARY KEY CHECK (id = 1), last_id INTEGER NOT NULL,
+        check_token TEXT NOT NULL, started TEXT)""")
+
+
+def _node_metrics(conn, batch_size):
+    # Probe samples keyed by time first, so window queries and retention
+    # deletes are range scans. Rollups keep sums and a latency histogram per
+    # node and bucket, which merge exactly when several buckets are combined.
+    conn.execute("""CREATE TABLE IF NOT EXISTS node_metrics_raw (
+        ts INTEGER NOT NULL, node_id INTEGER NOT NULL, up INTEGER NOT NULL,
+        latency_ms REAL, block INTEGER, PRIMARY KEY (ts, node_id)) WITHOUT ROWID""")
+    histogram = ', '.join(f'{h} INTEGER NOT NULL DEFAULT 0' for h in HISTOGRAM_COLUMNS)
+    for table in ('node_metrics_1m', 'node_metrics_1h'):
+        conn.execute(f"""CREATE TABLE IF NOT EXISTS {table} (
+            bucket INTEGER NOT NULL, node_id INTEGER NOT NULL, samples INTEGER NOT NULL,
+            up INTEGER NOT NULL, latency_n INTEGER NOT NULL, latency_sum REAL NOT NULL,
+            latency_max REAL, block INTEGER, {histogram},
+            PRIMARY KEY (bucket, node_id)) WITHOUT ROWID""")
+
+
+# Dashboard counters: (metric, source table, grouping column, summed column or None).
+# Triggers keep one row per group of each metric in stats_counters.
+COUNTERS = (
+    ('nodes_by_status', 'nodes', 'status', None),
+    ('wallets_by_network', 'wallets', 'network', 'balance'),
+    ('airdrops_by_status', 'airdrops', 'status', 'estimated_value'),
+)
+
+
+def _numeric(expr):
+    # Unparseable values are kept as text in the typed columns; count them as 0
+    return f"(CASE WHEN typeof({expr}) IN ('integer', 'real') THEN {expr} ELSE 0 END)"
+
+
+def _dashboard_counters(conn, batch_size):
+    conn.execute("""CREATE TABLE IF NOT EXISTS stats_counters (
+        metric TEXT NOT NULL, grp TEXT NOT NULL, count INTEGER NOT NULL, total REAL NOT NULL,
+        PRIMARY KEY (metric, grp)) WITHOUT ROWID""")
+    for metric, table, group, summed in COUNTERS:
+        total_new = _numeric(f'new.{summed}') if summed else '0'
+        total_old = _numeric(f'old.{summed}') if summed else '0'
+        add = f"""INSERT INTO stats_counters (metric, grp, count, total)
+            VALUES ('{metric}', coalesce(new.{group}, ''), 1, {total_new})
+            ON CONFLICT(metric, grp) DO UPDATE SET count = count + 1, total = total + excluded.total;"""
+        remove = f"""UPDATE stats_counters SET count = count - 1, total = total - {total_old}
+            WHERE metric = '{metric}' AND grp = coalesce(old.{group}, '');
+            DELETE FROM stats_counters WHERE metric = '{metric}' AND grp = coalesce(old.{group}, '') AND count <= 0;"""
+        watched = ', '.join(c for c in (group, summed) if c)
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {metric}_insert AFTER INSERT ON {table} BEGIN {add} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {metric}_delete AFTER DELETE ON {table} BEGIN {remove} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {metric}_update AFTER UPDATE OF {watched} ON {table} "
+                     f"BEGIN {remove} {add} END")
+        conn.execute(f"DELETE FROM stats_counters WHERE metric = '{metric}'")
+        total = f"SUM({_numeric(summed)})" if summed else '0'
+        conn.execute(f"""INSERT INTO stats_counters (metric, grp, count, total)
+            SELECT '{metric}', coalesce({group}, ''), COUNT(*), coalesce({total}, 0)
+            FROM {table} GROUP BY coalesce({group}, '')""")
+
+
+def _deadline_indexes(conn, batch_size):
+    # claim_date joins end_date as a range-queried deadline column
+    create_indexes(conn)
+
+
+# Change tracking for delta backups. Every write to a tracked table bumps
+# change_counter.seq and stamps the row's change_log entry with it (deletes
+# leave a tombstone), so the rows changed since a backup are those logged
+# after its seq. backup_seq is the seq of the last backup, full or delta.
+TRACKED_TABLES = ('nodes', 'wallets', 'airdrops')
+
+# Updates to these columns alone do not count as edits of the record;
+# private_key is only written raw by key rotation, which re-encrypts it
+TOUCH_EXEMPT = ('id', 'created_date', 'updated_date', 'last_sync', 'private_key')
+
+
+def _change_tracking(conn, batch_size):
+    conn.execute("""CREATE TABLE IF NOT EXISTS change_counter (
+        id INTEGER PRIMARY KEY CHECK (id = 1), seq INTEGER NOT NULL, vault_id TEXT NOT NULL,
+        backup_seq INTEGER)""")
+    conn.execute("INSERT OR IGNORE INTO change_counter (id, seq, vault_id) VALUES (1, 0, lower(hex(randomblob(8))))")
+    conn.execute("""CREATE TABLE IF NOT EXISTS change_log (
+        tbl TEXT NOT NULL, row_id INTEGER NOT NULL, seq INTEGER NOT NULL, deleted INTEGER NOT NULL,
+        PRIMARY KEY (tbl, row_id)) WITHOUT ROWID""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_change_log_seq ON change_log(seq)")
+    for table in TRACKED_TABLES:
+        def log(ref, deleted):
+            return f"""UPDATE change_counter SET seq = seq + 1;
+                INSERT INTO change_log (tbl, row_id, seq, deleted)
+                VALUES ('{table}', {ref}.id, (SELECT seq FROM change_counter), {deleted})
+                ON CONFLICT(tbl, row_id) DO UPDATE SET seq = excluded.seq, deleted = excluded.deleted;"""
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_log_insert AFTER INSERT ON {table} "
+                     f"BEGIN {log('new', 0)} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_log_update AFTER UPDATE ON {table} "
+                     f"BEGIN {log('new', 0)} END")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_log_delete AFTER DELETE ON {table} "
+                     f"BEGIN {log('old', 1)} END")
+        # Raw UPDATEs that leave updated_date alone still date the edit, but
+        # only when an edited value actually changes: upserts that rewrite a
+        # row with its own values (delta replay) keep their updated_date
+        edited = [c for c in stored_columns(conn, table) if c not in TOUCH_EXEMPT]
+        changed = ' OR '.join(f"new.{c} IS NOT old.{c}" for c in edited)
+        conn.execute(f"""CREATE TRIGGER IF NOT EXISTS {table}_touch AFTER UPDATE OF {', '.join(edited)} ON {table}
+            WHEN new.updated_date IS old.updated_date AND ({changed}) BEGIN
+            UPDATE {table} SET updated_date = strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime') WHERE id = new.id;
+        END""")
+
+
+# (version, description, apply(conn, batch_size)), applied in order
+MIGRATIONS = [
+    (1, 'tables, case-folded search columns and indexes', _initial_schema),
+    (2, 'typed numeric and ISO-8601 timestamp columns', _typed_columns),
+    (3, 'FTS5 full-text search tables and sync triggers', _full_text_search),
+    (4, 'resumable encryption key rotation state', _key_rotation_state),
+    (5, 'node probe metrics with minute and hour rollups', _node_metrics),
+    (6, 'trigger-maintained dashboard counters', _dashboard_counters),
+    (7, 'claim date index for deadline reminders', _deadline_indexes),
+    (8, 'row change log for delta backups', _change_tracking),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def ensure_schema(conn, batch_size=1000):
+    """Apply pending migrations; returns the list of versions applied."""
+    applied = []
+    for version, _description, apply in MIGRATIONS:
+        if version <= schema_version(conn):
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            apply(conn, batch_size)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied.append(version)
+    return applied
@@ -1,13 +1,25 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from src.gui.busy import BusyIndicator
+from src.gui.virtual_tree import VirtualTreeview, KeysetRowSource, ListRowSource
+from src.gui.search_box import DebouncedSearch
+from src.gui.deadline_scheduler import DeadlineScheduler, KIND_LABELS
+from src.services.db_executor import DbExecutor
+
 class AirdropManager:
-    def __init__(self, parent, db_manager):
+    SEARCH_LIMIT = 500
+
+    def __init__(self, parent, db_manager, executor=None):
         self.parent = parent
         self.db_manager = db_manager
-        self.airdrops = []
+        self.executor = executor or DbExecutor(widget=parent)
         self.setup_ui()
         self.load_airdrops()
+        self.deadlines = DeadlineScheduler(self.parent, self.db_manager, self.remind_deadlines,
+                                           executor=self.executor)
+        self.deadlines.on_loaded = self.show_next_deadline
+        self.deadlines.reload()
 
     def setup_ui(self):
         main_frame = ttk.Frame(self.parent)
@@ -19,46 +31,101 @@ class AirdropManager:
         ttk.Button(toolbar, text="Edit Airdrop", command=self.edit_airdrop).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Delete Airdrop", command=self.delete_airdrop).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Refresh", command=self.load_airdrops).pack(side=tk.LEFT, padx=5)
+        self.deadline_label = ttk.Label(toolbar, text="")
+        self.deadline_label.pack(side=tk.RIGHT, padx=5)
+        self.busy = BusyIndicator(toolbar)
+
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.search_var, width=40).pack(side=tk.LEFT, padx=5)
+        self.search = DebouncedSearch(
+            self.parent, self.search_var, 'airdrops',
+            lambda query: self.db_manager.search(query, tables=('airdrops',), limit=self.SEARCH_LIMIT),
+            self.show_airdrops, self.SEARCH_LIMIT, executor=self.executor, indicator=self.busy)
 
-        columns = ('ID', 'Project', 'Network', 'Type', 'Status', 'Wallet')
-        self.tree = ttk.Treeview(main_frame, columns=columns, show='headings', selectmode='browse')
+        columns = ('ID', 'Project', 'Network', 'Type', 'Status', 'Wallet', 'Ends')
+        self.table = VirtualTreeview(
+            main_frame, columns,
+            lambda a: (a.get('id'), a.get('project_name'), a.get('network'), a.get('airdrop_type'),
+                       a.get('status'), a.get('wallet_address'), a.get('end_date') or ''),
+            show='headings', selectmode='browse')
+        self.tree = self.table.tree
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, width=115 if col != 'ID' else 50)
-        self.tree.pack(fill=tk.BOTH, expand=True)
-        self.tree.bind('<Double-1>', lambda e: self.edit_airdrop())
+        self.table.bind('<Double-1>', lambda e: self.edit_airdrop())
 
     def load_airdrops(self):
-        self.tree.delete(*self.tree.get_children())
-        self.airdrops = self.db_manager.get_all_airdrops() or []
-        for a in self.airdrops:
-            self.tree.insert('', 'end', values=(
-                a.get('id'), a.get('project_name'), a.get('network'), a.get('airdrop_type'),
-                a.get('status'), a.get('wallet_address')))
+        self.search.run(force=True)
+        if hasattr(self, 'deadlines'):
+            self.deadlines.reload()
+
+    def show_airdrops(self, rows):
+        if rows is not None:
+            self.table.set_source(ListRowSource(rows))
+        else:
+            self.table.set_source(KeysetRowSource(
+                lambda after, limit, offset: self.db_manager.get_airdrops_page(after, limit, offset=offset),
+                lambda: self.db_manager.count_rows('airdrops'),
+                executor=self.executor, indicator=self.busy))
+
+    def refresh_airdrops(self):
+        if self.search.query:
+            self.search.run(force=True)
+        else:
+            self.table.refresh()
+
+    def airdrop_saved(self, airdrop_id):
+        self.refresh_airdrops()
+        self.deadlines.update(airdrop_id)
+
+    # Deadline reminders
+    def remind_deadlines(self, reminders):
+        lines = [f"{r['project_name']} {KIND_LABELS[r['kind']]} {r['when']:%Y-%m-%d %H:%M}" for r in reminders]
+        self.show_next_deadline()
+        messagebox.showwarning("Airdrop deadlines", "\n".join(lines), parent=self.parent)
+
+    def show_next_deadline(self):
+        upcoming = self.deadlines.upcoming(limit=1)
+        if upcoming:
+            r = upcoming[0]
+            self.deadline_label.config(
+                text=f"Next: {r['project_name']} {KIND_LABELS[r['kind']]} {r['when']:%Y-%m-%d %H:%M}")
+        else:
+            self.deadline_label.config(text="")
 
     def add_airdrop(self):
-        AirdropDialog(self.parent, self.db_manager, callback=self.load_airdrops)
+        AirdropDialog(self.parent, self.db_manager, self.executor, callback=self.airdrop_saved)
 
     def edit_airdrop(self):
-        sel = self.tree.selection()
-        if not sel: return
-        item = self.tree.item(sel[0])
-        AirdropDialog(self.parent, self.db_manager, airdrop_id=item['values'][0], callback=self.load_airdrops)
+        aid = self.table.selected_id()
+        if aid is None: return
+        AirdropDialog(self.parent, self.db_manager, self.executor, airdrop_id=aid, callback=self.airdrop_saved)
 
     def delete_airdrop(self):
-        sel = self.tree.selection()
-        if not sel: return
-        item = self.tree.item(sel[0])
-        aid = item['values'][0]
+        aid = self.table.selected_id()
+        if aid is None: return
         if messagebox.askyesno("Confirm", "Delete this airdrop?"):
-            self.db_manager.delete_airdrop(aid)
-            self.load_airdrops()
+            self.executor.write(self.db_manager.delete_airdrop, aid, indicator=self.busy, message="Deleting...",
+                                on_done=lambda result, error: self.airdrop_deleted(aid, error))
+
+    def airdrop_deleted(self, airdrop_id, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to delete airdrop: {error}")
+            return
+        self.refresh_airdrops()
+        self.deadlines.remove(airdrop_id)
+        self.show_next_deadline()
 
 class AirdropDialog:
-    def __init__(self, parent, db_manager, airdrop_id=None, callback=None):
+    def __init__(self, parent, db_manager, executor, airdrop_id=None, callback=None):
         self.db_manager = db_manager
+        self.executor = executor
         self.airdrop_id = airdrop_id
         self.callback = callback
+        self.row = {}
         self.dialog = tk.Toplevel(parent)
         self.dialog.title("Edit Airdrop" if airdrop_id else "Add Airdrop")
         self.dialog.geometry("400x500")
@@ -73,6 +140,9 @@ class AirdropDialog:
         self.type = tk.StringVar(value="Retroactive")
         self.status = tk.StringVar(value="Active")
         self.wallet = tk.StringVar()
+        self.start_date = tk.StringVar()
+        self.end_date = tk.StringVar()
+        self.claim_date = tk.StringVar()
 
         ttk.Label(f, text="Project").grid(row=0, column=0, sticky='w')
         ttk.Entry(f, textvariable=self.project).grid(row=0, column=1)
@@ -84,18 +154,41 @@ class AirdropDialog:
         ttk.Combobox(f, textvariable=self.status, values=["Active", "Pending", "Claimed", "Missed"]).grid(row=3, column=1)
         ttk.Label(f, text="Wallet").grid(row=4, column=0, sticky='w')
         ttk.Entry(f, textvariable=self.wallet).grid(row=4, column=1)
+        ttk.Label(f, text="Start date").grid(row=5, column=0, sticky='w')
+        ttk.Entry(f, textvariable=self.start_date).grid(row=5, column=1)
+        ttk.Label(f, text="End date").grid(row=6, column=0, sticky='w')
+        ttk.Entry(f, textvariable=self.end_date).grid(row=6, column=1)
+        ttk.Label(f, text="Claim date").grid(row=7, column=0, sticky='w')
+        ttk.Entry(f, textvariable=self.claim_date).grid(row=7, column=1)
+        ttk.Label(f, text="Dates: YYYY-MM-DD [HH:MM]", foreground='gray').grid(row=8, column=1, sticky='w')
 
-        ttk.Button(f, text="Save", command=self.save).grid(row=10, column=0, pady=16)
+        self.save_button = ttk.Button(f, text="Save", command=self.save)
+        self.save_button.grid(row=10, column=0, pady=16)
         ttk.Button(f, text="Cancel", command=self.dialog.destroy).grid(row=10, column=1)
+        status = ttk.Frame(f)
+        status.grid(row=11, column=0, columnspan=2)
+        self.busy = BusyIndicator(status)
     def load_data(self):
-        ads = self.db_manager.execute("SELECT * FROM airdrops WHERE id=?", (self.airdrop_id,), fetch=True)
-        if not ads: return
-        a = ads[0]
+        # Saving before the row arrives would blank the fields kept from it
+        self.save_button.state(['disabled'])
+        self.executor.read(self.db_manager.get_airdrop, self.airdrop_id, indicator=self.busy,
+                           on_done=self.show_data)
+    def show_data(self, a, error):
+        if not self.dialog.winfo_exists(): return
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to load airdrop: {error}", parent=self.dialog)
+            return
+        self.save_button.state(['!disabled'])
+        if not a: return
+        self.row = a
         self.project.set(a['project_name'])
         self.network.set(a['network'])
         self.type.set(a['airdrop_type'])
         self.status.set(a['status'])
         self.wallet.set(a.get('wallet_address',''))
+        self.start_date.set(a.get('start_date') or '')
+        self.end_date.set(a.get('end_date') or '')
+        self.claim_date.set(a.get('claim_date') or '')
     def save(self):
         data = {
             'project_name': self.project.get(),
@@ -103,12 +196,23 @@ class AirdropDialog:
             'airdrop_type': self.type.get(),
             'status': self.status.get(),
             'wallet_address': self.wallet.get(),
+            'start_date': self.start_date.get(),
+            'end_date': self.end_date.get(),
+            'claim_date': self.claim_date.get(),
         }
+        self.save_button.state(['disabled'])
         if self.airdrop_id:
-            self.db_manager.execute(
-                "UPDATE airdrops SET project_name=?, network=?, airdrop_type=?, status=?, wallet_address=? WHERE id=?",
-                (data['project_name'], data['network'], data['airdrop_type'], data['status'], data['wallet_address'], self.airdrop_id))
+            # Fields the dialog does not show keep their stored values
+            kept = {k: self.row.get(k) for k in ('eligibility_requirements', 'estimated_value', 'tasks_completed', 'notes')}
+            self.executor.write(self.db_manager.update_airdrop, self.airdrop_id, dict(kept, **data),
+                                indicator=self.busy, on_done=self.saved)
         else:
-            self.db_manager.add_airdrop(data)
-        if self.callback: self.callback()
-        self.dialog.destroy()
+            self.executor.write(self.db_manager.add_airdrop, data, indicator=self.busy, on_done=self.saved)
+    def saved(self, result, error):
+        if error is not None:
+            if self.dialog.winfo_exists(): self.save_button.state(['!disabled'])
+            messagebox.showerror("Error", f"Failed to save airdrop: {error}")
+            return
+        # add_airdrop returns the new row's id
+        if self.callback: self.callback(self.airdrop_id or result)
+        if self.dialog.winfo_exists(): self.dialog.destroy()
@@ -2,20 +2,40 @@ import os
 import json
 import base64
 import secrets
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
+from cryptography.fernet import Fernet
+from src.database.db_manager import DatabaseManager
+from src.utils.encryption import CryptoManager, PBKDF2_MIN_ITERATIONS, calibrate_pbkdf2_iterations
 
 # Local storage path for auth metadata
 APP_DIR = os.path.join(os.path.expanduser("~"), ".node_vault_py")
 AUTH_FILE = os.path.join(APP_DIR, "auth.json")
 
-PBKDF2_ITERATIONS = 310000  # OWASP recommendation range
+# Floor for the PBKDF2 cost; the actual count is calibrated at enrollment
+# so unlocking takes about KDF_TARGET_SECONDS, and stored in auth.json
+PBKDF2_ITERATIONS = PBKDF2_MIN_ITERATIONS
+KDF_NAME = "pbkdf2-sha256"
+KDF_TARGET_SECONDS = 0.5
 SALT_BYTES = 16
 KEY_BYTES = 32
+AUTH_VERSION = 3
+
+# HKDF labels: one PBKDF2 run yields a master secret from which the stored
+# verifier and the key-encryption key are expanded independently, so the
+# verifier in auth.json reveals nothing about the keys protecting the data.
+# Version 3 records keep a random data key wrapped under the key-encryption
+# key: re-hashing with new KDF parameters only re-wraps it, without touching
+# the encrypted database. Version 2 used HKDF(DATA_KEY_INFO) as the data key.
+VERIFIER_INFO = b"node-vault-py verifier"
+DATA_KEY_INFO = b"node-vault-py data key"
+KEK_INFO = b"node-vault-py key encryption key"
 
 
 def _ensure_app_dir():
@@ -33,52 +53,243 @@ def _derive_key(password: str, salt: bytes, iterations: int = PBKDF2_ITERATIONS)
     return kdf.derive(password.encode("utf-8"))
 
 
-def _save_auth(salt: bytes, key_hash: bytes, iterations: int = PBKDF2_ITERATIONS):
-    _ensure_app_dir()
-    payload = {
-        "salt": base64.b64encode(salt).decode("utf-8"),
-        "key_hash": base64.b64encode(key_hash).decode("utf-8"),
-        "iterations": iterations,
-        "version": 1,
+def _expand(master: bytes, info: bytes) -> bytes:
+    hkdf = HKDF(
+        algorithm=hashes.SHA256(),
+        length=KEY_BYTES,
+        salt=None,
+        info=info,
+        backend=default_backend(),
+    )
+    return hkdf.derive(master)
+
+
+def _wrapping_keys(master: bytes) -> Tuple[bytes, Fernet]:
+    """Return (verifier, key-encryption cipher) for a master secret."""
+    return _expand(master, VERIFIER_INFO), Fernet(base64.urlsafe_b64encode(_expand(master, KEK_INFO)))
+
+
+def calibrate_iterations(target_seconds: float = KDF_TARGET_SECONDS) -> int:
+    return calibrate_pbkdf2_iterations(target_seconds, floor=PBKDF2_ITERATIONS)
+
+
+def _new_record(password: str, data_key: bytes, iterations: Optional[int] = None) -> Dict:
+    """Wrap `data_key` under a fresh salt and a calibrated KDF cost."""
+    salt = secrets.token_bytes(SALT_BYTES)
+    iterations = iterations or calibrate_iterations()
+    verifier, kek = _wrapping_keys(_derive_key(password, salt, iterations))
+    return {"salt": salt, "key_hash": verifier, "iterations": iterations,
+            "wrapped_key": kek.encrypt(data_key), "version": AUTH_VERSION}
+
+
+def _encode_record(record: Dict) -> Dict:
+    data = {
+        "salt": base64.b64encode(record["salt"]).decode("utf-8"),
+        "key_hash": base64.b64encode(record["key_hash"]).decode("utf-8"),
+        "kdf": {"name": KDF_NAME, "iterations": record["iterations"]},
+        "wrapped_key": record["wrapped_key"].decode("utf-8"),
+        "version": AUTH_VERSION,
     }
-    with open(AUTH_FILE, "w", encoding="utf-8") as f:
+    if record.get("retired_keys"):
+        data["retired_keys"] = [key.decode("utf-8") for key in record["retired_keys"]]
+    return data
+
+
+def _decode_record(data: Dict) -> Dict:
+    kdf = data.get("kdf") or {"name": KDF_NAME, "iterations": data.get("iterations", PBKDF2_ITERATIONS)}
+    if kdf.get("name", KDF_NAME) != KDF_NAME:
+        raise ValueError(f"Unsupported KDF: {kdf['name']}")
+    return {
+        "salt": base64.b64decode(data["salt"]),
+        "key_hash": base64.b64decode(data["key_hash"]),
+        "iterations": int(kdf["iterations"]),
+        "wrapped_key": data["wrapped_key"].encode("utf-8") if data.get("wrapped_key") else None,
+        "version": int(data.get("version", 1)),
+        # Data keys replaced by password changes, newest first, each encrypted
+        # under this record's data key; older backups were encrypted with them
+        "retired_keys": [key.encode("utf-8") for key in data.get("retired_keys", ())],
+    }
+
+
+def _save_auth(record: Dict, pending: Optional[Dict] = None):
+    _ensure_app_dir()
+    payload = _encode_record(record)
+    if pending:
+        payload["pending"] = _encode_record(pending)
+    # Written to a temporary file and renamed, so a crash never leaves a
+    # truncated auth.json behind
+    tmp_path = AUTH_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(payload, f)
+    os.replace(tmp_path, AUTH_FILE)
 
 
-def _load_auth() -> Optional[Tuple[bytes, bytes, int]]:
+def _load_auth() -> Optional[Dict]:
     if not os.path.exists(AUTH_FILE):
         return None
     try:
         with open(AUTH_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-        salt = base64.b64decode(data["salt"])  # type: ignore
-        key_hash = base64.b64decode(data["key_hash"])  # type: ignore
-        iterations = int(data.get("iterations", PBKDF2_ITERATIONS))
-        return salt, key_hash, iterations
+        record = _decode_record(data)
+        record["pending"] = _decode_record(data["pending"]) if data.get("pending") else None
+        return record
     except Exception:
         return None
 
 
+def _open_record(record: Dict, password: str) -> Optional[bytes]:
+    """Return the data key protected by `record`, or None for a wrong password."""
+    master = _derive_key(password, record["salt"], record["iterations"])
+    if record["version"] < 3:
+        # Version 1 stored the raw PBKDF2 output, version 2 an HKDF verifier;
+        # both derived the data key from the master secret
+        verifier = master if record["version"] < 2 else _expand(master, VERIFIER_INFO)
+        if not secrets.compare_digest(verifier, record["key_hash"]):
+            return None
+        return base64.urlsafe_b64encode(_expand(master, DATA_KEY_INFO))
+    verifier, kek = _wrapping_keys(master)
+    if not secrets.compare_digest(verifier, record["key_hash"]):
+        return None
+    return kek.decrypt(record["wrapped_key"])
+
+
+def _needs_rehash(record: Dict) -> bool:
+    return record["version"] < AUTH_VERSION or record["iterations"] < PBKDF2_ITERATIONS
+
+
 def is_enrolled() -> bool:
     return _load_auth() is not None
 
 
-def enroll_master_password(password: str) -> None:
-    salt = secrets.token_bytes(SALT_BYTES)
-    key = _derive_key(password, salt)
-    _save_auth(salt, key)
+def enroll_master_password(password: str) -> bytes:
+    """Store a new master password and return the data key it protects."""
+    data_key = Fernet.generate_key()
+    _save_auth(_new_record(password, data_key))
+    return data_key
 
 
-def verify_master_password(password: str) -> bool:
+class PasswordChangePending(Exception):
+    """The old password was given while a master password change is unfinished."""
+
+
+def _try_open(record: Dict, password: str) -> Optional[bytes]:
+    try:
+        return _open_record(record, password)
+    except Exception:
+        return None
+
+
+def unlock_master_password(password: str) -> Optional[bytes]:
+    """Check the master password and return the data-encryption key, or None.
+
+    Older records are re-hashed here with freshly calibrated parameters,
+    keeping the same data key so nothing in the database changes.
+
+    While a password change is unfinished, only the new password unlocks:
+    it returns the new data key, and the vault must be passed to
+    finish_password_change() before use (unlock_vault() does both). The old
+    password raises PasswordChangePending.
+    """
+    record = _load_auth()
+    if not record:
+        return None
+    pending = record["pending"]
+    if pending:
+        new_key = _try_open(pending, password)
+        if new_key is not None:
+            return new_key
+    data_key = _try_open(record, password)
+    if data_key is not None and pending:
+        raise PasswordChangePending("A master password change was interrupted; unlock with the new password")
+    if data_key is not None and _needs_rehash(record):
+        _save_auth(_new_record(password, data_key))
+    return data_key
+
+
+def retired_data_keys(data_key: bytes) -> List[bytes]:
+    """Data keys replaced by earlier password changes, newest first.
+
+    Backups taken before a password change are encrypted with the data key
+    of the time; pass these to the restore (see backup.prepare_restore()).
+    """
     record = _load_auth()
     if not record:
+        return []
+    cipher = Fernet(data_key)
+    return [cipher.decrypt(key) for key in record["retired_keys"]]
+
+
+def finish_password_change(db_manager, progress=None) -> bool:
+    """Finish an interrupted password change; returns False when none is pending.
+
+    `db_manager` must be open with the new data key (as returned by
+    unlock_master_password()). The old data key is recovered from the
+    pending record, the wallet key rotation resumes where it stopped, and
+    auth.json then switches to the new password.
+    """
+    record = _load_auth()
+    pending = record["pending"] if record else None
+    if not pending:
         return False
-    salt, key_hash, iterations = record
+    new_crypto = db_manager.crypto
+    db_manager.crypto = CryptoManager(key=Fernet(new_crypto.key).decrypt(pending["retired_keys"][0]))
     try:
-        derived = _derive_key(password, salt, iterations)
-        return secrets.compare_digest(derived, key_hash)
+        db_manager.rotate_encryption_key(new_crypto, progress=progress)
     except Exception:
+        db_manager.crypto = new_crypto
+        raise
+    _save_auth(pending)
+    return True
+
+
+def unlock_vault(password: str, db_path: Optional[str] = None, progress=None) -> Optional[bytes]:
+    """unlock_master_password(), finishing an interrupted password change on the vault at `db_path`."""
+    data_key = unlock_master_password(password)
+    if data_key is not None and _load_auth()["pending"]:
+        db = DatabaseManager(master_key=data_key) if db_path is None else DatabaseManager(db_path, master_key=data_key)
+        try:
+            finish_password_change(db, progress)
+        finally:
+            db.close()
+    return data_key
+
+
+def verify_master_password(password: str) -> bool:
+    return unlock_master_password(password) is not None
+
+
+def change_master_password(old_password: str, new_password: str, db_manager, progress=None) -> bool:
+    """Re-encrypt the vault under a new master password and a new data key.
+
+    `db_manager` must be open with the current data key. Wallet keys are
+    rotated with DatabaseManager.rotate_encryption_key(); the new data key is
+    saved first (wrapped under the new password, as a pending record, along
+    with the old data key encrypted under it), so an interrupted change is
+    finished by running it again with the same two passwords, or by
+    unlocking with the new password (see unlock_vault()). auth.json only
+    switches to the new password once every wallet has been re-encrypted.
+
+    The old data key, and those it had retired, stay in auth.json encrypted
+    under the new one (see retired_data_keys()), so backups taken before the
+    change can still be restored.
+    """
+    record = _load_auth()
+    old_key = _try_open(record, old_password) if record else None
+    if old_key is None:
         return False
+    pending = record["pending"]
+    new_key = _try_open(pending, new_password) if pending else None
+    if new_key is None:
+        new_key = Fernet.generate_key()
+        pending = _new_record(new_password, new_key)
+        # The first lets the new password alone finish an interrupted change
+        cipher = Fernet(new_key)
+        pending["retired_keys"] = [cipher.encrypt(key) for key in
+                                   [old_key] + [Fernet(old_key).decrypt(k) for k in record["retired_keys"]]]
+        _save_auth(record, pending)
+    db_manager.rotate_encryption_key(CryptoManager(key=new_key), progress=progress)
+    _save_auth(pending)
+    return True
 
 
 class AuthDialog(tk.Toplevel):
@@ -117,6 +328,8 @@ class AuthDialog(tk.Toplevel):
 
         self.protocol("WM_DELETE_WINDOW", self._on_close)
         self.result_ok = False
+        self.data_key: Optional[bytes] = None
+        self._busy = False
 
     def _build_enroll_ui(self, parent):
         title = ttk.Label(parent, text="Créer votre mot de passe maître", font=("Segoe UI", 12, "bold"))
@@ -138,8 +351,12 @@ class AuthDialog(tk.Toplevel):
 
         btn_row = ttk.Frame(parent)
         btn_row.grid(row=5, column=0, columnspan=2, sticky="e")
-        ttk.Button(btn_row, text="Annuler", command=self._on_cancel).pack(side=tk.RIGHT, padx=(0, 6))
-        ttk.Button(btn_row, text="Enregistrer", command=self._on_enroll).pack(side=tk.RIGHT)
+        btn_cancel = ttk.Button(btn_row, text="Annuler", command=self._on_cancel)
+        btn_cancel.pack(side=tk.RIGHT, padx=(0, 6))
+        btn_ok = ttk.Button(btn_row, text="Enregistrer", command=self._on_enroll)
+        btn_ok.pack(side=tk.RIGHT)
+        self.progress = ttk.Progressbar(btn_row, mode="indeterminate", length=120)
+        self._inputs = [pwd1, pwd2, btn_cancel, btn_ok]
 
     def _build_login_ui(self, parent):
         title = ttk.Label(parent, text="Connexion sécurisée", font=("Segoe UI", 12, "bold"))
@@ -158,8 +375,12 @@ class AuthDialog(tk.Toplevel):
 
         btn_row = ttk.Frame(parent)
         btn_row.grid(row=4, column=0, columnspan=2, sticky="e")
-        ttk.Button(btn_row, text="Quitter", command=self._on_cancel).pack(side=tk.RIGHT, padx=(0, 6))
-        ttk.Button(btn_row, text="Se connecter", command=self._on_login).pack(side=tk.RIGHT)
+        btn_quit = ttk.Button(btn_row, text="Quitter", command=self._on_cancel)
+        btn_quit.pack(side=tk.RIGHT, padx=(0, 6))
+        btn_ok = ttk.Button(btn_row, text="Se connecter", command=self._on_login)
+        btn_ok.pack(side=tk.RIGHT)
+        self.progress = ttk.Progressbar(btn_row, mode="indeterminate", length=120)
+        self._inputs = [pwd, btn_quit, btn_ok]
 
     # Event handlers
     def _on_cancel(self):
@@ -167,6 +388,8 @@ class AuthDialog(tk.Toplevel):
         self.destroy()
 
     def _on_enroll(self):
+        if self._busy:
+            return
         p1 = self.var_pwd1.get()
         p2 = self.var_pwd2.get()
 
@@ -177,40 +400,104 @@ class AuthDialog(tk.Toplevel):
         if p1 != p2:
             self._set_msg("Les mots de passe ne correspondent pas")
             return
-        try:
-            enroll_master_password(p1)
-            messagebox.showinfo(
-                "Configuration réussie",
-                "Votre mot de passe maître a été enregistré de façon sécurisée.",
-                parent=self,
-            )
-            self.result_ok = True
-            self.destroy()
-        except Exception as e:
+        self._run_kdf(lambda: enroll_master_password(p1), self._enroll_done, "Enregistrement en cours…")
+
+    def _enroll_done(self, data_key, error):
+        if error is not None:
             self._set_msg("Erreur lors de l'enregistrement. Veuillez réessayer.")
+            return
+        self.data_key = data_key
+        messagebox.showinfo(
+            "Configuration réussie",
+            "Votre mot de passe maître a été enregistré de façon sécurisée.",
+            parent=self,
+        )
+        self.result_ok = True
+        self.destroy()
 
     def _on_login(self):
+        # Repeated Enter presses while the KDF runs are ignored
+        if self._busy:
+            return
         p = self.var_pwd_login.get()
-        try:
-            if verify_master_password(p):
-                self.result_ok = True
-                self.destroy()
-            else:
-                self._set_msg("Mot de passe incorrect. Réessayez.")
-        except Exception:
+        # An interrupted password change is finished here, before the vault is opened
+        self._run_kdf(lambda: unlock_vault(p), self._login_done, "Vérification…")
+
+    def _login_done(self, data_key, error):
+        if isinstance(error, PasswordChangePending):
+            self._set_msg("Changement de mot de passe interrompu : entrez le nouveau mot de passe.")
+        elif error is not None:
             self._set_msg("Erreur de vérification. Réessayez.")
+        elif data_key is not None:
+            self.data_key = data_key
+            self.result_ok = True
+            self.destroy()
+        else:
+            self._set_msg("Mot de passe incorrect. Réessayez.")
 
     def _on_close(self):
         # force explicit choice; default to cancel
-        self._on_cancel()
+        if not self._busy:
+            self._on_cancel()
+
+    # Background key derivation
+    POLL_MS = 30
+
+    def _run_kdf(self, work, on_done, message: str):
+        """Run `work` (the PBKDF2 call) on a worker thread so the dialog keeps repainting.
+
+        Tk may only be touched from the main thread: the worker just stores
+        its outcome and an after() loop picks it up, then calls
+        on_done(result, error) on the main thread.
+        """
+        self._set_busy(True, message)
+        outcome = {}
+
+        def worker():
+            try:
+                outcome["result"] = work()
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=worker, name="auth-kdf", daemon=True)
+        thread.start()
+
+        def poll():
+            if thread.is_alive():
+                self.after(self.POLL_MS, poll)
+                return
+            self._set_busy(False)
+            on_done(outcome.get("result"), outcome.get("error"))
+
+        self.after(self.POLL_MS, poll)
+
+    def _set_busy(self, busy: bool, message: str = ""):
+        self._busy = busy
+        state = ["disabled"] if busy else ["!disabled"]
+        for widget in self._inputs:
+            widget.state(state)
+        if busy:
+            self.progress.pack(side=tk.LEFT, padx=(0, 12))
+            self.progress.start(12)
+            self.configure(cursor="watch")
+        else:
+            self.progress.stop()
+            self.progress.pack_forget()
+            self.configure(cursor="")
+        self.lbl_msg.configure(text=message, foreground="#555555" if busy else "#cc0000")
 
     def _set_msg(self, text: str):
         # Premium UI microcopy for trust and clarity
         self.lbl_msg.configure(text=text)
 
 
-def require_auth(parent: tk.Tk) -> bool:
-    """Shows the auth dialog and returns True if authentication passes."""
+def authenticate(parent: tk.Tk) -> Optional[bytes]:
+    """Shows the auth dialog and returns the data-encryption key, or None if authentication fails."""
     dlg = AuthDialog(parent)
     parent.wait_window(dlg)
-    return dlg.result_ok
+    return dlg.data_key if dlg.result_ok else None
+
+
+def require_auth(parent: tk.Tk) -> bool:
+    """Shows the auth dialog and returns True if authentication passes."""
+    return authenticate(parent) is not None
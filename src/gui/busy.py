@@ -0,0 +1,36 @@
+"""Loading indicator for work running on the database executor"""
+
+import tkinter as tk
+from tkinter import ttk
+
+
+class BusyIndicator:
+    """A label and an indeterminate progress bar, shown while any task is running
+
+    start()/stop() calls nest: the indicator stays up until every started
+    task has stopped, showing the text of the latest one.
+    """
+
+    def __init__(self, parent, **pack_options):
+        """pack_options place the indicator in `parent` while it is shown"""
+        self.pack_options = pack_options or {'side': tk.RIGHT, 'padx': 5}
+        self.frame = ttk.Frame(parent)
+        self.label = ttk.Label(self.frame, text="")
+        self.label.pack(side=tk.LEFT, padx=(0, 5))
+        self.bar = ttk.Progressbar(self.frame, mode='indeterminate', length=80)
+        self.bar.pack(side=tk.LEFT)
+        self.count = 0
+
+    def start(self, text="Loading..."):
+        self.count += 1
+        self.label.config(text=text)
+        if self.count == 1:
+            self.frame.pack(**self.pack_options)
+            self.bar.start(15)
+
+    def stop(self):
+        self.count = max(0, self.count - 1)
+        # The indicator's dialog may have been closed while its task ran
+        if not self.count and self.frame.winfo_exists():
+            self.bar.stop()
+            self.frame.pack_forget()
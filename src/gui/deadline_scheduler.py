@@ -0,0 +1,171 @@
+"""Airdrop deadline reminders driven by a single Tk timer"""
+
+import heapq
+import itertools
+from datetime import datetime, timedelta
+
+KIND_LABELS = {'end_date': 'ends', 'claim_date': 'claim opens'}
+
+
+def deadline_time(value):
+    """Parse a stored end/claim date; date-only values fall due at the end of that day."""
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if len(str(value)) <= 10:
+        parsed = parsed.replace(hour=23, minute=59, second=59)
+    return parsed
+
+
+class DeadlineScheduler:
+    """Remind about airdrop end and claim dates without polling the table
+
+    Deadlines due within `horizon` are loaded with one indexed range query
+    and kept in a heap ordered by reminder time (`lead` before the
+    deadline). Only the earliest one has a Tk after() timer; when it fires,
+    every reminder that is due is popped and passed to `on_due`, and the
+    timer is re-armed for the next. Edits and deletes update the heap for
+    that one airdrop (superseded entries are skipped when popped), and the
+    window is reloaded from the database when it runs out. With a
+    DbExecutor, the queries run on its reader threads and their rows are
+    applied when they arrive.
+    """
+
+    MAX_DELAY_MS = 3600 * 1000   # Tcl timers overflow on long delays; re-arm at least hourly
+
+    def __init__(self, widget, db_manager, on_due, lead=timedelta(days=1), horizon=timedelta(days=30),
+                 executor=None):
+        """
+        Args:
+            widget: Any widget, used for after() scheduling
+            on_due: Callable(reminders), each a dict with id, project_name,
+                wallet_address, kind ('end_date'/'claim_date'), due and when (datetime)
+            lead: How long before a deadline to remind
+            horizon: How far ahead to load deadlines
+            executor: DbExecutor to query with, or None to query synchronously
+        """
+        self.widget = widget
+        self.db_manager = db_manager
+        self.on_due = on_due
+        self.lead = lead
+        self.horizon = horizon
+        self.executor = executor
+        self.on_loaded = None      # Called once a query's deadlines are in the heap
+        self._heap = []            # [remind_at, seq, key, reminder or None once superseded]
+        self._entries = {}         # (airdrop id, kind) -> heap entry
+        self._notified = set()     # (airdrop id, kind, due) already passed to on_due
+        self._seq = itertools.count()
+        self._pending = None
+        self._loaded_until = None
+        self._generation = 0       # Bumped by reload(); older query results are dropped
+
+    # Loading
+    def reload(self, now=None):
+        """Load the deadlines of the next `horizon` from the database and re-arm the timer"""
+        now = now or datetime.now()
+        self._generation += 1
+        self._heap.clear()
+        self._entries.clear()
+        self._loaded_until = now + self.horizon
+        self._query(now)
+
+    def _query(self, now, airdrop_id=None):
+        # Date-only values of today compare below now's timestamp, so start at midnight
+        args = (now.date().isoformat(), self._loaded_until.isoformat(timespec='seconds'), airdrop_id)
+        if self.executor is None:
+            return self._apply(self._generation, now, self.db_manager.get_deadlines(*args), None)
+        generation = self._generation
+        self.executor.read(self.db_manager.get_deadlines, *args,
+                           on_done=lambda rows, error: self._apply(generation, now, rows, error))
+
+    def _apply(self, generation, now, rows, error):
+        if generation != self._generation:
+            return
+        if error is not None:
+            # Reminders are best effort; try again with the next reload
+            rows = []
+        for row in rows:
+            self._push(row, now)
+        self._arm(datetime.now())
+        if self.on_loaded:
+            self.on_loaded()
+
+    def _push(self, row, now):
+        when = deadline_time(row['due'])
+        if when is None or when < now or when >= self._loaded_until:
+            return
+        if (row['id'], row['kind'], row['due']) in self._notified:
+            return
+        reminder = dict(row, when=when)
+        entry = [when - self.lead, next(self._seq), (row['id'], row['kind']), reminder]
+        # Overlapping queries may push the same deadline twice; the older entry is superseded
+        previous = self._entries.get(entry[2])
+        if previous is not None:
+            previous[3] = None
+        self._entries[entry[2]] = entry
+        heapq.heappush(self._heap, entry)
+
+    # Incremental updates
+    def update(self, airdrop_id, now=None):
+        """Re-read one airdrop's deadlines after it was added or edited"""
+        now = now or datetime.now()
+        if self._loaded_until is None:
+            return self.reload(now)
+        self._discard(airdrop_id)
+        self._query(now, airdrop_id)
+
+    def remove(self, airdrop_id):
+        """Forget a deleted airdrop's deadlines"""
+        self._discard(airdrop_id)
+        self._arm(datetime.now())
+
+    def _discard(self, airdrop_id):
+        for kind in KIND_LABELS:
+            entry = self._entries.pop((airdrop_id, kind), None)
+            if entry is not None:
+                entry[3] = None
+
+    def upcoming(self, limit=None):
+        """Pending reminders, soonest deadline first"""
+        reminders = sorted((e[3] for e in self._entries.values()), key=lambda r: r['when'])
+        return reminders[:limit] if limit else reminders
+
+    # Timer
+    def _arm(self, now):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+        while self._heap and self._heap[0][3] is None:
+            heapq.heappop(self._heap)
+        next_at = self._loaded_until
+        if self._heap:
+            next_at = min(next_at, self._heap[0][0])
+        delay = max(0, int((next_at - now).total_seconds() * 1000))
+        self._pending = self.widget.after(min(delay, self.MAX_DELAY_MS), self._fire)
+
+    def _fire(self):
+        self._pending = None
+        now = datetime.now()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            reminder = entry[3]
+            if reminder is None:
+                continue
+            if self._entries.get(entry[2]) is entry:
+                del self._entries[entry[2]]
+            self._notified.add((reminder['id'], reminder['kind'], reminder['due']))
+            if reminder['when'] >= now:
+                due.append(reminder)
+        if now >= self._loaded_until:
+            self.reload(now)
+        else:
+            self._arm(now)
+        if due:
+            self.on_due(due)
+
+    def stop(self):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
@@ -8,6 +8,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox, Menu
 import sys
 import os
+import threading
 
 # Add the parent directory to the path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -16,10 +17,18 @@ from src.gui.node_manager import NodeManager
 from src.gui.wallet_manager import WalletManager
 from src.gui.airdrop_manager import AirdropManager
 from src.database.db_manager import DatabaseManager
+from src.database import backup
+from src.gui.authentication import retired_data_keys
+from src.utils.encryption import CryptoManager
+from src.services.db_executor import DbExecutor
 
+# Seconds between WAL checkpoints / PRAGMA optimize runs
+DB_MAINTENANCE_SECONDS = 600
 
 class MainWindow:
     """Main application window with tabbed interface"""
+
+    PROGRESS_POLL_MS = 100
     
     def __init__(self, root, master_key):
         """Initialize the main window
@@ -34,7 +43,9 @@ class MainWindow:
         self.root.geometry("1200x700")
         
         # Initialize database manager
-        self.db_manager = DatabaseManager(master_key=self.master_key)
+        self.db_manager = DatabaseManager(master_key=self.master_key, maintenance_interval=DB_MAINTENANCE_SECONDS)
+        # Shared by the tabs: one writer thread, reader threads, results delivered via after()
+        self.db_executor = DbExecutor(widget=self.root)
         
         # Set window icon (if available)
         try:
@@ -87,6 +98,7 @@ class MainWindow:
         file_menu = Menu(menubar, tearoff=0)
         menubar.add_cascade(label="File", menu=file_menu)
         file_menu.add_command(label="Backup Database", command=self.backup_database)
+        file_menu.add_command(label="Backup Changes Only", command=self.backup_changes)
         file_menu.add_command(label="Restore Database", command=self.restore_database)
         file_menu.add_separator()
         file_menu.add_command(label="Exit", command=self.on_closing)
@@ -114,17 +126,17 @@ class MainWindow:
         # Node Manager Tab
         node_frame = ttk.Frame(self.notebook)
         self.notebook.add(node_frame, text="  Nodes  ")
-        self.node_manager = NodeManager(node_frame, self.db_manager)
+        self.node_manager = NodeManager(node_frame, self.db_manager, self.db_executor)
         
         # Wallet Manager Tab
         wallet_frame = ttk.Frame(self.notebook)
         self.notebook.add(wallet_frame, text="  Wallets  ")
-        self.wallet_manager = WalletManager(wallet_frame, self.db_manager)
+        self.wallet_manager = WalletManager(wallet_frame, self.db_manager, self.db_executor)
         
         # Airdrop Manager Tab
         airdrop_frame = ttk.Frame(self.notebook)
         self.notebook.add(airdrop_frame, text="  Airdrops  ")
-        self.airdrop_manager = AirdropManager(airdrop_frame, self.db_manager)
+        self.airdrop_manager = AirdropManager(airdrop_frame, self.db_manager, self.db_executor)
         
     def create_status_bar(self):
         """Create status bar at bottom of window"""
@@ -141,76 +153,171 @@ class MainWindow:
         self.status_bar.config(text=message)
         self.root.update_idletasks()
         
+    def run_in_background(self, work, on_done, label):
+        """Run work(progress) on a worker thread, showing its progress in the status bar
+
+        on_done(result, error) is called on the Tk thread when it finishes.
+        """
+        state = {'progress': None}
+
+        def progress(stage, done, total):
+            state['progress'] = (stage, done, total)
+
+        def run():
+            try:
+                state['result'] = work(progress)
+            except Exception as e:
+                state['error'] = e
+
+        thread = threading.Thread(target=run, name=label, daemon=True)
+        thread.start()
+        self.root.after(self.PROGRESS_POLL_MS, self._poll_background, thread, state, on_done, label)
+
+    def _poll_background(self, thread, state, on_done, label):
+        if thread.is_alive():
+            if state['progress']:
+                stage, done, total = state['progress']
+                self.update_status(f"{label}: {stage} {100 * done // max(total, 1)}%")
+            self.root.after(self.PROGRESS_POLL_MS, self._poll_background, thread, state, on_done, label)
+            return
+        on_done(state.get('result'), state.get('error'))
+
     def backup_database(self):
-        """Backup the database"""
-        try:
-            from tkinter import filedialog
-            from datetime import datetime
-            import shutil
-            
-            # Get backup location
-            default_name = f"node_vault_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.db"
-            file_path = filedialog.asksaveasfilename(
-                defaultextension=".db",
-                filetypes=[("Database files", "*.db"), ("All files", "*.*")],
-                initialfile=default_name
-            )
-            
-            if file_path:
-                # Copy database file
-                db_path = os.path.join('data', 'node_vault.db')
-                if os.path.exists(db_path):
-                    shutil.copy2(db_path, file_path)
-                    messagebox.showinfo("Success", "Database backed up successfully!")
-                    self.update_status("Database backed up")
-                else:
-                    messagebox.showerror("Error", "Database file not found!")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to backup database: {str(e)}")
-            
+        """Backup the database while it stays in use"""
+        from tkinter import filedialog
+        from datetime import datetime
+
+        # The extension picks the format: .nvbk is compressed and encrypted
+        # with the vault key, .gz compressed only, anything else a plain copy
+        default_name = f"node_vault_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.nvbk"
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".nvbk",
+            filetypes=[("Encrypted backup", "*.nvbk"), ("Compressed database", "*.db.gz"),
+                       ("Database files", "*.db"), ("All files", "*.*")],
+            initialfile=default_name
+        )
+        if not file_path:
+            return
+        encrypt = file_path.endswith('.nvbk')
+        compress = encrypt or file_path.endswith('.gz')
+        db_manager = self.db_manager
+
+        def done(result, error):
+            if error:
+                messagebox.showerror("Error", f"Failed to backup database: {error}")
+                self.update_status("Backup failed")
+            else:
+                messagebox.showinfo("Success", "Database backed up successfully!")
+                self.update_status("Database backed up")
+
+        self.run_in_background(
+            lambda progress: backup.backup_database(db_manager, file_path, compress=compress,
+                                                    crypto=db_manager.crypto if encrypt else None,
+                                                    progress=progress),
+            done, "Backing up")
+
+    def backup_changes(self):
+        """Back up the rows changed since the last backup"""
+        from tkinter import filedialog
+        from datetime import datetime
+
+        default_name = f"node_vault_delta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.nvdelta"
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".nvdelta",
+            filetypes=[("Encrypted delta backup", "*.nvdelta"), ("Compressed delta", "*.jsonl.gz"),
+                       ("All files", "*.*")],
+            initialfile=default_name
+        )
+        if not file_path:
+            return
+        db_manager = self.db_manager
+        crypto = db_manager.crypto if file_path.endswith('.nvdelta') else None
+
+        def done(header, error):
+            if error:
+                messagebox.showerror("Error", f"Failed to backup changes: {error}")
+                self.update_status("Backup failed")
+            else:
+                messagebox.showinfo("Success", f"{header['rows']} changed and {header['deleted']} deleted "
+                                               f"rows backed up.")
+                self.update_status("Changes backed up")
+
+        self.run_in_background(
+            lambda progress: backup.backup_delta(db_manager, file_path, crypto=crypto, progress=progress),
+            done, "Backing up changes")
+
     def restore_database(self):
         """Restore database from backup"""
-        try:
-            from tkinter import filedialog
-            import shutil
-            
-            # Confirm action
-            if not messagebox.askyesno("Confirm Restore",
-                                       "This will replace your current database. Continue?"):
-                return
-            
-            # Get backup file
-            file_path = filedialog.askopenfilename(
-                title="Select backup file",
-                filetypes=[("Database files", "*.db"), ("All files", "*.*")]
+        from tkinter import filedialog
+
+        # Confirm action
+        if not messagebox.askyesno("Confirm Restore",
+                                   "This will replace your current database. Continue?"):
+            return
+
+        # Get backup file
+        file_path = filedialog.askopenfilename(
+            title="Select backup file",
+            filetypes=[("Backups", "*.nvbk *.gz *.db"), ("All files", "*.*")]
+        )
+        if not file_path:
+            return
+        deltas = ()
+        if messagebox.askyesno("Delta backups", "Apply delta backups taken after this one?"):
+            deltas = filedialog.askopenfilenames(
+                title="Select delta backups",
+                filetypes=[("Delta backups", "*.nvdelta *.jsonl.gz"), ("All files", "*.*")]
             )
-            
-            if file_path:
-                # Close current database connection
+        db_path = self.db_manager.db_path
+
+        def done(checked_path, error):
+            # The backup is decoded and checked off the Tk thread; only the
+            # swap itself happens with the database closed
+            if error:
+                messagebox.showerror("Error", f"Failed to restore database: {error}")
+                self.update_status("Restore failed")
+                return
+            try:
+                self.node_manager.monitor.stop()
+                # Let queued loads and saves finish against the old database
+                self.db_executor.wait_idle()
                 self.db_manager.close()
-                
-                # Restore database file
-                db_path = os.path.join('data', 'node_vault.db')
-                shutil.copy2(file_path, db_path)
-                
-                # Reinitialize database manager
-                self.db_manager = DatabaseManager(master_key=self.master_key)
-                
+                backup.install_restore(checked_path, db_path)
+            except Exception as e:
+                if os.path.exists(checked_path):
+                    os.remove(checked_path)
+                messagebox.showerror("Error", f"Failed to restore database: {str(e)}")
+                return
+            finally:
+                # Reopen whatever is now at db_path
+                self.db_manager = DatabaseManager(db_path, master_key=self.master_key,
+                                                  maintenance_interval=DB_MAINTENANCE_SECONDS)
+
                 # Refresh all managers
                 self.node_manager.db_manager = self.db_manager
+                self.node_manager.metrics.db_manager = self.db_manager
+                self.node_manager.monitor.db_manager = self.db_manager
+                self.node_manager.monitor.start(on_cycle=self.node_manager.health_results.put)
                 self.wallet_manager.db_manager = self.db_manager
+                self.wallet_manager.balance_sync.db_manager = self.db_manager
                 self.airdrop_manager.db_manager = self.db_manager
-                
+                self.airdrop_manager.deadlines.db_manager = self.db_manager
+
                 # Reload data
                 self.node_manager.load_nodes()
                 self.wallet_manager.load_wallets()
                 self.airdrop_manager.load_airdrops()
-                
-                messagebox.showinfo("Success", "Database restored successfully!")
-                self.update_status("Database restored")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to restore database: {str(e)}")
-            
+
+            messagebox.showinfo("Success", "Database restored successfully!")
+            self.update_status("Database restored")
+
+        self.run_in_background(
+            lambda progress: backup.prepare_chain_restore(
+                file_path, deltas, db_path, crypto=self.db_manager.crypto, progress=progress,
+                # Backups taken before a master password change use the key it replaced
+                retired=[CryptoManager(key=key) for key in retired_data_keys(self.master_key)]),
+            done, "Restoring")
+
     def show_about(self):
         """Show about dialog"""
         about_text = (
@@ -233,8 +340,13 @@ class MainWindow:
     def on_closing(self):
         """Handle window closing event"""
         if messagebox.askokcancel("Quit", "Do you want to quit Node-Vault-Py?"):
-            # Close database connection
+            # Stop the health probes and deadline timer, finish pending saves,
+            # then close the database and the RPC cache
+            self.node_manager.monitor.stop()
+            self.airdrop_manager.deadlines.stop()
+            self.db_executor.close()
             self.db_manager.close()
+            self.wallet_manager.rpc_cache.close()
             self.root.destroy()
             sys.exit(0)
 
@@ -1,20 +1,34 @@
 """Node Manager Module - GUI component for managing blockchain nodes"""
 
+import queue
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime
 
+from src.gui.busy import BusyIndicator
+from src.gui.virtual_tree import VirtualTreeview, KeysetRowSource, ListRowSource
+from src.gui.search_box import DebouncedSearch
+from src.database.metrics import NodeMetrics
+from src.services.db_executor import DbExecutor
+from src.services.health_monitor import HealthMonitor
+
 
 class NodeManager:
     """Manager for blockchain nodes"""
     
-    def __init__(self, parent, db_manager):
+    SEARCH_LIMIT = 500
+    HEALTH_INTERVAL = 60  # seconds between automatic health checks
+    HEALTH_POLL_MS = 500
+    
+    def __init__(self, parent, db_manager, executor=None):
         self.parent = parent
         self.db_manager = db_manager
-        self.nodes = []
+        # Database calls run on the executor's threads so the window stays responsive
+        self.executor = executor or DbExecutor(widget=parent)
         
         self.setup_ui()
         self.load_nodes()
+        self.start_health_monitor()
         
     def setup_ui(self):
         """Setup the user interface"""
@@ -31,22 +45,31 @@ class NodeManager:
         ttk.Button(toolbar, text="Delete Node", command=self.delete_node).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Refresh", command=self.load_nodes).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Export", command=self.export_nodes).pack(side=tk.LEFT, padx=5)
+        ttk.Button(toolbar, text="Check Health", command=self.check_health).pack(side=tk.LEFT, padx=5)
+        self.auto_check_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="Auto-check", variable=self.auto_check_var,
+                        command=self.toggle_auto_check).pack(side=tk.LEFT, padx=5)
+        self.health_label = ttk.Label(toolbar, text="")
+        self.health_label.pack(side=tk.LEFT, padx=10)
+        self.busy = BusyIndicator(toolbar)
         
         # Search bar
         search_frame = ttk.Frame(main_frame)
         search_frame.pack(fill=tk.X, pady=(0, 10))
         ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
         self.search_var = tk.StringVar()
-        self.search_var.trace('w', self.filter_nodes)
         search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
         search_entry.pack(side=tk.LEFT, padx=5)
+        self.search = DebouncedSearch(
+            self.parent, self.search_var, 'nodes',
+            lambda query: self.db_manager.search(query, tables=('nodes',), limit=self.SEARCH_LIMIT),
+            self.show_nodes, self.SEARCH_LIMIT, executor=self.executor, indicator=self.busy)
         
         # Treeview
-        tree_frame = ttk.Frame(main_frame)
-        tree_frame.pack(fill=tk.BOTH, expand=True)
-        
         columns = ('ID', 'Name', 'Address', 'Network', 'Port', 'Status', 'Last Sync')
-        self.tree = ttk.Treeview(tree_frame, columns=columns, show='tree headings', selectmode='browse')
+        # Only the visible rows exist as Treeview items; they are read from the database on demand
+        self.table = VirtualTreeview(main_frame, columns, self.node_values, show='tree headings', selectmode='browse')
+        self.tree = self.table.tree
         
         # Column headers
         self.tree.heading('#0', text='', anchor='w')
@@ -61,116 +84,159 @@ class NodeManager:
             else:
                 self.tree.column(col, width=120)
         
-        # Scrollbar
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
-        
-        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
         # Double-click to edit
-        self.tree.bind('<Double-1>', lambda e: self.edit_node())
+        self.table.bind('<Double-1>', lambda e: self.edit_node())
+        
+    @staticmethod
+    def node_values(node):
+        """Treeview values for a node row"""
+        return (
+            node['id'],
+            node['name'],
+            node['address'],
+            node['network'],
+            node['port'],
+            node['status'],
+            node.get('last_sync') or 'N/A'
+        )
         
     def load_nodes(self):
-        """Load nodes from database"""
-        self.tree.delete(*self.tree.get_children())
-        self.nodes = self.db_manager.get_all_nodes()
-        
-        for node in self.nodes:
-            self.tree.insert('', 'end', values=(
-                node['id'],
-                node['name'],
-                node['address'],
-                node['network'],
-                node['port'],
-                node['status'],
-                node.get('last_sync', 'N/A')
-            ))
+        """Reload nodes from the database, re-running the current search"""
+        self.search.run(force=True)
+            
+    def show_nodes(self, rows):
+        """Show search results, or every node when `rows` is None"""
+        if rows is not None:
+            self.table.set_source(ListRowSource(rows))
+        else:
+            self.table.set_source(KeysetRowSource(
+                lambda after, limit, offset: self.db_manager.get_nodes_page(after, limit, offset=offset),
+                lambda: self.db_manager.count_rows('nodes'),
+                executor=self.executor, indicator=self.busy))
+            
+    def refresh_nodes(self):
+        """Re-read the displayed nodes, keeping the scroll position"""
+        if self.search.query:
+            self.search.run(force=True)
+        else:
+            self.table.refresh()
             
     def filter_nodes(self, *args):
-        """Filter nodes based on search query"""
-        query = self.search_var.get().lower()
-        self.tree.delete(*self.tree.get_children())
-        
-        for node in self.nodes:
-            if (query in str(node['name']).lower() or 
-                query in str(node['address']).lower() or
-                query in str(node['network']).lower()):
-                self.tree.insert('', 'end', values=(
-                    node['id'],
-                    node['name'],
-                    node['address'],
-                    node['network'],
-                    node['port'],
-                    node['status'],
-                    node.get('last_sync', 'N/A')
-                ))
+        """Apply the search box query immediately instead of after the debounce delay"""
+        self.search.run()
                 
+    def start_health_monitor(self):
+        """Probe nodes on a background thread; results come back through a queue polled here"""
+        self.health_results = queue.Queue()
+        self.metrics = NodeMetrics(self.db_manager)
+        self.monitor = HealthMonitor(self.db_manager, metrics=self.metrics)
+        self.monitor.start(on_cycle=self.health_results.put)
+        self.parent.after(self.HEALTH_POLL_MS, self.poll_health)
+        
+    def check_health(self):
+        """Probe every node now"""
+        self.health_label.config(text="Checking nodes...")
+        self.monitor.check_now()
+        
+    def toggle_auto_check(self):
+        self.monitor.set_interval(self.HEALTH_INTERVAL if self.auto_check_var.get() else None)
+        
+    def poll_health(self):
+        """Apply finished health checks on the Tk thread"""
+        try:
+            while True:
+                summary = self.health_results.get_nowait()
+                if 'error' in summary:
+                    self.health_label.config(text=f"Health check failed: {summary['error']}")
+                else:
+                    self.health_label.config(text=(
+                        f"{summary['Active']} active, {summary['Syncing']} syncing, "
+                        f"{summary['Offline']} offline ({datetime.now().strftime('%H:%M:%S')})"))
+                    self.refresh_nodes()
+        except queue.Empty:
+            pass
+        self.parent.after(self.HEALTH_POLL_MS, self.poll_health)
+        
     def add_node(self):
         """Add new node"""
-        NodeDialog(self.parent, self.db_manager, callback=self.load_nodes)
+        NodeDialog(self.parent, self.db_manager, self.executor, callback=self.refresh_nodes)
         
     def edit_node(self):
         """Edit selected node"""
-        selection = self.tree.selection()
-        if not selection:
+        node_id = self.table.selected_id()
+        if node_id is None:
             messagebox.showwarning("No Selection", "Please select a node to edit")
             return
             
-        item = self.tree.item(selection[0])
-        node_id = item['values'][0]
-        NodeDialog(self.parent, self.db_manager, node_id=node_id, callback=self.load_nodes)
+        NodeDialog(self.parent, self.db_manager, self.executor, node_id=node_id, callback=self.refresh_nodes)
         
     def delete_node(self):
         """Delete selected node"""
-        selection = self.tree.selection()
-        if not selection:
+        node_id = self.table.selected_id()
+        if node_id is None:
             messagebox.showwarning("No Selection", "Please select a node to delete")
             return
             
         if messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this node?"):
-            item = self.tree.item(selection[0])
-            node_id = item['values'][0]
-            self.db_manager.delete_node(node_id)
-            self.load_nodes()
-            messagebox.showinfo("Success", "Node deleted successfully")
+            self.executor.write(self.db_manager.delete_node, node_id, indicator=self.busy,
+                                message="Deleting...", on_done=self.node_deleted)
+            
+    def node_deleted(self, result, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to delete node: {error}")
+            return
+        self.refresh_nodes()
+        messagebox.showinfo("Success", "Node deleted successfully")
             
     def export_nodes(self):
         """Export nodes to CSV"""
-        try:
-            from tkinter import filedialog
-            import csv
-            
-            filename = filedialog.asksaveasfilename(
-                defaultextension=".csv",
-                filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
-            )
+        from tkinter import filedialog
+        
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".csv",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+        )
+        
+        if filename:
+            self.executor.read(self.write_csv, filename, indicator=self.busy, message="Exporting...",
+                               on_done=lambda count, error: self.nodes_exported(filename, count, error))
             
-            if filename:
-                with open(filename, 'w', newline='', encoding='utf-8') as f:
-                    writer = csv.writer(f)
-                    writer.writerow(['ID', 'Name', 'Address', 'Network', 'Port', 'Status', 'Last Sync', 'Notes'])
-                    for node in self.nodes:
-                        writer.writerow([
-                            node['id'],
-                            node['name'],
-                            node['address'],
-                            node['network'],
-                            node['port'],
-                            node['status'],
-                            node.get('last_sync', ''),
-                            node.get('notes', '')
-                        ])
-                messagebox.showinfo("Success", f"Exported {len(self.nodes)} nodes to {filename}")
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to export: {str(e)}")
+    def write_csv(self, filename):
+        """Write every node to `filename`; runs on an executor thread"""
+        import csv
+        
+        count = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['ID', 'Name', 'Address', 'Network', 'Port', 'Status', 'Last Sync', 'Notes'])
+            # Stream from the database so unloaded pages are exported too
+            for node in self.db_manager.iter_rows('nodes'):
+                writer.writerow([
+                    node['id'],
+                    node['name'],
+                    node['address'],
+                    node['network'],
+                    node['port'],
+                    node['status'],
+                    node.get('last_sync', ''),
+                    node.get('notes', '')
+                ])
+                count += 1
+        return count
+        
+    def nodes_exported(self, filename, count, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to export: {str(error)}")
+        else:
+            messagebox.showinfo("Success", f"Exported {count} nodes to {filename}")
 
 
 class NodeDialog:
     """Dialog for adding/editing nodes"""
     
-    def __init__(self, parent, db_manager, node_id=None, callback=None):
+    def __init__(self, parent, db_manager, executor, node_id=None, callback=None):
         self.db_manager = db_manager
+        self.executor = executor
         self.node_id = node_id
         self.callback = callback
         
@@ -211,7 +277,7 @@ class NodeDialog:
         ttk.Label(main_frame, text="Status:").grid(row=4, column=0, sticky='w', pady=5)
         self.status_var = tk.StringVar(value="Active")
         ttk.Combobox(main_frame, textvariable=self.status_var, 
-                     values=['Active', 'Inactive'], width=37).grid(row=4, column=1, pady=5)
+                     values=['Active', 'Inactive', 'Syncing', 'Offline'], width=37).grid(row=4, column=1, pady=5)
         
         ttk.Label(main_frame, text="Notes:").grid(row=5, column=0, sticky='nw', pady=5)
         self.notes_text = scrolledtext.ScrolledText(main_frame, width=40, height=10)
@@ -221,19 +287,31 @@ class NodeDialog:
         button_frame = ttk.Frame(main_frame)
         button_frame.grid(row=6, column=0, columnspan=2, pady=20)
         
-        ttk.Button(button_frame, text="Save", command=self.save).pack(side=tk.LEFT, padx=5)
+        self.save_button = ttk.Button(button_frame, text="Save", command=self.save)
+        self.save_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Cancel", command=self.dialog.destroy).pack(side=tk.LEFT, padx=5)
+        self.busy = BusyIndicator(button_frame, side=tk.LEFT, padx=5)
         
     def load_node_data(self):
         """Load existing node data"""
-        node = self.db_manager.get_node(self.node_id)
+        self.save_button.config(state=tk.DISABLED)
+        self.executor.read(self.db_manager.get_node, self.node_id, indicator=self.busy,
+                           on_done=self.show_node_data)
+            
+    def show_node_data(self, node, error):
+        if not self.dialog.winfo_exists():
+            return
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to load node: {error}", parent=self.dialog)
+            return
+        self.save_button.config(state=tk.NORMAL)
         if node:
             self.name_var.set(node['name'])
             self.address_var.set(node['address'])
             self.network_var.set(node['network'])
-            self.port_var.set(node['port'])
+            self.port_var.set(node['port'] or '')
             self.status_var.set(node['status'])
-            self.notes_text.insert('1.0', node.get('notes', ''))
+            self.notes_text.insert('1.0', node.get('notes') or '')
             
     def save(self):
         """Save node"""
@@ -257,17 +335,23 @@ class NodeDialog:
             'last_sync': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
         
-        try:
-            if self.node_id:
-                self.db_manager.update_node(self.node_id, node_data)
-                messagebox.showinfo("Success", "Node updated successfully")
-            else:
-                self.db_manager.add_node(node_data)
-                messagebox.showinfo("Success", "Node added successfully")
-                
-            if self.callback:
-                self.callback()
-                
+        self.save_button.config(state=tk.DISABLED)
+        if self.node_id:
+            self.executor.write(self.db_manager.update_node, self.node_id, node_data,
+                                indicator=self.busy, on_done=self.saved)
+        else:
+            self.executor.write(self.db_manager.add_node, node_data, indicator=self.busy, on_done=self.saved)
+            
+    def saved(self, result, error):
+        if error is not None:
+            if self.dialog.winfo_exists():
+                self.save_button.config(state=tk.NORMAL)
+            messagebox.showerror("Error", f"Failed to save node: {str(error)}")
+            return
+        messagebox.showinfo("Success", "Node updated successfully" if self.node_id else "Node added successfully")
+        
+        if self.callback:
+            self.callback()
+            
+        if self.dialog.winfo_exists():
             self.dialog.destroy()
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save node: {str(e)}")
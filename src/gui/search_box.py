@@ -0,0 +1,133 @@
+"""Debounced, incremental search for the manager tabs"""
+
+from src.database.db_manager import DatabaseManager
+from src.database.schema import FTS_COLUMNS
+
+
+class DebouncedSearch:
+    """Run a search box query only once typing pauses, narrowing locally when possible
+
+    Each keystroke just (re)arms a Tk after() timer. When it fires and the
+    new query only extends the previous one (more characters or more terms),
+    the previous result set is filtered in memory instead of querying the
+    database again, provided that result set was complete (shorter than the
+    limit). Lower-cased search keys are computed once per row and cached.
+    The in-memory matcher follows the FTS query rules: every term must
+    match, consecutive tokens as a phrase, the last token as a prefix.
+    With a DbExecutor, database queries run on its reader threads and only
+    the result of the latest one is applied.
+    """
+
+    DELAY_MS = 250
+
+    def __init__(self, widget, var, table, fetch, on_results, limit, delay_ms=None, executor=None,
+                 indicator=None):
+        """
+        Args:
+            widget: Any widget, used for after() scheduling
+            var: The search box StringVar
+            table: Table whose FTS columns are matched
+            fetch: Callable(query) returning ranked rows from the database
+            on_results: Callable(rows) - rows is None when the query is empty
+            limit: Maximum rows `fetch` returns
+            executor: DbExecutor to fetch with, or None to fetch synchronously
+            indicator: BusyIndicator shown while fetching
+        """
+        self.widget = widget
+        self.var = var
+        self.fields = FTS_COLUMNS[table]
+        self.fetch = fetch
+        self.on_results = on_results
+        self.limit = limit
+        self.delay_ms = delay_ms or self.DELAY_MS
+        self.executor = executor
+        self.indicator = indicator
+        self._generation = 0       # Bumped per database query; older results are dropped
+        self._fetching = None      # Query being fetched on the executor
+        self._pending = None
+        self._keys = {}
+        self.invalidate()
+        self.var.trace('w', self.schedule)
+
+    @property
+    def query(self):
+        return self.var.get().strip().lower()
+
+    def invalidate(self):
+        """Forget previous results, e.g. after rows were added or edited"""
+        self._last_query = None
+        self._last_rows = None
+        self._fetching = None
+        self._keys.clear()
+
+    def schedule(self, *args):
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+        self._pending = self.widget.after(self.delay_ms, self.run)
+
+    def run(self, force=False):
+        """Apply the current query now (force re-queries the database)"""
+        if self._pending is not None:
+            self.widget.after_cancel(self._pending)
+            self._pending = None
+        if force:
+            self.invalidate()
+        query = self.query
+        if query == self._last_query and self._fetching is None or query == self._fetching:
+            return
+        self._generation += 1
+        self._fetching = None
+        if not DatabaseManager.fts_query(query):
+            rows = None
+        elif self._can_narrow(query):
+            phrases = self._phrases(query)
+            rows = [row for row in self._last_rows if self._matches(row, phrases)]
+        elif self.executor is not None:
+            generation, self._fetching = self._generation, query
+            self.executor.read(self.fetch, query, indicator=self.indicator, message="Searching...",
+                               on_done=lambda rows, error: self._fetched(generation, query, rows, error))
+            return
+        else:
+            rows = self.fetch(query)
+        self._apply(query, rows)
+
+    def _fetched(self, generation, query, rows, error):
+        if generation != self._generation:
+            return
+        self._fetching = None
+        if error is not None:
+            # Leave the current results; the next keystroke or refresh retries
+            return
+        self._apply(query, rows)
+
+    def _apply(self, query, rows):
+        self._last_query, self._last_rows = query, rows
+        self.on_results(rows)
+
+    def _can_narrow(self, query):
+        previous, rows = self._last_query, self._last_rows
+        return (rows is not None and len(rows) < self.limit
+                and query.startswith(previous) and bool(DatabaseManager.fts_query(previous)))
+
+    @staticmethod
+    def _phrases(query):
+        return [tokens for tokens in (DatabaseManager.search_tokens(term) for term in query.split()) if tokens]
+
+    def _key(self, row):
+        key = self._keys.get(row['id'])
+        if key is None:
+            key = [DatabaseManager.search_tokens(str(row.get(f) or '')) for f in self.fields]
+            self._keys[row['id']] = key
+        return key
+
+    def _matches(self, row, phrases):
+        key = self._key(row)
+        return all(any(self._phrase_in(column, phrase) for column in key) for phrase in phrases)
+
+    @staticmethod
+    def _phrase_in(tokens, phrase):
+        head, last = phrase[:-1], phrase[-1]
+        for i in range(len(tokens) - len(phrase) + 1):
+            if tokens[i:i + len(head)] == head and tokens[i + len(head)].startswith(last):
+                return True
+        return False
@@ -0,0 +1,314 @@
+"""Virtual Treeview - renders only the visible window of a large row source"""
+
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+
+class ListRowSource:
+    """Row source over an in-memory list of row dicts"""
+
+    def __init__(self, rows=None):
+        self.rows_list = list(rows or [])
+
+    def __len__(self):
+        return len(self.rows_list)
+
+    def rows(self, start, count):
+        return self.rows_list[start:start + count]
+
+    def invalidate(self):
+        pass
+
+
+class KeysetRowSource:
+    """Row source reading fixed-size blocks from the database on demand
+
+    Blocks are fetched with a keyset cursor taken from the end of the
+    previous block when it is known (sequential scrolling) and by OFFSET
+    otherwise (dragging the scrollbar far ahead). Only `max_blocks` blocks
+    are kept in memory.
+
+    With a DbExecutor, the count and the blocks are fetched on its reader
+    threads: a block not loaded yet is shown as empty placeholder rows (or,
+    after invalidate(), as its previous rows) and `on_loaded` is called on
+    the Tk thread once it arrives.
+    """
+
+    def __init__(self, fetch_page, count_rows, block_size=200, max_blocks=20, order_by='id',
+                 executor=None, indicator=None):
+        """
+        Args:
+            fetch_page: Callable(after, limit, offset) returning a list of row dicts
+            count_rows: Callable() returning the total number of rows
+            executor: DbExecutor to fetch with, or None to fetch synchronously
+            indicator: BusyIndicator shown while fetching
+        """
+        self.fetch_page = fetch_page
+        self.count_rows = count_rows
+        self.block_size = block_size
+        self.max_blocks = max_blocks
+        self.order_by = order_by
+        self.executor = executor
+        self.indicator = indicator
+        self.on_loaded = None
+        self._generation = 0
+        self._count = None
+        self._blocks = OrderedDict()
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget cached rows and the row count, e.g. after an insert or delete"""
+        # Asynchronously, the old rows stay on screen until their replacements arrive
+        self._stale_count = self._count if self._count is not None else getattr(self, '_stale_count', None)
+        self._stale = dict(self._blocks) if self.executor is not None else {}
+        self._generation += 1
+        self._count = None
+        self._blocks = OrderedDict()
+        self._cursors = {}
+        self._loading = set()
+        self.error = None
+
+    def __len__(self):
+        if self._count is None:
+            if self.executor is None:
+                self._count = self.count_rows()
+            else:
+                self._request('count')
+                return self._stale_count or 0
+        return self._count
+
+    def rows(self, start, count):
+        if count <= 0:
+            return []
+        first, last = start // self.block_size, (start + count - 1) // self.block_size
+        out = []
+        for block in range(first, last + 1):
+            out.extend(self._block(block))
+        skip = start - first * self.block_size
+        return out[skip:skip + count]
+
+    def _block(self, index):
+        if index in self._blocks:
+            self._blocks.move_to_end(index)
+            return self._blocks[index]
+        if self.executor is not None:
+            self._request(index)
+            if index in self._stale:
+                return self._stale[index]
+            return [{}] * max(0, min(self.block_size, len(self) - index * self.block_size))
+        self._store(index, self.fetch_page(*self._page_args(index)))
+        return self._blocks[index]
+
+    def _page_args(self, index):
+        cursor = self._cursors.get(index)
+        if index == 0 or cursor is not None:
+            return cursor, self.block_size, 0
+        return None, self.block_size, index * self.block_size
+
+    def _store(self, index, rows):
+        if len(rows) == self.block_size:
+            last = rows[-1]
+            self._cursors[index + 1] = (last.get(self.order_by), last['id'])
+        self._blocks[index] = rows
+        while len(self._blocks) > self.max_blocks:
+            self._blocks.popitem(last=False)
+
+    def _request(self, key):
+        if key in self._loading or self.error is not None:
+            return
+        self._loading.add(key)
+        generation = self._generation
+        fn, args = (self.count_rows, ()) if key == 'count' else (self.fetch_page, self._page_args(key))
+        self.executor.read(fn, *args, indicator=self.indicator,
+                           on_done=lambda result, error: self._loaded(generation, key, result, error))
+
+    def _loaded(self, generation, key, result, error):
+        if generation != self._generation:
+            return
+        self._loading.discard(key)
+        if error is not None:
+            # Shown as empty rows; no retries until the next invalidate()
+            self.error = error
+            result = 0 if key == 'count' else []
+        if key == 'count':
+            self._count = result
+        else:
+            self._store(key, result)
+        if not self._loading:
+            self._stale = {}
+        if self.on_loaded:
+            self.on_loaded()
+
+
+class VirtualTreeview:
+    """A ttk.Treeview that holds only as many items as fit on screen
+
+    The items are recycled as the view scrolls: scrolling rewrites their
+    values from the row source instead of inserting or deleting items, so
+    building, scrolling and clearing cost the same for 100 or 1,000,000
+    rows.
+    """
+
+    WHEEL_UNITS = 3
+
+    def __init__(self, parent, columns, to_values, **tree_kwargs):
+        """
+        Args:
+            parent: Parent widget
+            columns: Treeview column identifiers
+            to_values: Callable(row) returning the Treeview values tuple
+        """
+        self.to_values = to_values
+        self.source = ListRowSource()
+        self.top = 0
+        self.selected_index = None
+        self._items = []
+        self._detached = set()
+        self._visible = 1
+
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(frame, columns=columns, **tree_kwargs)
+        self.scrollbar = ttk.Scrollbar(frame, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.tree.bind('<Configure>', lambda e: self._resize())
+        self.tree.bind('<<TreeviewSelect>>', self._on_select)
+        self.tree.bind('<MouseWheel>', self._on_wheel)
+        self.tree.bind('<Button-4>', lambda e: self.scroll(-self.WHEEL_UNITS) or 'break')
+        self.tree.bind('<Button-5>', lambda e: self.scroll(self.WHEEL_UNITS) or 'break')
+        for key, step in (('<Up>', -1), ('<Down>', 1), ('<Prior>', None), ('<Next>', None)):
+            self.tree.bind(key, lambda e, step=step, key=key: self._on_key(key, step))
+        self.tree.bind('<Home>', lambda e: self.select_index(0) or 'break')
+        self.tree.bind('<End>', lambda e: self.select_index(len(self.source) - 1) or 'break')
+
+    # Public API
+    def set_source(self, source):
+        """Display a new row source from the top"""
+        self.source = source
+        if hasattr(source, 'on_loaded'):
+            source.on_loaded = self.render
+        self.top = 0
+        self.selected_index = None
+        self.render()
+
+    def refresh(self):
+        """Re-read the current source, keeping the scroll position"""
+        self.source.invalidate()
+        self.render()
+
+    def bind(self, sequence, func):
+        self.tree.bind(sequence, func, add='+')
+
+    def selected_row(self):
+        if self.selected_index is None or self.selected_index >= len(self.source):
+            return None
+        rows = self.source.rows(self.selected_index, 1)
+        return rows[0] if rows else None
+
+    def selected_id(self):
+        row = self.selected_row()
+        # Rows still loading are empty placeholders
+        return row.get('id') if row else None
+
+    def select_index(self, index):
+        total = len(self.source)
+        if not total:
+            return
+        index = max(0, min(index, total - 1))
+        self.selected_index = index
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self._visible:
+            self.top = index - self._visible + 1
+        self.render()
+        self.tree.focus_set()
+
+    def scroll(self, units):
+        self._scroll_to(self.top + units)
+
+    # Rendering
+    def render(self):
+        total = len(self.source)
+        self.top = max(0, min(self.top, total - self._visible))
+        rows = self.source.rows(self.top, self._visible)
+        self._ensure_items(self._visible)
+        for i, iid in enumerate(self._items):
+            if i < len(rows):
+                self.tree.item(iid, values=self.to_values(rows[i]) if rows[i] else ())
+                if iid in self._detached:
+                    self.tree.move(iid, '', i)
+                    self._detached.discard(iid)
+            elif iid not in self._detached:
+                # Spare items are hidden rather than deleted so they can be reused
+                self.tree.detach(iid)
+                self._detached.add(iid)
+        selected = self.selected_index
+        if selected is not None and self.top <= selected < self.top + len(rows):
+            iid = self._items[selected - self.top]
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+        else:
+            self.tree.selection_set(())
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + len(rows)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _ensure_items(self, count):
+        while len(self._items) < count:
+            self._items.append(self.tree.insert('', 'end', iid=f'row{len(self._items)}'))
+        while len(self._items) > count:
+            iid = self._items.pop()
+            self._detached.discard(iid)
+            self.tree.delete(iid)
+
+    def _resize(self):
+        height = self.tree.winfo_height()
+        row_height = int(ttk.Style().lookup('Treeview', 'rowheight') or 20)
+        header = 0
+        if self._items and self.tree.bbox(self._items[0]):
+            x, y, w, h = self.tree.bbox(self._items[0])
+            header, row_height = y, h
+        elif 'headings' in str(self.tree.cget('show')):
+            header = row_height + 4
+        visible = max(1, (height - header) // row_height)
+        if visible != self._visible:
+            self._visible = visible
+            self.render()
+
+    def _scroll_to(self, top):
+        top = max(0, min(top, len(self.source) - self._visible))
+        if top != self.top:
+            self.top = top
+            self.render()
+
+    # Event handlers
+    def _on_scrollbar(self, action, *args):
+        if action == 'moveto':
+            self._scroll_to(int(float(args[0]) * len(self.source)))
+        elif action == 'scroll':
+            amount, what = int(args[0]), args[1]
+            self.scroll(amount * (self._visible if what == 'pages' else 1))
+
+    def _on_wheel(self, event):
+        # Windows reports multiples of 120 per notch, macOS small deltas
+        notches = event.delta // 120 if abs(event.delta) >= 120 else (1 if event.delta > 0 else -1)
+        self.scroll(-notches * self.WHEEL_UNITS)
+        return 'break'
+
+    def _on_select(self, event):
+        # Also fires (queued) after render() moves the selection; the mapping
+        # below is the same then, so the handler is idempotent
+        selection = self.tree.selection()
+        if selection and selection[0] in self._items:
+            self.selected_index = self.top + self._items.index(selection[0])
+
+    def _on_key(self, key, step):
+        if step is None:
+            step = self._visible if key == '<Next>' else -self._visible
+        current = self.selected_index if self.selected_index is not None else self.top - 1
+        self.select_index(current + step)
+        return 'break'
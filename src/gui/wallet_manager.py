@@ -1,12 +1,28 @@
-  import tkinter as tk
+import os
+import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
 
+from src.gui.busy import BusyIndicator
+from src.gui.virtual_tree import VirtualTreeview, KeysetRowSource, ListRowSource
+from src.gui.search_box import DebouncedSearch
+from src.services.balance_sync import BalanceSync
+from src.services.db_executor import DbExecutor
+from src.services.rpc_cache import RpcCache
+
 class WalletManager:
-    def __init__(self, parent, db_manager):
+    SEARCH_LIMIT = 500
+    RPC_RATE_LIMIT = 10  # HTTP requests per second to each node endpoint
+
+    def __init__(self, parent, db_manager, executor=None):
         self.parent = parent
         self.db_manager = db_manager
-        self.wallets = []
+        self.executor = executor or DbExecutor(widget=parent)
+        # Shared by every balance sync, so quick repeated syncs don't refetch;
+        # kept next to the vault so restarts only refetch expired entries
+        self.rpc_cache = RpcCache(disk_path=os.path.join(os.path.dirname(db_manager.db_path) or '.', 'rpc_cache.db'))
+        # Reused across syncs, so its per-endpoint sessions and rate limiters are too
+        self.balance_sync = BalanceSync(db_manager, cache=self.rpc_cache, default_rate_limit=self.RPC_RATE_LIMIT)
         self.setup_ui()
         self.load_wallets()
 
@@ -20,43 +36,100 @@ class WalletManager:
         ttk.Button(toolbar, text="Edit Wallet", command=self.edit_wallet).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Delete Wallet", command=self.delete_wallet).pack(side=tk.LEFT, padx=5)
         ttk.Button(toolbar, text="Refresh", command=self.load_wallets).pack(side=tk.LEFT, padx=5)
+        self.sync_button = ttk.Button(toolbar, text="Sync Balances", command=self.sync_balances)
+        self.sync_button.pack(side=tk.LEFT, padx=5)
+        self.sync_label = ttk.Label(toolbar, text="")
+        self.sync_label.pack(side=tk.LEFT, padx=10)
+        self.busy = BusyIndicator(toolbar)
+
+        search_frame = ttk.Frame(main_frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.search_var, width=40).pack(side=tk.LEFT, padx=5)
+        self.search = DebouncedSearch(
+            self.parent, self.search_var, 'wallets',
+            lambda query: self.db_manager.search(query, tables=('wallets',), limit=self.SEARCH_LIMIT),
+            self.show_wallets, self.SEARCH_LIMIT, executor=self.executor, indicator=self.busy)
 
         columns = ('ID', 'Name', 'Address', 'Network', 'Type', 'Balance')
-        self.tree = ttk.Treeview(main_frame, columns=columns, show='headings', selectmode='browse')
+        self.table = VirtualTreeview(
+            main_frame, columns,
+            lambda w: (w.get('id'), w.get('name'), w.get('address'), w.get('network'), w.get('type'), w.get('balance')),
+            show='headings', selectmode='browse')
+        self.tree = self.table.tree
         for col in columns:
             self.tree.heading(col, text=col)
             self.tree.column(col, width=115 if col != 'ID' else 50)
-        self.tree.pack(fill=tk.BOTH, expand=True)
-        self.tree.bind('<Double-1>', lambda e: self.edit_wallet())
+        self.table.bind('<Double-1>', lambda e: self.edit_wallet())
 
     def load_wallets(self):
-        self.tree.delete(*self.tree.get_children())
-        self.wallets = self.db_manager.get_all_wallets() or []
-        for w in self.wallets:
-            self.tree.insert('', 'end', values=(
-                w.get('id'), w.get('name'), w.get('address'), w.get('network'), w.get('type'), w.get('balance')))
+        self.search.run(force=True)
+
+    def show_wallets(self, rows):
+        if rows is not None:
+            self.table.set_source(ListRowSource(rows))
+        else:
+            self.table.set_source(KeysetRowSource(
+                lambda after, limit, offset: self.db_manager.get_wallets_page(after, limit, offset=offset),
+                lambda: self.db_manager.count_rows('wallets'),
+                executor=self.executor, indicator=self.busy))
+
+    def refresh_wallets(self):
+        if self.search.query:
+            self.search.run(force=True)
+        else:
+            self.table.refresh()
+
+    def sync_balances(self):
+        # RPC calls run on the executor's background thread, not a reader it needs
+        # for queries; the balances are then stored by its writer
+        self.sync_button.state(['disabled'])
+        self.sync_label.config(text="Syncing balances...")
+        self.executor.background(self.balance_sync.fetch, indicator=self.busy, message="Syncing...",
+                           on_done=self.balances_fetched)
+
+    def balances_fetched(self, fetched, error):
+        if error is not None:
+            return self.balances_synced(None, error)
+        balances, stats = fetched
+        self.executor.write(self.db_manager.update_wallet_balances, balances, indicator=self.busy,
+                            on_done=lambda result, error: self.balances_synced(stats, error))
+
+    def balances_synced(self, stats, error):
+        self.sync_button.state(['!disabled'])
+        if error is not None:
+            self.sync_label.config(text=f"Balance sync failed: {error}")
+            return
+        self.sync_label.config(text=f"{stats['updated']} updated, {stats['failed']} failed, "
+                                    f"{stats['skipped']} without endpoint ({datetime.now().strftime('%H:%M:%S')})")
+        self.refresh_wallets()
 
     def add_wallet(self):
-        WalletDialog(self.parent, self.db_manager, callback=self.load_wallets)
+        WalletDialog(self.parent, self.db_manager, self.executor, callback=self.refresh_wallets)
 
     def edit_wallet(self):
-        sel = self.tree.selection()
-        if not sel: return
-        item = self.tree.item(sel[0])
-        WalletDialog(self.parent, self.db_manager, wallet_id=item['values'][0], callback=self.load_wallets)
+        wid = self.table.selected_id()
+        if wid is None: return
+        WalletDialog(self.parent, self.db_manager, self.executor, wallet_id=wid, callback=self.refresh_wallets)
 
     def delete_wallet(self):
-        sel = self.tree.selection()
-        if not sel: return
-        item = self.tree.item(sel[0])
-        wid = item['values'][0]
+        wid = self.table.selected_id()
+        if wid is None: return
         if messagebox.askyesno("Confirm", "Delete this wallet?"):
-            self.db_manager.delete_wallet(wid)
-            self.load_wallets()
+            self.executor.write(self.db_manager.delete_wallet, wid, indicator=self.busy, message="Deleting...",
+                                on_done=self.wallet_deleted)
+
+    def wallet_deleted(self, result, error):
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to delete wallet: {error}")
+            return
+        self.refresh_wallets()
 
 class WalletDialog:
-    def __init__(self, parent, db_manager, wallet_id=None, callback=None):
+    def __init__(self, parent, db_manager, executor, wallet_id=None, callback=None):
         self.db_manager = db_manager
+        self.executor = executor
         self.wallet_id = wallet_id
         self.callback = callback
         self.dialog = tk.Toplevel(parent)
@@ -90,19 +163,31 @@ class WalletDialog:
         ttk.Entry(f, textvariable=self.private_key, show="•").grid(row=5, column=1)
         ttk.Label(f, text="Notes").grid(row=6, column=0, sticky='w')
         ttk.Entry(f, textvariable=self.notes).grid(row=6, column=1)
-        ttk.Button(f, text="Save", command=self.save).grid(row=10, column=0, pady=16)
+        self.save_button = ttk.Button(f, text="Save", command=self.save)
+        self.save_button.grid(row=10, column=0, pady=16)
         ttk.Button(f, text="Cancel", command=self.dialog.destroy).grid(row=10, column=1)
+        status = ttk.Frame(f)
+        status.grid(row=11, column=0, columnspan=2)
+        self.busy = BusyIndicator(status)
     def load_data(self):
-        wallets = self.db_manager.execute("SELECT * FROM wallets WHERE id=?", (self.wallet_id,), fetch=True)
-        if not wallets: return
-        w = wallets[0]
+        # The only place a private key is decrypted, and only for this wallet
+        self.save_button.state(['disabled'])
+        self.executor.read(lambda: self.db_manager.get_wallet(self.wallet_id, decrypt=True),
+                           indicator=self.busy, on_done=self.show_data)
+    def show_data(self, w, error):
+        if not self.dialog.winfo_exists(): return
+        if error is not None:
+            messagebox.showerror("Error", f"Failed to load wallet: {error}", parent=self.dialog)
+            return
+        self.save_button.state(['!disabled'])
+        if not w: return
         self.name.set(w['name'])
         self.address.set(w['address'])
         self.network.set(w['network'])
         self.type.set(w['type'])
-        self.balance.set(w['balance'])
-        self.private_key.set(w.get('private_key',''))
-        self.notes.set(w.get('notes',''))
+        self.balance.set(w['balance'] or '')
+        self.private_key.set(w.get('private_key') or '')
+        self.notes.set(w.get('notes') or '')
     def save(self):
         data = {
             'name': self.name.get(),
@@ -113,11 +198,17 @@ class WalletDialog:
             'private_key': self.private_key.get(),
             'notes': self.notes.get(),
         }
+        # Encrypting the key and writing happen on the executor's writer thread
+        self.save_button.state(['disabled'])
         if self.wallet_id:
-            self.db_manager.execute(
-                "UPDATE wallets SET name=?, address=?, network=?, type=?, balance=?, private_key=?, notes=? WHERE id=?",
-                (data['name'], data['address'], data['network'], data['type'], data['balance'], data['private_key'], data['notes'], self.wallet_id))
+            self.executor.write(self.db_manager.update_wallet, self.wallet_id, data,
+                                indicator=self.busy, on_done=self.saved)
         else:
-            self.db_manager.add_wallet(data)
+            self.executor.write(self.db_manager.add_wallet, data, indicator=self.busy, on_done=self.saved)
+    def saved(self, result, error):
+        if error is not None:
+            if self.dialog.winfo_exists(): self.save_button.state(['!disabled'])
+            messagebox.showerror("Error", f"Failed to save wallet: {error}")
+            return
         if self.callback: self.callback()
-        self.dialog.destroy()
+        if self.dialog.winfo_exists(): self.dialog.destroy()
@@ -0,0 +1,15 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Services Package for Node-Vault-Py
+
+This package contains background services that work on the vault data:
+- Node health monitoring
+- JSON-RPC client, response cache and wallet balance refresh
+- Database executor keeping queries off the GUI thread
+
+Author: Dali-Math
+License: MIT
+"""
+
+__all__ = ['health_monitor', 'rpc_client', 'rpc_cache', 'balance_sync', 'db_executor']
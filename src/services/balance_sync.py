@@ -0,0 +1,135 @@
+"""Wallet balance refresh over JSON-RPC"""
+
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from src.services.health_monitor import node_endpoint
+from src.services.rpc_cache import CachedRpcClient
+from src.services.rpc_client import JsonRpcClient, JsonRpcError
+
+WEI_PER_ETHER = 10 ** 18
+ADDRESS = re.compile(r'^0x[0-9a-fA-F]{40}$')
+
+
+def endpoints_from_nodes(db_manager):
+    """{network (lower-case): RPC URL}, using the first active node of each network"""
+    endpoints = {}
+    for node in db_manager.iter_rows('nodes'):
+        network = (node.get('network') or '').strip().lower()
+        if not network or network in endpoints or node.get('status') not in ('Active', 'Syncing'):
+            continue
+        address = str(node.get('address') or '').strip()
+        if address.startswith(('http://', 'https://')):
+            endpoints[network] = address
+        else:
+            endpoint = node_endpoint(node)
+            if endpoint:
+                host, port, path = endpoint
+                endpoints[network] = f'http://{host}:{port}{path}'
+    return endpoints
+
+
+class BalanceSync:
+    """Refresh wallets.balance with eth_getBalance, one JSON-RPC client per network
+
+    Wallets are grouped by network and each network's addresses are
+    fetched in JSON-RPC batches over a pooled session, with the networks
+    running in parallel. All balances are then written in one transaction.
+
+    Keep one instance for repeated syncs: its clients, with their sessions
+    and rate limiters, are reused. Endpoints taken from the nodes table are
+    re-read at the start of every sync, and only the clients whose URL
+    changed are replaced.
+    """
+
+    def __init__(self, db_manager, endpoints=None, rate_limits=None, batch_size=100, timeout=10.0,
+                 clients=None, cache=None, default_rate_limit=None):
+        """
+        Args:
+            endpoints: {network: RPC URL}; default: the active nodes per network,
+                re-read on every sync
+            rate_limits: {network or URL: HTTP requests per second}
+            clients: {network: client with a batch() method}, overriding endpoints
+            cache: RpcCache answering repeated lookups (e.g. shared addresses)
+            default_rate_limit: Requests per second for endpoints not in rate_limits
+        """
+        self.db_manager = db_manager
+        # Endpoints from the nodes table are read by sync(), on the thread running it
+        self.auto_endpoints = endpoints is None
+        self.endpoints = {k.strip().lower(): v for k, v in (endpoints or {}).items()}
+        self.rate_limits = {k.lower() if '://' not in k else k: v for k, v in (rate_limits or {}).items()}
+        self.default_rate_limit = default_rate_limit
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.clients = {k.strip().lower(): v for k, v in (clients or {}).items()}
+        self.cache = cache
+        self._lock = threading.Lock()
+
+    def refresh_endpoints(self):
+        """Re-read the endpoints from the nodes table, dropping clients of changed URLs"""
+        endpoints = endpoints_from_nodes(self.db_manager)
+        with self._lock:
+            for network, client in list(self.clients.items()):
+                url = getattr(client, 'url', None)
+                if url is not None and network in self.endpoints and endpoints.get(network) != url:
+                    del self.clients[network]
+            self.endpoints = endpoints
+
+    def client_for(self, network):
+        with self._lock:
+            client = self.clients.get(network)
+            if client is None and network in self.endpoints:
+                # Each client keeps its own pooled session, so keep-alive
+                # connections are reused across batches and syncs
+                url = self.endpoints[network]
+                rate = self.rate_limits.get(url, self.rate_limits.get(network, self.default_rate_limit))
+                client = JsonRpcClient(url, rate_limit=rate, batch_size=self.batch_size, timeout=self.timeout)
+                if self.cache is not None:
+                    client = CachedRpcClient(client, self.cache)
+                self.clients[network] = client
+            return client
+
+    def _fetch(self, network, wallets):
+        """Return ([(balance, wallet_id)], failed count) for one network"""
+        client = self.client_for(network)
+        try:
+            results = client.batch(('eth_getBalance', (w['address'], 'latest')) for w in wallets)
+        except (requests.RequestException, JsonRpcError, ValueError):
+            return [], len(wallets)
+        balances, failed = [], 0
+        for wallet, result in zip(wallets, results):
+            if isinstance(result, str) and result.startswith('0x'):
+                balances.append((int(result, 16) / WEI_PER_ETHER, wallet['id']))
+            else:
+                failed += 1
+        return balances, failed
+
+    def sync(self, networks=None, workers=4):
+        """Fetch and store every wallet balance; returns counts of updated, failed and skipped wallets."""
+        balances, stats = self.fetch(networks, workers)
+        self.db_manager.update_wallet_balances(balances)
+        return stats
+
+    def fetch(self, networks=None, workers=4):
+        """Fetch every wallet balance without storing it; returns ([(balance, wallet_id)], counts)"""
+        if networks is not None:
+            networks = {n.strip().lower() for n in networks}
+        if self.auto_endpoints:
+            self.refresh_endpoints()
+        groups, skipped = {}, 0
+        for wallet in self.db_manager.iter_rows('wallets'):
+            network = (wallet.get('network') or '').strip().lower()
+            if ((networks is not None and network not in networks) or self.client_for(network) is None
+                    or not ADDRESS.match(str(wallet.get('address') or '').strip())):
+                skipped += 1
+                continue
+            groups.setdefault(network, []).append({'id': wallet['id'], 'address': wallet['address'].strip()})
+        balances, failed = [], 0
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(groups)))) as pool:
+            for found, missed in pool.map(lambda item: self._fetch(*item), groups.items()):
+                balances.extend(found)
+                failed += missed
+        return balances, {'updated': len(balances), 'failed': failed, 'skipped': skipped}
@@ -0,0 +1,100 @@
+"""Database calls off the Tk thread: one writer thread, a few reader threads"""
+
+import queue
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class DbExecutor:
+    """Run database work on worker threads and hand the outcome back to Tk
+
+    Writes go to a single thread, so they never wait on each other's
+    locks; reads run on `readers` threads, each with its own connection
+    (DatabaseManager keeps one per thread), which WAL mode lets proceed
+    while a write is in progress. read() and write() return a Future.
+    background() is for slow work that is mostly not database access
+    (network calls, say), on a thread of its own so it never holds up
+    the readers.
+
+    With an `on_done(result, error)` callback, the outcome is queued and
+    delivered on the Tk thread by after() polling of `widget`, which only
+    runs while callbacks are outstanding. read()/write() must then be
+    called from the Tk thread. An `indicator` (any object with start(text)
+    and stop()) is started on submission and stopped on delivery.
+    """
+
+    POLL_MS = 25
+
+    def __init__(self, widget=None, readers=2, poll_ms=None):
+        self.widget = widget
+        self.poll_ms = poll_ms or self.POLL_MS
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix='db-reader')
+        self._background = ThreadPoolExecutor(max_workers=1, thread_name_prefix='background')
+        self._done = queue.Queue()
+        self._outstanding = 0
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def read(self, fn, *args, on_done=None, indicator=None, message="Loading..."):
+        return self._submit(self._readers, fn, args, on_done, indicator, message)
+
+    def write(self, fn, *args, on_done=None, indicator=None, message="Saving..."):
+        return self._submit(self._writer, fn, args, on_done, indicator, message)
+
+    def background(self, fn, *args, on_done=None, indicator=None, message="Working..."):
+        return self._submit(self._background, fn, args, on_done, indicator, message)
+
+    def _submit(self, pool, fn, args, on_done, indicator, message):
+        future = pool.submit(fn, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._forget)
+        if on_done is not None:
+            if indicator is not None:
+                indicator.start(message)
+            self._outstanding += 1
+            # Runs on the worker thread (or here if already done); only queues
+            future.add_done_callback(lambda f: self._done.put((f, on_done, indicator)))
+            if self._outstanding == 1:
+                self.widget.after(self.poll_ms, self._deliver)
+        return future
+
+    def _forget(self, future):
+        with self._lock:
+            self._pending.discard(future)
+
+    def _deliver(self):
+        ready = []
+        while True:
+            try:
+                ready.append(self._done.get_nowait())
+            except queue.Empty:
+                break
+        self._outstanding -= len(ready)
+        if self._outstanding:
+            self.widget.after(self.poll_ms, self._deliver)
+        for future, on_done, indicator in ready:
+            # One failing indicator or callback must not keep the others from running
+            try:
+                if indicator is not None:
+                    indicator.stop()
+            except Exception:
+                traceback.print_exc()
+            error = future.exception()
+            try:
+                on_done(None if error else future.result(), error)
+            except Exception:
+                traceback.print_exc()
+
+    def wait_idle(self, timeout=None):
+        """Block until every submitted call has finished (e.g. before closing the database)"""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout)
+
+    def close(self):
+        self._background.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
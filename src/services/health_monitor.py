@@ -0,0 +1,277 @@
+"""Node health monitoring - probes every node in the background with asyncio"""
+
+import asyncio
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlsplit
+
+from src.database.models import now_iso
+
+# Result of one probe; latency_ms and block are None when unknown
+ProbeResult = namedtuple('ProbeResult', 'node_id status latency_ms block error')
+
+STATUS_ACTIVE = 'Active'
+STATUS_SYNCING = 'Syncing'
+STATUS_OFFLINE = 'Offline'
+
+DEFAULT_PORTS = {'http': 80, 'https': 443, 'ws': 80, 'wss': 443}
+
+
+def node_endpoint(node):
+    """Return (host, port, path) for a node row, or None if it has no usable port.
+
+    The address may be a bare host, host:port or a URL; the port column,
+    when set, takes precedence.
+    """
+    address = str(node.get('address') or '').strip()
+    if not address:
+        return None
+    parts = urlsplit(address if '://' in address else f'//{address}')
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    port = node.get('port') or port or DEFAULT_PORTS.get(parts.scheme)
+    if not parts.hostname or not isinstance(port, int):
+        return None
+    return parts.hostname, port, parts.path or '/'
+
+
+async def rpc_request(reader, writer, host, port, path, method, params=()):
+    """Send one JSON-RPC request as HTTP/1.1 over an open connection and return its result"""
+    body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': list(params)}).encode()
+    writer.write((f'POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n'
+                  f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n').encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    status_line = head.split(b'\r\n', 1)[0].split()
+    if len(status_line) < 2 or status_line[1] != b'200':
+        raise ConnectionError(f"HTTP {status_line[1].decode() if len(status_line) > 1 else 'response missing'}")
+    if b'transfer-encoding: chunked' in head.lower():
+        payload = _dechunk(payload)
+    reply = json.loads(payload)
+    if reply.get('error'):
+        raise ConnectionError(reply['error'].get('message', 'JSON-RPC error'))
+    return reply.get('result')
+
+
+def _dechunk(data):
+    out = bytearray()
+    while data:
+        size_line, _, data = data.partition(b'\r\n')
+        size = int(size_line.split(b';')[0] or b'0', 16)
+        if size == 0:
+            break
+        out += data[:size]
+        data = data[size + 2:]
+    return bytes(out)
+
+
+class HealthMonitor:
+    """Probe every node with bounded concurrency and write the results back in batches
+
+    Each probe is a TCP connect to the node's host and port and, when `rpc`
+    is set, an `eth_syncing` JSON-RPC call on top. A fixed pool of worker
+    coroutines pulls nodes from a bounded queue fed by a batched table scan,
+    so neither the number of open sockets nor memory grows with the table.
+    The scan and the result writes run on a dedicated database thread, so a
+    write waiting on a lock never stalls the probes in flight.
+
+    With a NodeMetrics store (`metrics`), every probe is also appended to
+    the node's uptime/latency history, which is pruned after each pass.
+
+    check_once() runs a single pass on the calling thread. start() instead
+    runs passes on a background thread with its own event loop, every
+    `interval` seconds and whenever check_now() is called; `on_cycle` is
+    called from that thread, so GUI callers must hand the summary over to
+    the Tk thread themselves (e.g. a queue polled with after()).
+    """
+
+    def __init__(self, db_manager, concurrency=100, timeout=3.0, interval=None,
+                 rpc=False, rpc_method='eth_syncing', write_batch=500, metrics=None):
+        self.db_manager = db_manager
+        self.metrics = metrics
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.interval = interval
+        self.rpc = rpc
+        self.rpc_method = rpc_method
+        self.write_batch = write_batch
+        self._thread = None
+        self._loop = None
+        self._wake = None
+        self._stopping = False
+        self._db = None
+
+    def _db_call(self, fn, *args):
+        """Await fn(*args) on the database thread; calls run one at a time, in order"""
+        if self._db is None:
+            self._db = ThreadPoolExecutor(max_workers=1, thread_name_prefix='node-health-db')
+        return asyncio.get_running_loop().run_in_executor(self._db, fn, *args)
+
+    # Probing
+    async def probe(self, node):
+        endpoint = node_endpoint(node)
+        if endpoint is None:
+            return ProbeResult(node['id'], STATUS_OFFLINE, None, None, 'no host/port')
+        host, port, path = endpoint
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        except asyncio.TimeoutError:
+            return ProbeResult(node['id'], STATUS_OFFLINE, None, None, 'timeout')
+        except Exception as e:
+            # OSError, but also e.g. UnicodeError for a malformed host like 'a..b'
+            return ProbeResult(node['id'], STATUS_OFFLINE, None, None, str(e) or type(e).__name__)
+        latency = (time.perf_counter() - start) * 1000
+        try:
+            if not self.rpc:
+                return ProbeResult(node['id'], STATUS_ACTIVE, latency, None, None)
+            # The sync check reuses the connection the TCP probe opened
+            result = await asyncio.wait_for(
+                rpc_request(reader, writer, host, port, path, self.rpc_method), self.timeout)
+            if isinstance(result, dict):
+                block = result.get('currentBlock')
+                block = int(block, 16) if isinstance(block, str) else block
+                return ProbeResult(node['id'], STATUS_SYNCING, latency, block, None)
+        except asyncio.TimeoutError:
+            return ProbeResult(node['id'], STATUS_ACTIVE, latency, None, 'timeout')
+        except Exception as e:
+            # Port open but no usable RPC endpoint (or an unparsable reply)
+            return ProbeResult(node['id'], STATUS_ACTIVE, latency, None, str(e) or type(e).__name__)
+        finally:
+            writer.close()
+        return ProbeResult(node['id'], STATUS_ACTIVE, latency, None, None)
+
+    async def check_all(self):
+        """Probe every node once; returns a summary dict with counts per status."""
+        started = time.perf_counter()
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        results, probes, writes, write_errors = [], [], [], []
+        summary = {STATUS_ACTIVE: 0, STATUS_SYNCING: 0, STATUS_OFFLINE: 0}
+
+        def write(health, samples):
+            # A batch that fails to write is dropped, not retried with the next one
+            try:
+                if health:
+                    self.db_manager.update_node_health(health)
+                if samples:
+                    self.metrics.record(samples)
+            except Exception as e:
+                write_errors.append(e)
+
+        def flush():
+            # Queued on the database thread; the probes carry on meanwhile
+            if results or probes:
+                writes.append(self._db_call(write, results[:], probes[:]))
+            results.clear()
+            probes.clear()
+
+        async def worker():
+            # A worker must never die early: the feeder would block on a full queue
+            while True:
+                node = await queue.get()
+                if node is None:
+                    return
+                try:
+                    result = await self.probe(node)
+                except Exception as e:
+                    result = ProbeResult(node.get('id'), STATUS_OFFLINE, None, None, str(e) or type(e).__name__)
+                summary[result.status] += 1
+                # last_sync records the last time the node was seen healthy
+                seen = now_iso() if result.status == STATUS_ACTIVE else None
+                results.append((result.node_id, result.status, seen))
+                if self.metrics is not None:
+                    probes.append(result)
+                if len(results) >= self.write_batch:
+                    flush()
+
+        workers = [asyncio.ensure_future(worker()) for _ in range(self.concurrency)]
+        try:
+            nodes = self.db_manager.iter_rows('nodes')
+            while True:
+                batch = await self._db_call(lambda: list(islice(nodes, self.concurrency)))
+                if not batch:
+                    break
+                for node in batch:
+                    await queue.put(node)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            flush()
+            await asyncio.gather(*writes)
+        if write_errors:
+            raise write_errors[0]
+        if self.metrics is not None:
+            await self._db_call(self.metrics.prune)
+        summary['checked'] = sum(summary[s] for s in (STATUS_ACTIVE, STATUS_SYNCING, STATUS_OFFLINE))
+        summary['seconds'] = time.perf_counter() - started
+        return summary
+
+    def check_once(self):
+        return asyncio.run(self.check_all())
+
+    # Background thread
+    def start(self, on_cycle=None):
+        if self._thread is not None:
+            return
+        self._stopping = False
+        ready = threading.Event()
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._run(on_cycle, ready)),
+                                        name='node-health', daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def check_now(self):
+        """Start a pass right away (from any thread)"""
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def set_interval(self, interval):
+        """Change the pass interval (None: only on check_now) and start a pass"""
+        self.interval = interval
+        self.check_now()
+
+    def stop(self, timeout=None):
+        if self._thread is None:
+            return
+        self._stopping = True
+        self.check_now()
+        self._thread.join(timeout)
+        self._thread = None
+        if self._db is not None:
+            self._db.shutdown(wait=True)
+            self._db = None
+
+    async def _run(self, on_cycle, ready):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        ready.set()
+        try:
+            first = self.interval is not None
+            while not self._stopping:
+                if not first:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wake.clear()
+                    if self._stopping:
+                        break
+                first = False
+                try:
+                    summary = await self.check_all()
+                except Exception as e:
+                    summary = {'error': str(e)}
+                if on_cycle:
+                    on_cycle(summary)
+        finally:
+            self._loop = None
@@ -0,0 +1,190 @@
+"""Response cache for JSON-RPC lookups: TTL + LRU in memory, optional SQLite tier on disk"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from src.services.rpc_client import JsonRpcError
+
+
+class RpcCache:
+    """Cache of JSON-RPC results shared by any number of clients
+
+    Entries expire after a per-method TTL (methods without one are never
+    cached) and the least recently used ones are evicted beyond
+    `max_entries`. While a key is being fetched, other lookups of it wait
+    for that fetch instead of sending their own request. With `disk_path`,
+    entries are also kept in a small SQLite file, so a restart only
+    refetches what has expired.
+    """
+
+    DEFAULT_TTLS = {
+        'eth_getBalance': 30,
+        'eth_blockNumber': 5,
+        'eth_syncing': 5,
+        'eth_chainId': 24 * 3600,
+        'net_version': 24 * 3600,
+    }
+
+    def __init__(self, ttls=None, max_entries=10000, disk_path=None):
+        self.ttls = dict(self.DEFAULT_TTLS, **(ttls or {}))
+        self.max_entries = max_entries
+        self.hits = self.misses = self.coalesced = 0
+        self._entries = OrderedDict()   # key -> (expires, value)
+        self._inflight = {}             # key -> Future
+        self._lock = threading.Lock()
+        self._disk = None
+        if disk_path:
+            if os.path.dirname(disk_path):
+                os.makedirs(os.path.dirname(disk_path), exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("""CREATE TABLE IF NOT EXISTS rpc_cache (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL) WITHOUT ROWID""")
+            self._disk.execute("DELETE FROM rpc_cache WHERE expires < ?", (time.time(),))
+            self._disk.commit()
+
+    @staticmethod
+    def key(url, method, params):
+        return json.dumps([url, method, list(params)], sort_keys=True, separators=(',', ':'))
+
+    def ttl_for(self, method):
+        return self.ttls.get(method, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM rpc_cache")
+                self._disk.commit()
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
+            self._disk = None
+
+    # Lookup and coalescing
+    def claim(self, keys):
+        """Split `keys` into cached values, fetches to wait for and fetches the caller must do.
+
+        Returns (hits {key: value}, waits {key: Future}, claimed set). The
+        caller must settle every claimed key with resolve() or fail().
+        """
+        now = time.time()
+        hits, waits, claimed = {}, {}, set()
+        with self._lock:
+            missing = []
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    hits[key] = entry[1]
+                elif key in self._inflight:
+                    waits[key] = self._inflight[key]
+                else:
+                    missing.append(key)
+            for key, (expires, value) in self._disk_get(missing, now).items():
+                self._store(key, expires, value)
+                hits[key] = value
+            for key in missing:
+                if key not in hits:
+                    self._inflight[key] = Future()
+                    claimed.add(key)
+            self.hits += len(hits)
+            self.coalesced += len(waits)
+            self.misses += len(claimed)
+        return hits, waits, claimed
+
+    def resolve(self, results, ttls):
+        """Store fetched {key: value} results (errors are passed on but not cached)"""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for key, value in results.items():
+                future = self._inflight.pop(key, None)
+                ttl = ttls.get(key, 0)
+                if ttl > 0 and not isinstance(value, JsonRpcError):
+                    self._store(key, now + ttl, value)
+                    rows.append((key, json.dumps(value), now + ttl))
+                if future is not None:
+                    future.set_result(value)
+            if rows and self._disk is not None:
+                self._disk.executemany("INSERT OR REPLACE INTO rpc_cache (key, value, expires) VALUES (?, ?, ?)", rows)
+                self._disk.commit()
+
+    def fail(self, keys, error):
+        with self._lock:
+            for key in keys:
+                future = self._inflight.pop(key, None)
+                if future is not None:
+                    future.set_exception(error)
+
+    def _store(self, key, expires, value):
+        self._entries[key] = (expires, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _disk_get(self, keys, now):
+        if self._disk is None or not keys:
+            return {}
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._disk.execute(
+                f"SELECT key, value, expires FROM rpc_cache WHERE key IN ({', '.join('?' * len(chunk))}) "
+                f"AND expires > ?", (*chunk, now))
+            for key, value, expires in rows:
+                found[key] = (expires, json.loads(value))
+        return found
+
+
+class CachedRpcClient:
+    """A JsonRpcClient look-alike answering from an RpcCache where it can
+
+    Only the calls that are neither cached nor already being fetched by
+    another thread reach the wrapped client, still as one batch.
+    """
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+        self.url = client.url
+
+    def call(self, method, params=()):
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, JsonRpcError):
+            raise result
+        return result
+
+    def batch(self, calls):
+        calls = [(method, list(params)) for method, params in calls]
+        keys = [self.cache.key(self.url, method, params) for method, params in calls]
+        ttls = {key: self.cache.ttl_for(method) for key, (method, _) in zip(keys, calls)}
+        cacheable = [key for key in keys if ttls[key] > 0]
+        hits, waits, claimed = self.cache.claim(cacheable)
+
+        # Uncacheable calls always go out; cacheable ones only once per key
+        fetch, sent = [], set()
+        for key, call in zip(keys, calls):
+            if (ttls[key] <= 0 or key in claimed) and key not in sent:
+                fetch.append((key, call))
+                sent.add(key)
+        fetched = {}
+        if fetch:
+            try:
+                results = self.client.batch(call for _, call in fetch)
+            except BaseException as e:
+                self.cache.fail(claimed, e)
+                raise
+            fetched = {key: result for (key, _), result in zip(fetch, results)}
+            self.cache.resolve({k: v for k, v in fetched.items() if k in claimed}, ttls)
+            self.cache.fail(claimed - fetched.keys(), JsonRpcError(None, 'no response for call'))
+        values = dict(hits)
+        values.update(fetched)
+        for key, future in waits.items():
+            values[key] = future.result()
+        return [values[key] for key in keys]
@@ -0,0 +1,136 @@
+"""JSON-RPC over HTTP with pooled connections, batching and rate limiting"""
+
+import itertools
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class JsonRpcError(Exception):
+    """Error object returned by the endpoint for one call"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{message} (code {code})")
+        self.code = code
+        self.message = message
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` acquisitions per second, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def make_session(pool_size=10):
+    """A requests.Session keeping up to `pool_size` keep-alive connections per host"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['Content-Type'] = 'application/json'
+    return session
+
+
+class JsonRpcClient:
+    """Client for one JSON-RPC endpoint
+
+    Calls are sent as JSON-RPC batches of up to `batch_size` per HTTP
+    request over a pooled session, and every HTTP request first takes a
+    token from the endpoint's rate limiter. HTTP 429 responses are retried
+    after the server's Retry-After delay.
+    """
+
+    MAX_RETRIES = 3
+
+    def __init__(self, url, session=None, rate_limit=None, batch_size=100, timeout=10.0):
+        """
+        Args:
+            url: Endpoint URL
+            session: requests.Session to share, default a new pooled one
+            rate_limit: Maximum HTTP requests per second, or None
+            batch_size: Maximum calls per HTTP request
+        """
+        self.url = url
+        self.session = session or make_session()
+        self.limiter = RateLimiter(rate_limit) if rate_limit else None
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.requests_sent = 0
+        self._ids = itertools.count(1)
+        self._id_lock = threading.Lock()
+
+    def _post(self, payload):
+        for attempt in range(self.MAX_RETRIES + 1):
+            if self.limiter:
+                self.limiter.acquire()
+            response = self.session.post(self.url, json=payload, timeout=self.timeout)
+            self.requests_sent += 1
+            if response.status_code != 429 or attempt == self.MAX_RETRIES:
+                break
+            try:
+                delay = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                delay = 1.0
+            time.sleep(delay)
+        response.raise_for_status()
+        return response.json()
+
+    def _next_ids(self, count):
+        with self._id_lock:
+            return [next(self._ids) for _ in range(count)]
+
+    def call(self, method, params=()):
+        """Send one call and return its result; raises JsonRpcError"""
+        result = self.batch([(method, params)])[0]
+        if isinstance(result, JsonRpcError):
+            raise result
+        return result
+
+    def batch(self, calls):
+        """Send (method, params) calls and return their results in order.
+
+        A call the endpoint rejects yields a JsonRpcError in its place
+        instead of failing the whole batch; transport errors are raised.
+        """
+        calls = list(calls)
+        results = []
+        for start in range(0, len(calls), self.batch_size):
+            chunk = calls[start:start + self.batch_size]
+            ids = self._next_ids(len(chunk))
+            payload = [{'jsonrpc': '2.0', 'id': i, 'method': method, 'params': list(params)}
+                       for i, (method, params) in zip(ids, chunk)]
+            reply = self._post(payload)
+            if isinstance(reply, dict):
+                # Endpoints without batch support answer with a single error object
+                error = reply.get('error') or {}
+                raise JsonRpcError(error.get('code'), error.get('message', 'batch requests not supported'))
+            by_id = {item.get('id'): item for item in reply}
+            for i in ids:
+                item = by_id.get(i)
+                if item is None:
+                    results.append(JsonRpcError(None, 'no response for call'))
+                elif item.get('error'):
+                    results.append(JsonRpcError(item['error'].get('code'), item['error'].get('message')))
+                else:
+                    results.append(item.get('result'))
+        return results